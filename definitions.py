@@ -6,3 +6,4 @@ RESOURCES_DIR = os.path.join(HALINA_DIR, 'email_rapport', 'resources')
 TEST_DIR = os.path.join(ROOT_DIR, 'tests')
 TEST_RESOURCES_DIR = os.path.join(TEST_DIR, 'resources')
 CONFIG_DIR = os.path.join(ROOT_DIR, 'configuration')
+VAR_DIR = os.path.join(ROOT_DIR, 'var')
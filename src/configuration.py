@@ -1,10 +1,14 @@
 import dataclasses
-from typing import Dict
+from typing import Dict, NamedTuple, Optional, Tuple
 from dynaconf import Dynaconf
 
 from definitions import CONFIG_DIR
 
 
+class ConfigError(ValueError):
+    pass
+
+
 class GlobalConfig:
     @dataclasses.dataclass
     class __ConfigVal:
@@ -47,6 +51,22 @@ class GlobalConfig:
     SEND_AT_MIN = "SEND_AT_MIN"
     RAPPORT_FILE_TARGET_PATH = "RAPPORT_FILE_TARGET_PATH"
     CHARTS_UTC_OFFSET_HOURS = "CHARTS_UTC_OFFSET_HOURS"
+    EMAIL_OUTBOX_PATH = "EMAIL_OUTBOX_PATH"
+    SCHEDULER_STAGGER = "SCHEDULER_STAGGER"
+    DELIVER_BY = "DELIVER_BY"
+    DELIVER_BY_MIN = "DELIVER_BY_MIN"
+    RUN_HISTORY_PATH = "RUN_HISTORY_PATH"
+    METRICS_TEXTFILE_PATH = "METRICS_TEXTFILE_PATH"
+    METRICS_INTERVAL = "METRICS_INTERVAL"
+    METRICS_PUBLISH = "METRICS_PUBLISH"
+    LOOP_BLOCK_THRESHOLD_MS = "LOOP_BLOCK_THRESHOLD_MS"
+    PROFILE_JOBS = "PROFILE_JOBS"
+    PROFILE_PATH = "PROFILE_PATH"
+    SMTP_START_TLS = "SMTP_START_TLS"
+    DIAGNOSTICS_SAMPLES = "DIAGNOSTICS_SAMPLES"
+    DIAGNOSTICS_INTERVAL = "DIAGNOSTICS_INTERVAL"
+    IMPORT_BUDGET_MS = "IMPORT_BUDGET_MS"
+    SERVICE_PROCESSES = "SERVICE_PROCESSES"
 
     # dict of empty values. If someone will be overridden by not None value, this value will be return instead
     # value from config
@@ -64,16 +84,54 @@ class GlobalConfig:
         SMTP_PASSWORD: __ConfigVal(str),
         CHARTS_UTC_OFFSET_HOURS: __ConfigVal(float),
         SEND_AT: __ConfigVal(int),  # at witch hour will be sent email
+        SEND_AT_MIN: __ConfigVal(int),
         RAPPORT_FILE_TARGET_PATH: __ConfigVal(str),  # at witch hour will be sent email
+        EMAIL_OUTBOX_PATH: __ConfigVal(str),  # directory where finished emails wait for delivery
+        SCHEDULER_STAGGER: __ConfigVal(int),  # seconds between start of independent nightly jobs
+        DELIVER_BY: __ConfigVal(int),  # utc hour at witch nightly jobs should be finished
+        DELIVER_BY_MIN: __ConfigVal(int),
+        RUN_HISTORY_PATH: __ConfigVal(str),  # file witch durations of previous nightly runs
+        METRICS_TEXTFILE_PATH: __ConfigVal(str),  # prometheus textfile witch pipeline metrics
+        METRICS_INTERVAL: __ConfigVal(int),  # seconds between metrics exports
+        METRICS_PUBLISH: __ConfigVal(bool),  # publish metrics also to NATS
+        LOOP_BLOCK_THRESHOLD_MS: __ConfigVal(int),  # asyncio loop blocked longer than this is logged witch stack
+        PROFILE_JOBS: __ConfigVal(list),  # names of nightly jobs witch runs are profiled
+        PROFILE_PATH: __ConfigVal(str),  # directory for profiling results
+        SMTP_START_TLS: __ConfigVal(bool),  # upgrade smtp connection witch STARTTLS
+        DIAGNOSTICS_SAMPLES: __ConfigVal(int),  # logged examples of repeated event (e.g. malformed record) per period
+        DIAGNOSTICS_INTERVAL: __ConfigVal(int),  # seconds between summaries of repeated events
+        IMPORT_BUDGET_MS: __ConfigVal(int),  # longer import of modules at start is logged as warning
+        SERVICE_PROCESSES: __ConfigVal(list),  # names of services run in own worker process
     }
+    # allowed ranges of numeric values, checked when the configuration is loaded
+    __ranges: Dict[str, Tuple[float, float]] = {
+        NATS_PORT: (1, 65535),
+        SMTP_PORT: (1, 65535),
+        OBSERVATORY_TIMEZONE: (-12, 14),
+        CHARTS_UTC_OFFSET_HOURS: (-12, 14),
+        SEND_AT: (0, 23),
+        SEND_AT_MIN: (0, 59),
+        DELIVER_BY: (0, 23),
+        DELIVER_BY_MIN: (0, 59),
+        SCHEDULER_STAGGER: (0, 86400),
+        METRICS_INTERVAL: (1, 86400),
+        DIAGNOSTICS_SAMPLES: (0, 1000),
+        DIAGNOSTICS_INTERVAL: (1, 86400),
+        IMPORT_BUDGET_MS: (1, 60000),
+    }
+
+    # immutable snapshot of all keys, every key is an attribute (None if the key is not set)
+    Snapshot = NamedTuple('ConfigSnapshot', [(name, Optional[cv.type]) for name, cv in __conf.items()])
+    __snapshot: Optional[Snapshot] = None
+
     # __setters = [NATS_HOST, NATS_PORT, SMTP_USERNAME, TELESCOPES, EMAILS_TO, OBSERVATORY_TIMEZONE, SMTP_HOST,
     # SMTP_PORT, FROM_EMAIL, FROM_NAME, SMTP_PASSWORD, SEND_AT]
 
     @classmethod
     def get(cls, name, default=None):
-        cv = cls.__conf.get(name)
-        if cv and cv.val is not None:
-            return cv.val
+        if name in cls.__conf:
+            val = getattr(cls.snapshot(), name)
+            return default if val is None else val
         else:
             return cls.__settings.get(name, default)
 
@@ -81,5 +139,62 @@ class GlobalConfig:
     def set(cls, name, value):
         if name in cls.__conf:
             cls.__conf.get(name).set_val(value)
+            if cls.__snapshot is not None:
+                cls.__snapshot = cls.__snapshot._replace(**{name: cls.__freeze(value)})
         else:
             raise NameError("Name not accepted in set() method")
+
+    @classmethod
+    def overrides(cls) -> Dict[str, object]:
+        """
+        Method returns values set by `set` (e.g. from the command line), to pass them to worker process.
+        """
+        return {name: cv.val for name, cv in cls.__conf.items() if cv.val is not None}
+
+    @classmethod
+    def snapshot(cls) -> Snapshot:
+        """
+        Method returns the current snapshot of configuration, values are read by attribute e.g.
+        `GlobalConfig.snapshot().TELESCOPES`. The snapshot is never changed, reload replaces it by a new one, so
+        the caller witch needs consistent values should read them from one snapshot.
+        """
+        snapshot = cls.__snapshot
+        if snapshot is None:
+            snapshot = cls.load()
+        return snapshot
+
+    @classmethod
+    def load(cls) -> Snapshot:
+        """
+        Method (re)reads settings files, merges them witch values set by `set` (they have priority) and validates
+        types and ranges of all values. The new snapshot replaces the current one only if the whole configuration
+        is valid.
+
+        :raise ConfigError: when some values are invalid, all of them are listed in the message
+        :return: the new snapshot
+        """
+        cls.__settings.reload()
+        values = {}
+        errors = []
+        for name, cv in cls.__conf.items():
+            val = cv.val if cv.val is not None else cls.__settings.get(name, None)
+            if val is not None:
+                if cv.type is float and isinstance(val, int) and not isinstance(val, bool):
+                    val = float(val)
+                if not isinstance(val, cv.type) or (cv.type is int and isinstance(val, bool)):
+                    errors.append(f"{name} has to be {cv.type.__name__}, not {type(val).__name__}")
+                    continue
+                limits = cls.__ranges.get(name)
+                if limits is not None and not limits[0] <= val <= limits[1]:
+                    errors.append(f"{name} has to be in range [{limits[0]}, {limits[1]}], not {val}")
+                    continue
+            values[name] = cls.__freeze(val)
+        if errors:
+            raise ConfigError(f"Invalid configuration: {'; '.join(errors)}")
+        cls.__snapshot = cls.Snapshot(**values)
+        return cls.__snapshot
+
+    @staticmethod
+    def __freeze(val):
+        # lists in the snapshot can't be changed by the reader
+        return tuple(val) if isinstance(val, list) else val
@@ -0,0 +1,4 @@
+import time
+
+# start of import of the application, startup time is measured from here
+IMPORT_START = time.perf_counter()
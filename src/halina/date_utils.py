@@ -41,6 +41,16 @@ class DateUtils:
         midnight = DateUtils.today_midday_utc() - datetime.timedelta(hours=12)
         return midnight
 
+    @staticmethod
+    def local_midday_in_utc(date: datetime.date) -> datetime.datetime:
+        """
+        Thus method returns the utc equivalent (timezone aware) of local time 12 of given date.
+
+        :return: the utc equivalent of local time 12
+        """
+        t = datetime.datetime.combine(date, datetime.time(12), tzinfo=datetime.timezone.utc)
+        return t - datetime.timedelta(hours=GlobalConfig.snapshot().OBSERVATORY_TIMEZONE or 0)
+
     @staticmethod
     def today_local_midday_in_utc() -> datetime.datetime:
         """
@@ -52,7 +62,7 @@ class DateUtils:
         t = DateUtils.today_midday_utc()
         # normally timezone is added, but we have to back to utc from current time, so we subtract this
         # e.g. we need chile 12 so utc is 16
-        t = t - datetime.timedelta(hours=GlobalConfig.get(GlobalConfig.OBSERVATORY_TIMEZONE, 0))
+        t = t - datetime.timedelta(hours=GlobalConfig.snapshot().OBSERVATORY_TIMEZONE or 0)
         return t
 
     @staticmethod
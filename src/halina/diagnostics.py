@@ -0,0 +1,107 @@
+import logging
+import logging.handlers
+import queue
+import time
+from typing import Dict, List, Optional, Tuple
+
+from configuration import GlobalConfig
+
+logger = logging.getLogger(__name__.rsplit('.')[-1])
+
+
+class Diagnostics:
+    """
+    Aggregation of repeated events from hot loops (e.g. malformed records). Events are counted by kind and stream,
+    only the first `DIAGNOSTICS_SAMPLES` events of every kind and stream in one period are logged as examples. At the
+    end of the period (`summarize` is called after every scan of streams and at the latest every
+    `DIAGNOSTICS_INTERVAL` seconds) one summary line per kind and stream is logged. Logging cost doesn't depend on
+    the number of events.
+    """
+
+    _DEFAULT_SAMPLES = 3
+    _DEFAULT_INTERVAL = 60
+
+    def __init__(self):
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self._samples: int = Diagnostics._DEFAULT_SAMPLES
+        self._interval: float = Diagnostics._DEFAULT_INTERVAL
+        self._period_start: float = time.monotonic()
+        self._configured: bool = False
+
+    def _configure(self) -> None:
+        self._samples = GlobalConfig.get(GlobalConfig.DIAGNOSTICS_SAMPLES, Diagnostics._DEFAULT_SAMPLES)
+        self._interval = GlobalConfig.get(GlobalConfig.DIAGNOSTICS_INTERVAL, Diagnostics._DEFAULT_INTERVAL)
+        self._configured = True
+
+    def event(self, kind: str, stream: str, detail: str = '') -> None:
+        if not self._configured:
+            self._configure()
+        key = (kind, stream)
+        count = self._counts.get(key, 0) + 1
+        self._counts[key] = count
+        if count <= self._samples:
+            suffix = ", next are only counted" if count == self._samples else ""
+            logger.info(f"{kind} in {stream}: {detail} (example {count}/{self._samples}{suffix})")
+        if time.monotonic() - self._period_start >= self._interval:
+            self.summarize()
+
+    def count(self, kind: str, stream: str) -> int:
+        return self._counts.get((kind, stream), 0)
+
+    def summarize(self) -> List[str]:
+        """
+        Method log counts of events of the finished period and start the new one.
+
+        :return: logged summary lines
+        """
+        period = time.monotonic() - self._period_start
+        lines = []
+        for (kind, stream), count in sorted(self._counts.items()):
+            lines.append(f"{kind} in {stream}: {count} events in {period:.0f} s")
+            if count > self._samples:
+                lines[-1] += f" ({count - self._samples} not logged)"
+            logger.info(lines[-1])
+        self._counts = {}
+        self._period_start = time.monotonic()
+        # configuration can be changed between periods
+        self._configured = False
+        return lines
+
+
+# default diagnostics used by all collectors
+DIAGNOSTICS = Diagnostics()
+
+
+def start_queue_logging() -> Optional[logging.handlers.QueueListener]:
+    """
+    Method move handlers of the root logger to the thread of queue listener. Loggers only put records to the queue,
+    so writing of logs (e.g. to journald) doesn't block asyncio loop.
+
+    :return: started listener, it should be stopped by `stop_queue_logging` at the end of program
+    """
+    root = logging.getLogger()
+    handlers = [h for h in root.handlers if not isinstance(h, logging.handlers.QueueHandler)]
+    if not handlers:
+        return None
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    for h in handlers:
+        root.removeHandler(h)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener.start()
+    return listener
+
+
+def stop_queue_logging(listener: Optional[logging.handlers.QueueListener]) -> None:
+    """
+    Method write all queued records and give handlers back to the root logger.
+    """
+    if listener is None:
+        return
+    listener.stop()
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        if isinstance(h, logging.handlers.QueueHandler):
+            root.removeHandler(h)
+    for h in listener.handlers:
+        root.addHandler(h)
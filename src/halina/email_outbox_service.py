@@ -0,0 +1,93 @@
+import asyncio
+import datetime
+import logging
+
+from halina.asyncio_util_functions import wait_for_psce
+from halina.date_utils import DateUtils
+from halina.email_rapport.email_outbox import EmailOutbox, OutboxEntry
+from halina.email_rapport.email_sender import EmailSender
+from halina.metrics import DELIVERY_LATENCY_SECONDS
+from halina.service import Service
+
+logger = logging.getLogger(__name__.rsplit('.')[-1])
+
+
+class EmailOutboxService(Service):
+    """
+    Background sender for messages waiting in `EmailOutbox`. Failed deliveries are retried with exponential backoff,
+    so slow or unavailable SMTP server never forces collecting and rendering the rapport again.
+    """
+    _NAME = "EmailOutboxService"
+
+    EVENT_OUTBOX_NEW_MESSAGE = "EVENT_OUTBOX_NEW_MESSAGE"
+
+    # when nothing is waiting in outbox check it anyway from time to time
+    _IDLE_INTERVAL = 600  # 10 min
+
+    def __init__(self, outbox: EmailOutbox = None, **kwargs):
+        super().__init__(**kwargs)
+        self.shared_data.get_events().set(EmailOutboxService.EVENT_OUTBOX_NEW_MESSAGE, asyncio.Event())
+        self._outbox: EmailOutbox = outbox or EmailOutbox()
+
+    async def _main(self):
+        try:
+            while True:
+                await self._send_due()
+                await self._outbox.cleanup()
+                timeout = await self._time_to_next_attempt()
+                try:
+                    await wait_for_psce(
+                        self.shared_data.get_events().wait(EmailOutboxService.EVENT_OUTBOX_NEW_MESSAGE),
+                        timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            logger.info(f"Email outbox service was stopped")
+            raise
+
+    async def _on_start(self):
+        pass
+
+    async def _on_stop(self):
+        pass
+
+    async def _time_to_next_attempt(self) -> float:
+        next_attempt = await self._outbox.next_attempt_time()
+        if next_attempt is None:
+            return EmailOutboxService._IDLE_INTERVAL
+        seconds = (next_attempt - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+        return min(max(seconds, 0), EmailOutboxService._IDLE_INTERVAL)
+
+    @staticmethod
+    def _delivery_latency(entry: OutboxEntry) -> float:
+        """
+        Method return time in seconds from the end of the night (local midday) to delivery of the message.
+        """
+        created = datetime.datetime.fromisoformat(entry.created)
+        night_end = DateUtils.local_midday_in_utc(created.date())
+        if night_end > created:
+            night_end = DateUtils.local_midday_in_utc(created.date() - datetime.timedelta(days=1))
+        return (datetime.datetime.fromisoformat(entry.sent_at) - night_end).total_seconds()
+
+    async def _send_due(self) -> None:
+        for entry in await self._outbox.due_entries():
+            await self._send_entry(entry)
+
+    async def _send_entry(self, entry: OutboxEntry) -> None:
+        try:
+            # message is streamed from spool file directly to smtp server
+            with open(self._outbox.message_path(entry), 'rb') as file:
+                result = await EmailSender(entry.recipient).send_file(file)
+            error = '' if result else 'SMTP error'
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            raise
+        except Exception as e:
+            result = False
+            error = str(e)
+        if result:
+            await self._outbox.mark_sent(entry)
+            DELIVERY_LATENCY_SECONDS.set(EmailOutboxService._delivery_latency(entry), recipient=entry.recipient)
+            logger.info(f"Mail for night {entry.night} sent successfully to {entry.recipient}!")
+        else:
+            logger.error(f"Failed to send mail for night {entry.night} to {entry.recipient}. Error: {error}")
+            await self._outbox.mark_failed(entry, error)
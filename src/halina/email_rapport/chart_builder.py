@@ -1,12 +1,14 @@
 import asyncio
 import datetime
 import logging
+import time
 from typing import List, Dict, Union
 import plotly.graph_objects as go
 
 from halina.email_rapport.data_collector_classes.fwhm_point import FwhmPoint
 from halina.email_rapport.data_collector_classes.power_point import PowerPoint
 from halina.email_rapport.data_collector_classes.weather_point import WeatherPoint
+from halina.metrics import CHART_RENDER_SECONDS
 
 logger = logging.getLogger(__name__.rsplit('.')[-1])
 
@@ -68,6 +70,13 @@ class ChartBuilder:
         self.set_data_weather(data_weather=data_weather)
         return self
 
+    @staticmethod
+    def _render(fig: go.Figure, name: str) -> bytes:
+        start = time.perf_counter()
+        image = fig.to_image(format="png")
+        CHART_RENDER_SECONDS.observe(time.perf_counter() - start, chart=name)
+        return image
+
     @staticmethod
     def hex_to_rgba(hex_color: str, alpha: float) -> str:
         hex_color = hex_color.lstrip("#")
@@ -121,7 +130,7 @@ class ChartBuilder:
                            line_width=0, fillcolor="yellow", opacity=0.2)
         fig_wind.add_hrect(y0=ChartBuilder._WIND_AREA2, y1=wind_red_area_top,
                            line_width=0, fillcolor="red", opacity=0.2)
-        self._image_wind_byte = fig_wind.to_image(format="png")
+        self._image_wind_byte = ChartBuilder._render(fig_wind, name='wind')
         await asyncio.sleep(0)
 
         # temperature
@@ -134,7 +143,7 @@ class ChartBuilder:
             margin=self._MARGIN_DICT
             )
         fig_temperature.add_trace(go.Scatter(x=hours, y=temperatures))
-        self._image_temperature_byte = fig_temperature.to_image(format="png")
+        self._image_temperature_byte = ChartBuilder._render(fig_temperature, name='temperature')
         await asyncio.sleep(0)
 
         # humidity
@@ -147,7 +156,7 @@ class ChartBuilder:
             margin=self._MARGIN_DICT
             )
         fig_humidity.add_trace(go.Scatter(x=hours, y=humiditys))
-        self._image_humidity_byte = fig_humidity.to_image(format="png")
+        self._image_humidity_byte = ChartBuilder._render(fig_humidity, name='humidity')
         await asyncio.sleep(0)
 
         # pressure
@@ -160,7 +169,7 @@ class ChartBuilder:
             margin=self._MARGIN_DICT
             )
         fig_pressure.add_trace(go.Scatter(x=hours, y=pressures))
-        self._image_pressure_byte = fig_pressure.to_image(format="png")
+        self._image_pressure_byte = ChartBuilder._render(fig_pressure, name='pressure')
 
         # fwhm
         fig_fwhm = go.Figure()
@@ -218,7 +227,7 @@ class ChartBuilder:
                     )
                 )
             ))
-        self._image_fwhm_byte = fig_fwhm.to_image(format="png")
+        self._image_fwhm_byte = ChartBuilder._render(fig_fwhm, name='fwhm')
 
 
         # power
@@ -312,7 +321,7 @@ class ChartBuilder:
                 side="right"
             ),
         )
-        self._image_power_byte = fig_power.to_image(format="png")
+        self._image_power_byte = ChartBuilder._render(fig_power, name='power')
 
         stop = datetime.datetime.now(datetime.timezone.utc)
         logger.info(f"Plots was created. Proces takes: {(stop - start).total_seconds()}")
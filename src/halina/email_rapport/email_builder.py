@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from jinja2 import Environment, FileSystemLoader
 from email.mime.image import MIMEImage
@@ -178,7 +179,8 @@ class EmailBuilder:
     async def _add_logo_to_message(message: MIMEMultipart, filename: str, template_name: str):
         async with aiofiles.open(os.path.join(RESOURCES_DIR, 'pictures', filename), 'rb') as logo:
             logo_data = await logo.read()
-        logo_image = MIMEImage(logo_data)
+        # base64 encoding is done in MIMEImage constructor, so it is moved to thread
+        logo_image = await asyncio.to_thread(MIMEImage, logo_data)
         logo_image.add_header('Content-ID', f'<{template_name}>')
         logo_image.add_header('Content-Disposition', 'inline', filename=filename)
         message.attach(logo_image)
@@ -190,7 +192,7 @@ class EmailBuilder:
             logger.warning(f"Weather chart is None. Char name: {chart_name}")
             return
         try:
-            chart_image = MIMEImage(chart)
+            chart_image = await asyncio.to_thread(MIMEImage, chart)
         except Exception as e:
             logger.error(e)
             raise
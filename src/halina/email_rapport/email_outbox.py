@@ -0,0 +1,189 @@
+import asyncio
+import dataclasses
+import datetime
+import json
+import logging
+import os
+import shutil
+from email.message import Message
+from typing import List, Optional
+from urllib.parse import quote
+
+import aiofiles
+
+from configuration import GlobalConfig
+from definitions import VAR_DIR
+from halina.email_rapport.email_sender import EmailSender
+
+logger = logging.getLogger(__name__.rsplit('.')[-1])
+
+
+@dataclasses.dataclass
+class OutboxEntry:
+    night: str
+    recipient: str
+    status: str = 'pending'
+    attempts: int = 0
+    created: str = ''
+    next_attempt: str = ''
+    sent_at: Optional[str] = None
+    last_error: Optional[str] = None
+
+    def next_attempt_dt(self) -> datetime.datetime:
+        return datetime.datetime.fromisoformat(self.next_attempt)
+
+
+class EmailOutbox:
+    """
+    On-disk spool for finished report emails. Every night has its own directory witch one rendered message
+    (`message.eml`) and one small json state file per recipient. The state file is the deduplication key, so the same
+    night is never queued twice for the same recipient.
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+
+    _MESSAGE_FILENAME = 'message.eml'
+    _RETRY_BASE = 60  # first retry after 1 min, next are doubled
+    _RETRY_MAX = 3600  # never wait longer than 1 h between attempts
+    _MAX_ATTEMPTS = 10  # after this entry is marked as failed
+    _KEEP_DAYS = 14  # finished nights older than this are removed from spool
+
+    def __init__(self, path: Optional[str] = None):
+        self._path: str = path or GlobalConfig.get(GlobalConfig.EMAIL_OUTBOX_PATH) or os.path.join(VAR_DIR, 'outbox')
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @staticmethod
+    def _now() -> datetime.datetime:
+        return datetime.datetime.now(datetime.timezone.utc)
+
+    def _night_dir(self, night: str) -> str:
+        return os.path.join(self._path, night)
+
+    def _message_path(self, night: str) -> str:
+        return os.path.join(self._night_dir(night), EmailOutbox._MESSAGE_FILENAME)
+
+    def message_path(self, entry: OutboxEntry) -> str:
+        return self._message_path(entry.night)
+
+    def _entry_path(self, night: str, recipient: str) -> str:
+        return os.path.join(self._night_dir(night), f"{quote(recipient, safe='@._-+')}.json")
+
+    @staticmethod
+    async def _write_atomic(path: str, data: bytes) -> None:
+        tmp_path = f"{path}.tmp"
+        async with aiofiles.open(tmp_path, 'wb') as file:
+            await file.write(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _write_message(path: str, message: Message) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as file:
+            EmailSender.flatten(message, file)
+        os.replace(tmp_path, path)
+
+    async def _write_entry(self, entry: OutboxEntry) -> None:
+        data = json.dumps(dataclasses.asdict(entry)).encode()
+        await self._write_atomic(self._entry_path(entry.night, entry.recipient), data)
+
+    @staticmethod
+    async def _read_entry(path: str) -> Optional[OutboxEntry]:
+        try:
+            async with aiofiles.open(path, 'r') as file:
+                return OutboxEntry(**json.loads(await file.read()))
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            raise
+        except Exception as e:
+            logger.error(f"Can not read outbox entry {path}. Error: {e}")
+            return None
+
+    def has(self, night: str, recipient: str) -> bool:
+        return os.path.exists(self._entry_path(night, recipient))
+
+    async def put(self, night: str, message: Message, recipients: List[str]) -> List[str]:
+        """
+        Method store rendered message in spool and queue it for every recipient not already queued for this night.
+
+        :param night: night identifier, e.g. OCM night number
+        :param message: finished email message without From and To headers
+        :param recipients: list of email addresses
+        :return: list of recipients queued by this call
+        """
+        new_recipients = [r for r in recipients if not self.has(night, r)]
+        if not new_recipients:
+            logger.info(f"Night {night} is already queued for all recipients")
+            return []
+        os.makedirs(self._night_dir(night), exist_ok=True)
+        if not os.path.exists(self._message_path(night)):
+            # serialization encode all images, so it is done in thread straight to the file
+            await asyncio.to_thread(EmailOutbox._write_message, self._message_path(night), message)
+        now = self._now().isoformat()
+        for recipient in new_recipients:
+            await self._write_entry(OutboxEntry(night=night, recipient=recipient, created=now, next_attempt=now))
+            logger.info(f"Email for night {night} queued for {recipient}")
+        return new_recipients
+
+    async def entries(self) -> List[OutboxEntry]:
+        if not os.path.isdir(self._path):
+            return []
+        out = []
+        for night in sorted(os.listdir(self._path)):
+            night_dir = self._night_dir(night)
+            if not os.path.isdir(night_dir):
+                continue
+            for filename in os.listdir(night_dir):
+                if not filename.endswith('.json'):
+                    continue
+                entry = await self._read_entry(os.path.join(night_dir, filename))
+                if entry is not None:
+                    out.append(entry)
+        return out
+
+    async def due_entries(self) -> List[OutboxEntry]:
+        now = self._now()
+        return [e for e in await self.entries()
+                if e.status == EmailOutbox.STATUS_PENDING and e.next_attempt_dt() <= now]
+
+    async def next_attempt_time(self) -> Optional[datetime.datetime]:
+        pending = [e.next_attempt_dt() for e in await self.entries() if e.status == EmailOutbox.STATUS_PENDING]
+        return min(pending) if pending else None
+
+    async def mark_sent(self, entry: OutboxEntry) -> None:
+        entry.status = EmailOutbox.STATUS_SENT
+        entry.attempts += 1
+        entry.sent_at = self._now().isoformat()
+        entry.last_error = None
+        await self._write_entry(entry)
+
+    async def mark_failed(self, entry: OutboxEntry, error: str) -> None:
+        entry.attempts += 1
+        entry.last_error = error
+        if entry.attempts >= EmailOutbox._MAX_ATTEMPTS:
+            entry.status = EmailOutbox.STATUS_FAILED
+            logger.error(f"Giving up sending email for night {entry.night} to {entry.recipient} "
+                         f"after {entry.attempts} attempts")
+        else:
+            delay = min(EmailOutbox._RETRY_BASE * 2 ** (entry.attempts - 1), EmailOutbox._RETRY_MAX)
+            entry.next_attempt = (self._now() + datetime.timedelta(seconds=delay)).isoformat()
+            logger.warning(f"Email for night {entry.night} to {entry.recipient} will be retried in {delay} s")
+        await self._write_entry(entry)
+
+    async def cleanup(self) -> None:
+        """
+        Method remove nights witch nothing more to send and older than `_KEEP_DAYS`.
+        """
+        limit = self._now() - datetime.timedelta(days=EmailOutbox._KEEP_DAYS)
+        nights = {}
+        for e in await self.entries():
+            nights.setdefault(e.night, []).append(e)
+        for night, entries in nights.items():
+            if any(e.status == EmailOutbox.STATUS_PENDING for e in entries):
+                continue
+            if max(datetime.datetime.fromisoformat(e.created) for e in entries) < limit:
+                shutil.rmtree(self._night_dir(night), ignore_errors=True)
+                logger.info(f"Night {night} removed from email outbox")
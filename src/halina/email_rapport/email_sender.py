@@ -1,18 +1,74 @@
+import asyncio
 import logging
-from aiosmtplib import SMTP, SMTPException
-from email.mime.multipart import MIMEMultipart
+import tempfile
+import time
+from email.generator import BytesGenerator
+from email.message import Message
+from email.policy import SMTP as SMTP_POLICY
 from email.utils import formataddr
+from typing import BinaryIO, Iterable, List
+
+from aiosmtplib import SMTP, SMTPException, SMTPDataError, SMTPStatus
 
 from configuration import GlobalConfig
+from halina.metrics import SMTP_SEND_SECONDS
 
 logger = logging.getLogger(__name__.rsplit('.')[-1])
 
 
 class EmailSender:
+    _SPOOL_MAX_MEMORY = 1024 * 1024  # message bigger than this is spooled to disk
+    _CHUNK_SIZE = 64 * 1024  # approximate number of bytes written to smtp server at once
+
     def __init__(self, to_email: str):
         self.to_email: str = to_email
 
-    async def send(self, message: MIMEMultipart) -> bool:
+    @staticmethod
+    def flatten(message: Message, file: BinaryIO) -> None:
+        """
+        Method serialize message to binary file witch CRLF line endings. It is blocking, so should be called in thread.
+        """
+        BytesGenerator(file, policy=SMTP_POLICY).flatten(message)
+
+    @staticmethod
+    def _dot_stuff(lines: Iterable[bytes]) -> bytes:
+        """
+        Method prepare lines for DATA phase: quote lines beginning with a period and convert line endings to CRLF.
+        """
+        out: List[bytes] = []
+        for line in lines:
+            if line.startswith(b'.'):
+                line = b'.' + line
+            if line.endswith(b'\r\n'):
+                out.append(line)
+            else:
+                out.append(line.rstrip(b'\r\n') + b'\r\n')
+        return b''.join(out)
+
+    async def send(self, message: Message) -> bool:
+        """
+        Method send message object. Message is serialized in thread to spooled temporary file and streamed to the
+        smtp server, so the whole message never exist in memory as one string.
+        """
+        # Set the "From" header with the display name and email address
+        del message["From"]
+        message["From"] = formataddr((GlobalConfig.get(GlobalConfig.FROM_NAME),
+                                      GlobalConfig.get(GlobalConfig.FROM_EMAIL)))
+        del message["To"]
+        message["To"] = self.to_email
+        with tempfile.SpooledTemporaryFile(max_size=EmailSender._SPOOL_MAX_MEMORY) as file:
+            await asyncio.to_thread(EmailSender.flatten, message, file)
+            file.seek(0)
+            return await self.send_file(file, add_headers=False)
+
+    async def send_file(self, file: BinaryIO, add_headers: bool = True) -> bool:
+        """
+        Method send already serialized message from binary file.
+
+        :param file: file opened in binary mode witch serialized message
+        :param add_headers: if true, headers From and To are written before content of the file
+        :return: true if message was accepted by server
+        """
         from_email = GlobalConfig.get(GlobalConfig.FROM_EMAIL)
         email_app_password = GlobalConfig.get(GlobalConfig.SMTP_PASSWORD)
         user_name = GlobalConfig.get(GlobalConfig.SMTP_USERNAME)
@@ -23,21 +79,45 @@ class EmailSender:
             raise ValueError("Email app password is required but not set.")
         logger.info(f"Email name: {user_name}")
 
-        # Set the "From" header with the display name and email address
-        del message["From"]
-        message["From"] = formataddr((from_name, from_email))
-        del message["To"]
-        message["To"] = self.to_email
+        headers = b''
+        if add_headers:
+            headers = (f"From: {formataddr((from_name, from_email))}\r\n"
+                       f"To: {self.to_email}\r\n").encode('ascii')
 
         smtp: SMTP = SMTP(hostname=GlobalConfig.get(GlobalConfig.SMTP_HOST),
                           port=GlobalConfig.get(GlobalConfig.SMTP_PORT),
-                          start_tls=True)
+                          start_tls=GlobalConfig.get(GlobalConfig.SMTP_START_TLS, True))
+        start = time.perf_counter()
         try:
             async with smtp:
                 await smtp.login(user_name, email_app_password)
-                await smtp.send_message(message)
+                await self._send_stream(smtp=smtp, from_email=from_email, headers=headers, file=file)
                 logger.info(f"Email sent successfully to {self.to_email}")
+                SMTP_SEND_SECONDS.observe(time.perf_counter() - start, recipient=self.to_email, result='sent')
                 return True
         except SMTPException as e:
             logger.error(f"Failed to send email due to SMTP error: {str(e)}")
+            SMTP_SEND_SECONDS.observe(time.perf_counter() - start, recipient=self.to_email, result='error')
             return False
+
+    async def _send_stream(self, smtp: SMTP, from_email: str, headers: bytes, file: BinaryIO) -> None:
+        await smtp.mail(from_email)
+        await smtp.rcpt(self.to_email)
+        response = await smtp.execute_command(b"DATA")
+        if response.code != SMTPStatus.start_input:
+            raise SMTPDataError(response.code, response.message)
+        protocol = smtp.protocol
+        if headers:
+            protocol.write(headers)
+        while True:
+            lines = await asyncio.to_thread(file.readlines, EmailSender._CHUNK_SIZE)
+            if not lines:
+                break
+            protocol.write(EmailSender._dot_stuff(lines))
+            # wait until transport buffer is flushed, otherwise whole message would be buffered in memory
+            await protocol._drain_helper()
+        # every line is already terminated by CRLF
+        protocol.write(b'.\r\n')
+        response = await protocol.read_response(timeout=smtp.timeout)
+        if response.code != SMTPStatus.completed:
+            raise SMTPDataError(response.code, response.message)
@@ -0,0 +1,136 @@
+import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple, Union
+
+# kinds of fields
+REQUIRED = 'required'  # any not empty value
+PRESENT = 'present'  # key has to exist, value can be anything
+NUMBER = 'number'  # int or float
+FLOAT = 'float'  # not empty value convertible to float, extracted as float
+TS = 'ts'  # array of date parts [year, month, day, ...], extracted as UTC datetime
+DICT = 'dict'  # not empty dict, fields of it can be validated too
+
+_KINDS = (REQUIRED, PRESENT, NUMBER, FLOAT, TS, DICT)
+
+
+class Field(NamedTuple):
+    name: str  # name of field is the reason returned when the field is malformed
+    path: Tuple[str, ...]
+    kind: str
+
+
+class RecordSchema:
+    """
+    Declarative schema of message of one stream. Schema is compiled once to function witch validates the message and
+    extracts values of fields in one pass. Function `validate` returns tuple of values in the order of fields, or the
+    name of the first malformed field (reason) as str. Missing or damaged dict on the path of the field is reported by
+    its key.
+    """
+
+    def __init__(self, name: str, fields: List[Field]):
+        for f in fields:
+            if f.kind not in _KINDS:
+                raise ValueError(f"Unknown kind of field {f.name}: {f.kind}")
+        self.name: str = name
+        self.fields: List[Field] = fields
+        self.validate: Callable[[Any], Union[tuple, str]] = self._compile()
+
+    def _compile(self) -> Callable[[Any], Union[tuple, str]]:
+        lines = ["def validate(data):",
+                 "    if not isinstance(data, dict) or not data:",
+                 "        return 'record'"]
+        containers: Dict[Tuple[str, ...], str] = {(): 'data'}
+        values: List[str] = []
+        for i, f in enumerate(self.fields):
+            # dicts on the path are read only once, by the first field witch needs them
+            for depth in range(1, len(f.path)):
+                prefix = f.path[:depth]
+                if prefix not in containers:
+                    var = f"c{len(containers)}"
+                    lines += [f"    {var} = {containers[prefix[:-1]]}.get({prefix[-1]!r})",
+                              f"    if not isinstance({var}, dict):",
+                              f"        return {prefix[-1]!r}"]
+                    containers[prefix] = var
+            var, parent, key, reason = f"v{i}", containers[f.path[:-1]], repr(f.path[-1]), repr(f.name)
+            if f.kind == PRESENT:
+                lines += [f"    if {key} not in {parent}:",
+                          f"        return {reason}",
+                          f"    {var} = {parent}[{key}]"]
+            else:
+                lines.append(f"    {var} = {parent}.get({key})")
+            if f.kind == REQUIRED:
+                lines += [f"    if not {var}:",
+                          f"        return {reason}"]
+            elif f.kind == NUMBER:
+                lines += [f"    if {var}.__class__ is not float and {var}.__class__ is not int:",
+                          f"        return {reason}"]
+            elif f.kind == FLOAT:
+                lines += [f"    if not {var}:",
+                          f"        return {reason}",
+                          "    try:",
+                          f"        {var} = float({var})",
+                          "    except (TypeError, ValueError):",
+                          f"        return {reason}"]
+            elif f.kind == TS:
+                lines += [f"    if not {var}:",
+                          f"        return {reason}",
+                          "    try:",
+                          f"        {var} = _datetime(*{var}, tzinfo=_utc)",
+                          "    except (TypeError, ValueError):",
+                          f"        return {reason}"]
+            elif f.kind == DICT:
+                lines += [f"    if not isinstance({var}, dict) or not {var}:",
+                          f"        return {reason}"]
+                containers[f.path] = var
+            values.append(var)
+        lines.append(f"    return ({', '.join(values)},)")
+        namespace = {'_datetime': datetime.datetime, '_utc': datetime.timezone.utc}
+        exec(compile('\n'.join(lines), f"<schema {self.name}>", 'exec'), namespace)
+        return namespace['validate']
+
+
+def fits_schema(main_key: str) -> RecordSchema:
+    """
+    Schema of raw or zdf message, extracts (fits_id, content, JD).
+    """
+    return RecordSchema(main_key, [
+        Field('fits_id', ('fits_id',), REQUIRED),
+        Field(main_key, (main_key,), DICT),
+        Field('JD', (main_key, 'header', 'JD'), FLOAT),
+    ])
+
+
+DOWNLOAD = RecordSchema('download', [
+    Field('fits_id', ('fits_id',), REQUIRED),
+    Field('date_obs', ('param', 'date_obs'), REQUIRED),
+    Field('raw_file_name', ('param', 'raw_file_name'), REQUIRED),
+    Field('image_type', ('param', 'image_type'), REQUIRED),
+])
+
+RAW = fits_schema('raw')
+ZDF = fits_schema('zdf')
+
+FASTSTAT = RecordSchema('faststat', [
+    Field('fwhm_x', ('raw', 'fwhm', 'fwhm_x'), NUMBER),
+    Field('fwhm_y', ('raw', 'fwhm', 'fwhm_y'), NUMBER),
+    Field('DATE-OBS', ('raw', 'header', 'DATE-OBS'), REQUIRED),
+    Field('JD', ('raw', 'header', 'JD'), FLOAT),
+    Field('SCALE', ('raw', 'header', 'SCALE'), PRESENT),
+    Field('IMAGETYP', ('raw', 'header', 'IMAGETYP'), PRESENT),
+])
+
+WEATHER = RecordSchema('weather', [
+    Field('ts', ('ts',), TS),
+    Field('wind_10min_ms', ('measurements', 'wind_10min_ms'), NUMBER),
+    Field('temperature_C', ('measurements', 'temperature_C'), NUMBER),
+    Field('humidity', ('measurements', 'humidity'), NUMBER),
+    Field('wind_dir_deg', ('measurements', 'wind_dir_deg'), NUMBER),
+    Field('pressure_Pa', ('measurements', 'pressure_Pa'), NUMBER),
+])
+
+POWER = RecordSchema('power', [
+    Field('ts', ('ts',), TS),
+    Field('state_of_charge', ('measurements', 'state_of_charge'), NUMBER),
+    Field('pv_power', ('measurements', 'pv_power'), NUMBER),
+    Field('battery_charge', ('measurements', 'battery_charge'), NUMBER),
+    Field('battery_discharge', ('measurements', 'battery_discharge'), NUMBER),
+])
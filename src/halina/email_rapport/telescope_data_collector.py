@@ -3,18 +3,23 @@ import datetime
 import logging
 from typing import Dict, Optional, List
 
-from pyaraucaria.date import datetime_to_julian
 from serverish.base import MessengerReaderStopped
 from serverish.messenger import get_reader, single_read
 
 from halina.asyncio_util_functions import wait_for_psce
 from halina.date_utils import DateUtils
+from halina.diagnostics import DIAGNOSTICS
 from halina.email_rapport.data_collector_classes.data_type_fits import DataTypeFits
 from halina.email_rapport.data_collector_classes.data_object import DataObject
 from halina.email_rapport.data_collector_classes.fwhm_point import FwhmPoint
+from halina.email_rapport.record_schema import RecordSchema, DOWNLOAD, FASTSTAT, RAW, ZDF
+from halina.metrics import StreamMeter, JOIN_TABLE_PEAK
+from halina.lazy_import import lazy_import
 
 logger = logging.getLogger(__name__.rsplit('.')[-1])
 
+araucaria_date = lazy_import('pyaraucaria.date')
+
 
 class TelescopeDtaCollector:
     _NUMBER_STREAMS = 3
@@ -23,6 +28,8 @@ class TelescopeDtaCollector:
     _STR_NAME_ZDF = "zdf"
     _STR_NAME_DOWNLOAD = "download"
 
+    _SCHEMAS: Dict[str, RecordSchema] = {_STR_NAME_RAW: RAW, _STR_NAME_ZDF: ZDF}
+
     def __init__(self, telescope_name: str = "", utc_offset: int = 0):
         self._telescope_name = telescope_name.strip()
         self._utc_offset: int = utc_offset  # offset hour for time zones
@@ -52,6 +59,7 @@ class TelescopeDtaCollector:
         self.malformed_raw_count: int = 0
         self.malformed_zdf_count: int = 0
         self.malformed_download_count: int = 0
+        self.malformed_fields: Dict[str, int] = {}  # {'stream_key.field': count} the first malformed field of record
         self.fits_existing_files: Dict[str, int] = {}  # dict witch data to parse to json
         self.fwhm_data: List[FwhmPoint] = []
 
@@ -87,11 +95,16 @@ class TelescopeDtaCollector:
         if main_key == TelescopeDtaCollector._STR_NAME_DOWNLOAD:
             self.malformed_download_count += 1
 
+    def _count_malformed_field(self, main_key: str, field: str):
+        key = f"{main_key}.{field}"
+        self.malformed_fields[key] = self.malformed_fields.get(key, 0) + 1
+
     async def _read_data_from_download(self):
         stream = self._get_download_stream()
         yesterday_midday = DateUtils.yesterday_local_midday_in_utc()
         today_midday = DateUtils.today_local_midday_in_utc()
         reader = get_reader(stream, deliver_policy='by_start_time', opt_start_time=yesterday_midday)
+        meter = StreamMeter(stream)
         try:
             await reader.open()
             while True:
@@ -100,22 +113,26 @@ class TelescopeDtaCollector:
                 except asyncio.TimeoutError:
                     logger.info(f"Stop waiting for new date in stream - stream is empty. {stream}")
                     break
+                meter.tick()
 
-                if not TelescopeDtaCollector._validate_download(data=data, stream=stream):
-                    logger.info("Malformed download")
+                record = DOWNLOAD.validate(data)
+                if isinstance(record, str):
+                    DIAGNOSTICS.event('malformed record', stream, f"no or damaged field {record}")
+                    meter.malformed(record)
                     self._count_malformed_fits(TelescopeDtaCollector._STR_NAME_DOWNLOAD)
+                    self._count_malformed_field(TelescopeDtaCollector._STR_NAME_DOWNLOAD, record)
                     continue
 
-                fits_id = data.get("fits_id")
-                param = data.get("param")
-                obs = param.get("date_obs")
+                fits_id, obs, _, _ = record
                 try:
-                    jd = datetime_to_julian(obs)
+                    jd = araucaria_date.datetime_to_julian(obs)
                 except (ValueError, TypeError):
-                    logger.info(f"The read record from stream {stream} has wrong format: JD")
+                    DIAGNOSTICS.event('malformed record', stream, f"wrong format of date_obs: {obs}")
+                    meter.malformed('date_obs')
                     self._count_malformed_fits(TelescopeDtaCollector._STR_NAME_DOWNLOAD)
+                    self._count_malformed_field(TelescopeDtaCollector._STR_NAME_DOWNLOAD, 'date_obs')
                     continue
-                jd_today_midday = datetime_to_julian(today_midday)
+                jd_today_midday = araucaria_date.datetime_to_julian(today_midday)
                 # if the difference between the beginning of the observation and the date of observation is greater
                 # than 1, it means that the day has passed and there is another night
                 if (jd_today_midday - jd) >= 1:
@@ -125,9 +142,11 @@ class TelescopeDtaCollector:
                         self._fits_pair[fits_id] = {}
                     self._fits_pair[fits_id]["download"] = data
                     self._unchecked_ids.add(fits_id)
+                    JOIN_TABLE_PEAK.set_max(len(self._fits_pair), telescope=self._telescope_name)
                     self._fp_condition.notify_all()
                 await asyncio.sleep(0)
         finally:
+            meter.finish()
             self._finish_reading_streams += 1
             async with self._fp_condition:
                 self._fp_condition.notify_all()
@@ -135,26 +154,9 @@ class TelescopeDtaCollector:
 
     @staticmethod
     def _validate_download(data: dict, stream: str) -> bool:
-        fits_id = data.get("fits_id")
-        if not fits_id:
-            logger.info(f"The read record from stream {stream} has no field:: fits_id")
-            return False
-        # ---------------------------- check date in param -----------------------------
-        param = data.get("param")
-        if not param or not isinstance(param, dict):
-            logger.info(f"The read record from stream {stream} has no field:: param")
-            return False
-        obs = param.get("date_obs")
-        if not obs:
-            logger.info(f"The read record from stream {stream} has no field:: date_obs")
-            return False
-        filename = param.get('raw_file_name')
-        if not filename:
-            logger.info(f"The read record from stream {stream} has no field:: raw_file_name")
-            return False
-        image_type = param.get('image_type')
-        if not image_type:
-            logger.info(f"The read record from stream {stream} has no field:: image_type")
+        reason = DOWNLOAD.validate(data)
+        if isinstance(reason, str):
+            DIAGNOSTICS.event('malformed record', stream, f"no or damaged field {reason}")
             return False
         return True
 
@@ -163,6 +165,7 @@ class TelescopeDtaCollector:
         yesterday_midday = DateUtils.yesterday_local_midday_in_utc()
         today_midday = DateUtils.today_local_midday_in_utc()
         reader = get_reader(stream, deliver_policy='by_start_time', opt_start_time=yesterday_midday)
+        meter = StreamMeter(stream)
         try:
             await reader.open()
             while True:
@@ -171,18 +174,19 @@ class TelescopeDtaCollector:
                 except asyncio.TimeoutError:
                     logger.info(f"Stop waiting for new date in stream - stream is empty. {stream}")
                     break
+                meter.tick()
 
-                try:
-                    fwhm: float = (data['raw']['fwhm']['fwhm_x'] + data['raw']['fwhm']['fwhm_y']) / 2
-                    date_obs: str = data['raw']['header']['DATE-OBS']
-                    jd: float = data['raw']['header']['JD']
-                    scale: float = data['raw']['header']['SCALE']
-                    image_typ: str = data['raw']['header']['IMAGETYP']
-                except (ValueError, TypeError, LookupError):
+                record = FASTSTAT.validate(data)
+                if isinstance(record, str):
+                    DIAGNOSTICS.event('malformed record', stream, f"no or damaged field {record}")
+                    meter.malformed(record)
+                    self._count_malformed_field('faststat', record)
                     continue
+                fwhm_x, fwhm_y, date_obs, jd, scale, image_typ = record
+                fwhm: float = (fwhm_x + fwhm_y) / 2
                 if not image_typ == 'science':
                     continue
-                jd_today_midday = datetime_to_julian(today_midday)
+                jd_today_midday = araucaria_date.datetime_to_julian(today_midday)
                 # if the difference between the beginning of the observation and the date of observation is greater
                 # than 1, it means that the day has passed and there is another night
                 if (jd_today_midday - jd) >= 1:
@@ -194,6 +198,7 @@ class TelescopeDtaCollector:
                 except (ValueError, TypeError):
                     continue
         finally:
+            meter.finish()
             self._finish_reading_streams += 1
             async with self._fp_condition:
                 self._fp_condition.notify_all()
@@ -203,6 +208,8 @@ class TelescopeDtaCollector:
         yesterday_midday = DateUtils.yesterday_local_midday_in_utc()
         today_midday = DateUtils.today_local_midday_in_utc()
         reader = get_reader(stream, deliver_policy='by_start_time', opt_start_time=yesterday_midday)
+        meter = StreamMeter(stream)
+        schema = TelescopeDtaCollector._SCHEMAS[main_key]
         try:
             await reader.open()
             while True:
@@ -216,21 +223,17 @@ class TelescopeDtaCollector:
                 except asyncio.TimeoutError:
                     logger.info(f"Stop waiting for new date in stream - stream is empty. {stream}")
                     break
-                logger.debug(f"Data was read from stream {stream}")
+                meter.tick()
                 # validate data
-                if not TelescopeDtaCollector._validate_record(data=data, stream=stream, main_key=main_key):
+                record = schema.validate(data)
+                if isinstance(record, str):
+                    DIAGNOSTICS.event('malformed record', stream, f"no or damaged field {record}")
+                    meter.malformed(record)
                     self._count_malformed_fits(main_key)
+                    self._count_malformed_field(main_key, record)
                     continue
-                fits_id = data.get("fits_id")
-                content = data.get(main_key)
-                header = content.get("header")
-                try:
-                    jd = float(header.get("JD"))
-                except (ValueError, TypeError):
-                    logger.info(f"The read record from stream {stream} has wrong format: JD")
-                    self._count_malformed_fits(main_key)
-                    continue
-                jd_today_midday = datetime_to_julian(today_midday)
+                fits_id, content, jd = record
+                jd_today_midday = araucaria_date.datetime_to_julian(today_midday)
                 # if the difference between the beginning of the observation and the date of observation is greater
                 # than 1, it means that the day has passed and there is another night
                 if (jd_today_midday - jd) >= 1:
@@ -240,9 +243,11 @@ class TelescopeDtaCollector:
                         self._fits_pair[fits_id] = {}
                     self._fits_pair[fits_id][main_key] = content
                     self._unchecked_ids.add(fits_id)
+                    JOIN_TABLE_PEAK.set_max(len(self._fits_pair), telescope=self._telescope_name)
                     self._fp_condition.notify_all()
                 await asyncio.sleep(0)
         finally:
+            meter.finish()
             self._finish_reading_streams += 1
             async with self._fp_condition:
                 self._fp_condition.notify_all()
@@ -250,22 +255,9 @@ class TelescopeDtaCollector:
 
     @staticmethod
     def _validate_record(data: dict, stream: str, main_key: str) -> bool:
-        fits_id = data.get("fits_id")
-        if not fits_id:
-            logger.info(f"The read record from stream {stream} has no field:: fits_id")
-            return False
-        content = data.get(main_key)
-        if not content or not isinstance(content, dict):
-            logger.info(f"The read record from stream {stream} has no field: {main_key}")
-            return False
-        # ---------------------------- check date in header ----------------------------
-        header = content.get("header")
-        if not header and not isinstance(header, dict):
-            logger.info(f"The read record from stream {stream} has no field:: header")
-            return False
-        jd = header.get("JD")
-        if not jd:
-            logger.info(f"The read record from stream {stream} has no field:: JD")
+        reason = TelescopeDtaCollector._SCHEMAS[main_key].validate(data)
+        if isinstance(reason, str):
+            DIAGNOSTICS.event('malformed record', stream, f"no or damaged field {reason}")
             return False
         return True
 
@@ -291,6 +283,7 @@ class TelescopeDtaCollector:
         logger.info(f"Start reading data from streams: {self._get_raw_stream()} & {self._get_zdf_stream()} "
                     f"& {self._get_download_stream()}")
         self._finish_reading_streams = 0
+        JOIN_TABLE_PEAK.set(0, telescope=self._telescope_name)
         coros = [self._read_data_from_download(),
                  self._read_data_from_faststat(),
                  self._read_data_from_stream(self._get_raw_stream(), TelescopeDtaCollector._STR_NAME_RAW),
@@ -301,6 +294,7 @@ class TelescopeDtaCollector:
         logger.info(f"Finished reading data from streams. Read {self.count_fits} record")
 
     async def _evaluate_data(self):
+        debug = logger.isEnabledFor(logging.DEBUG)
         async with self._fp_condition:
             while self._finish_reading_streams < TelescopeDtaCollector._NUMBER_STREAMS:
                 await self._fp_condition.wait()
@@ -309,19 +303,21 @@ class TelescopeDtaCollector:
                 self._unchecked_ids = set()  # reset ids
                 for id_ in unchecked_ids:
                     pair = self._fits_pair.get(id_)  # pair is always !=Null
-                    logger.debug(f"Evaluating pair for id: {id_}")
+                    if debug:
+                        logger.debug(f"Evaluating pair for id: {id_}")
 
                     # if dict has _NUMBER_STREAMS key that mean we have all data to process
                     if len(pair) == TelescopeDtaCollector._NUMBER_STREAMS:
                         self._fits_pair.pop(id_)  # remove key
-                        logger.debug(f"Processing pair for id: {id_}")
+                        if debug:
+                            logger.debug(f"Processing pair for id: {id_}")
                         await self._process_pair(pair)
             # process not completed fits pair (pair = raw + zdf)
             for id_, pair in self._fits_pair.items():
-                logger.debug(f"Processing remaining pair for id: {id_}")
+                if debug:
+                    logger.debug(f"Processing remaining pair for id: {id_}")
                 await self._process_pair(pair)
             self._fits_pair = {}  # clear pairs
-            logger.info(f"Final _fits_pair: {self._fits_pair}")
 
     async def _process_pair(self, pair: dict):
         """
@@ -330,6 +326,7 @@ class TelescopeDtaCollector:
         :param pair: dict witch data from all stream representing one fits
         """
         # todo nie rozpatrujemy sytuacji gdzie jest zdjęcie zdf bez raw
+        debug = logger.isEnabledFor(logging.DEBUG)
         try:
             download = pair.get(TelescopeDtaCollector._STR_NAME_DOWNLOAD)
             if download is not None:
@@ -348,7 +345,7 @@ class TelescopeDtaCollector:
                 self.count_fits_processed += 1
 
             # ----- RAW validate -----
-            valid_result = TelescopeDtaCollector._validate_rav(raw=raw)
+            valid_result = TelescopeDtaCollector._validate_rav(raw=raw, stream=self._get_raw_stream())
             if not valid_result:
                 self.malformed_raw_count += 1
                 return
@@ -362,7 +359,7 @@ class TelescopeDtaCollector:
             # ----- Process image type -----
             typ_name = TelescopeDtaCollector._map_img_typ_to_typ_name(img_typ=img_typ)
             if typ_name == 'flat':
-                if date < datetime_to_julian(DateUtils.yesterday_local_midnight_in_utc()):
+                if date < araucaria_date.datetime_to_julian(DateUtils.yesterday_local_midnight_in_utc()):
                     typ_name = 'evening-flat'
                 else:
                     typ_name = 'morning-flat'
@@ -375,23 +372,23 @@ class TelescopeDtaCollector:
                 self.fits_group_type[typ_name] = gt
             if filter_ is not None:
                 gt.filters.add(filter_)  # add filter if not exist
-            logger.debug(f"Fits type {typ_name} count updated to: {gt.count}")
+            if debug:
+                logger.debug(f"Fits type {typ_name} count updated to: {gt.count}")
             # ----- Process objects -----
             if typ_name == "science":
-                logger.debug(f"Processing object: {obj}")
                 o = self.objects.get(obj, None)
                 if o is not None:
-                    logger.debug(f"Object {obj} found, current count: {o.count}")
                     o.count += 1
                 else:
-                    logger.debug(f"Object {obj} not found, creating new DataObject")
                     o = DataObject(name=obj, count=1)
                     self.objects[obj] = o
                 if filter_ is not None:
                     o.filters.add(filter_)  # add filter if not exist
-                logger.debug(f"Object {obj} count updated to: {o.count}")
+                if debug:
+                    logger.debug(f"Object {obj} count updated to: {o.count}")
 
-            logger.debug(f"Finished processing pair. Total fits count: {self.count_fits}")
+            if debug:
+                logger.debug(f"Finished processing pair. Total fits count: {self.count_fits}")
         except (KeyboardInterrupt, asyncio.CancelledError, asyncio.TimeoutError):
             raise
         except Exception as e:
@@ -407,15 +404,15 @@ class TelescopeDtaCollector:
         return jd
 
     @staticmethod
-    def _validate_rav(raw: dict):
+    def _validate_rav(raw: dict, stream: str = _STR_NAME_RAW):
         obj = raw.get("header", {}).get("OBJECT", None)
         # fits have to have some target (OBJECT)
         if not obj:
-            logger.info(f"Find malformed fits witch no key: OBJECT")
+            DIAGNOSTICS.event('malformed fits', stream, "no key OBJECT")
             return False
         obj = raw.get("header", {}).get("IMAGETYP", None)
         if not obj:
-            logger.info(f"Find malformed fits witch no key: IMAGETYP")
+            DIAGNOSTICS.event('malformed fits', stream, "no key IMAGETYP")
             return False
         if TelescopeDtaCollector._get_date_from_raw(raw.get("header", {})) is None:
             return False
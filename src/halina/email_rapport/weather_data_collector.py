@@ -1,15 +1,17 @@
 import asyncio
 import datetime
 import logging
-from typing import List, Optional
+from typing import Dict, List
 
 from serverish.messenger import get_reader
-from serverish.base.datetime import dt_from_array
 
 from halina.asyncio_util_functions import wait_for_psce
 from halina.date_utils import DateUtils
+from halina.diagnostics import DIAGNOSTICS
 from halina.email_rapport.data_collector_classes.fwhm_point import FwhmPoint
 from halina.email_rapport.data_collector_classes.weather_point import WeatherPoint
+from halina.email_rapport.record_schema import WEATHER
+from halina.metrics import StreamMeter
 from configuration import GlobalConfig
 
 
@@ -27,6 +29,7 @@ class WeatherDataCollector:
 
         # collected data
         self._malformed_record_measurements: int = 0
+        self.malformed_fields: Dict[str, int] = {}  # {field: count} the first malformed field of record
         self.data_weather: List[WeatherPoint] = []
 
     async def collect_data(self):
@@ -42,8 +45,11 @@ class WeatherDataCollector:
         yesterday_midday = DateUtils.yesterday_midday_utc_tz() + datetime.timedelta(hours=offset_hours)
         today_midday = DateUtils.today_midday_utc_tz() + datetime.timedelta(hours=offset_hours)
         reader = get_reader(stream, deliver_policy='by_start_time', opt_start_time=yesterday_midday, nowait=True)
+        meter = StreamMeter(stream)
+        debug = logger.isEnabledFor(logging.DEBUG)
         try:
             async for data, meta in reader:
+                meter.tick()
 
             # await reader.open()
             # while True:
@@ -57,73 +63,35 @@ class WeatherDataCollector:
             #     logger.debug(f"Data was read from stream {stream}")
             #     # validate data
 
-                if not WeatherDataCollector._validate_record(data=data, stream=stream):
-                    logger.debug(f"Record from {stream} is malformed")
+                record = WEATHER.validate(data)
+                if isinstance(record, str):
+                    DIAGNOSTICS.event('malformed record', stream, f"no or damaged field {record}")
                     self._malformed_record_measurements += 1
+                    self.malformed_fields[record] = self.malformed_fields.get(record, 0) + 1
+                    meter.malformed(record)
                     continue
                 # check time
-                ts = data.get("ts")
-
-                # ts_dt = datetime.datetime(*ts)
-                ts_dt = dt_from_array(t=ts)
+                ts_dt, wind, temperature, humidity, wind_dir_deg, pressure = record
                 if ts_dt > today_midday:
                     break
 
-                # read data
-                measurement: dict = data.get('measurements', {})
-
-                # hour = ts_dt.hour + ts_dt.minute / 60 + ts_dt.second / 3600
-                wind = measurement.get('wind_10min_ms')
-                temperature = measurement.get('temperature_C')
-                humidity = measurement.get('humidity')
-                wind_dir_deg = measurement.get('wind_dir_deg')
-                pressure = measurement.get('pressure_Pa')
-                logger.debug(f"Read weather point : hour: {ts_dt} wind: {wind} temperature:{temperature} "
-                             f"humidity:{humidity} wind_dir_deg:{wind_dir_deg} pressure:{pressure}")
+                if debug:
+                    logger.debug(f"Read weather point : hour: {ts_dt} wind: {wind} temperature:{temperature} "
+                                 f"humidity:{humidity} wind_dir_deg:{wind_dir_deg} pressure:{pressure}")
                 self.data_weather.append(WeatherPoint(date=ts_dt, temperature=temperature, humidity=humidity, wind=wind,
                                                       wind_dir_deg=wind_dir_deg, pressure=pressure))
 
                 await asyncio.sleep(0)
         finally:
+            meter.finish()
             logger.info(f'Weather data measurements records: {len(self.data_weather)}')
             self._finish_reading_measurements_stream = True
             await reader.close()
 
     @staticmethod
     def _validate_record(data: dict, stream: str) -> bool:
-        if not data:
-            return False
-        # validate timestamp
-        ts: Optional[list] = data.get('ts', None)
-        if ts is None:
-            return False
-        try:
-            datetime.datetime(*ts)
-        except TypeError:
-            return False
-        # validate weather
-        measurements = data.get('measurements', {})
-        if not isinstance(measurements, dict):
-            logger.info(f"The read record from stream {stream} has damaged field measurements. Value: {measurements}")
-            return False
-        wind = measurements.get('wind_10min_ms')
-        temperature = measurements.get('temperature_C')
-        humidity = measurements.get('humidity')
-        wind_dir_deg = measurements.get('wind_dir_deg')
-        pressure = measurements.get('pressure_Pa')
-        if not isinstance(wind, float) and not isinstance(wind, int):
-            logger.info(f"The read record from stream {stream} has damaged field wind. Value: {wind}")
-            return False
-        if not isinstance(temperature, float) and not isinstance(temperature, int):
-            logger.info(f"The read record from stream {stream} has damaged field temperature. Value: {temperature}")
-            return False
-        if not isinstance(humidity, float) and not isinstance(humidity, int):
-            logger.info(f"The read record from stream {stream} has damaged field wind. Value: {wind}")
-            return False
-        if not isinstance(wind_dir_deg, float) and not isinstance(wind_dir_deg, int):
-            logger.info(f"The read record from stream {stream} has damaged field wind_dir_deg. Value: {wind_dir_deg}")
-            return False
-        if not isinstance(pressure, float) and not isinstance(pressure, int):
-            logger.info(f"The read record from stream {stream} has damaged field pressure. Value: {pressure}")
+        reason = WEATHER.validate(data)
+        if isinstance(reason, str):
+            logger.info(f"The read record from stream {stream} has damaged field {reason}")
             return False
         return True
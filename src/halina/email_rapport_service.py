@@ -4,25 +4,26 @@ import logging
 import math
 from typing import Dict, List, Union, Optional
 
-from astropy.coordinates import get_moon
-
 from configuration import GlobalConfig
 from halina.date_utils import DateUtils
+from halina.diagnostics import DIAGNOSTICS
 from halina.email_rapport.data_collector_classes.fwhm_point import FwhmPoint
+from halina.email_outbox_service import EmailOutboxService
 from halina.email_rapport.email_builder import EmailBuilder
-from halina.email_rapport.email_sender import EmailSender
+from halina.email_rapport.email_outbox import EmailOutbox
 from halina.email_rapport.power_data_collector import PowerDataCollector
 from halina.email_rapport.telescope_data_collector import TelescopeDtaCollector
 from halina.email_rapport.chart_builder import ChartBuilder
 from halina.email_rapport.weather_data_collector import WeatherDataCollector
-from halina.service_nats_dependent import ServiceNatsDependent
-from pyaraucaria.ephemeris import moon_phase
-from pyaraucaria.date import get_oca_jd, datetime_to_julian
+from halina.service_scheduled import ServiceScheduled
+from halina.lazy_import import lazy_import
 
 logger = logging.getLogger(__name__.rsplit('.')[-1])
 
+araucaria_date = lazy_import('pyaraucaria.date')
+
 
-class EmailRapportService(ServiceNatsDependent):
+class EmailRapportService(ServiceScheduled):
     _NAME = "EmailRapportService"
 
     # time to retry sending email on night. After this night will be skipped.
@@ -33,12 +34,13 @@ class EmailRapportService(ServiceNatsDependent):
         super().__init__(**kwargs)
         self._utc_offset: int = utc_offset
         self._telescopes: List[str] = GlobalConfig.get(GlobalConfig.TELESCOPES)
-        self._send_at_time = datetime.time(GlobalConfig.get(GlobalConfig.SEND_AT),
-                                           GlobalConfig.get(GlobalConfig.SEND_AT_MIN))
+        self._outbox: EmailOutbox = EmailOutbox()
 
     @staticmethod
     def _get_moon_phase(lat: float, lon: float, elev: float) -> str:
         if isinstance(lat, float) and isinstance(lon, float) and isinstance(elev, Union[float, int]):
+            # ephemeris imports scipy (about 0.5 s), so it is imported when it is used first time, not at start
+            from pyaraucaria.ephemeris import moon_phase
             _moon_phase = moon_phase(
                 date_utc=DateUtils.yesterday_midnight_utc_tz(), latitude=lat, longitude=lon, elevation=elev
             )
@@ -51,7 +53,13 @@ class EmailRapportService(ServiceNatsDependent):
 
     @staticmethod
     def _get_oca_jd() -> str:
-        return f", OCM night: {math.floor(get_oca_jd(datetime_to_julian(DateUtils.yesterday_midnight_utc())))}"
+        jd = araucaria_date.datetime_to_julian(DateUtils.yesterday_midnight_utc())
+        return f", OCM night: {math.floor(araucaria_date.get_oca_jd(jd))}"
+
+    @staticmethod
+    def _get_night_id() -> str:
+        jd = araucaria_date.datetime_to_julian(DateUtils.yesterday_midnight_utc())
+        return '{:04d}'.format(int(araucaria_date.get_oca_jd(jd)))
 
     @staticmethod
     def _format_night() -> str:
@@ -64,33 +72,8 @@ class EmailRapportService(ServiceNatsDependent):
             return (f"{yesterday_midday.day} {yesterday_midday.strftime('%b')} - {today_midday.day} "
                     f"{today_midday.strftime('%b %Y')}")
 
-    async def _main(self) -> None:
-        try:
-            today_date = datetime.datetime.now(datetime.timezone.utc).date()
-            send_at_time = datetime.datetime.combine(today_date, self._send_at_time, tzinfo=datetime.timezone.utc)
-            # if we start application after sending time wait until next day
-            if send_at_time < datetime.datetime.now(datetime.timezone.utc):
-                send_at_time = send_at_time + datetime.timedelta(days=1)
-            while True:
-                now = datetime.datetime.now(datetime.timezone.utc)
-                await asyncio.sleep((send_at_time - now).total_seconds())
-                try:
-                    start = datetime.datetime.now(datetime.timezone.utc)
-                    logger.debug(f"Start sending emails today: {now.date()}")
-                    await self._collect_data_and_send()
-                    stop = datetime.datetime.now(datetime.timezone.utc)
-                    logger.debug(f"Finish sending emails today: {now.date()}")
-                    working_time_minutes = (stop - start).total_seconds() / 60
-                    logger.info(f"Email sender finish sending message today: {now.date()} . "
-                                f"Proces takes {working_time_minutes}")
-                except SendEmailException as e:
-                    logger.error(f"Email sender service cath error: {e}")
-
-                send_at_time = send_at_time + datetime.timedelta(days=1)
-
-        except asyncio.CancelledError:
-            logger.info(f"Email sender service was stopped")
-            raise
+    async def _run_night(self) -> None:
+        await self._collect_data_and_send()
 
     async def _on_start(self) -> None:
         pass
@@ -107,6 +90,8 @@ class EmailRapportService(ServiceNatsDependent):
         if not r:
             logger.warning(f"Can not send email rapport because NATS connection is not open")
             raise SendEmailException()
+        # list of telescopes can be changed by reload of configuration
+        self._telescopes = GlobalConfig.get(GlobalConfig.TELESCOPES)
         logger.info(f"Collecting data from telescopes: {self._telescopes}")
         telescopes: Dict[str, TelescopeDtaCollector] = {}
         if self._telescopes:
@@ -119,9 +104,11 @@ class EmailRapportService(ServiceNatsDependent):
         coro = [i.collect_data() for i in telescopes.values()]
         coro.append(weather_data_coll.collect_data())
         coro.append(power_data_coll.collect_data())
-        await asyncio.gather(*coro, return_exceptions=True)
+        with self._stages.stage('collect'):
+            await asyncio.gather(*coro, return_exceptions=True)
 
         logger.info(f"Scanning stream for fits completed.")
+        DIAGNOSTICS.summarize()
         for name, i in telescopes.items():
             logger.info(f"Find fits for {name}: {i.count_fits}")
 
@@ -136,6 +123,7 @@ class EmailRapportService(ServiceNatsDependent):
                 'count_fits_processed': telescopes[tel].count_fits_processed,
                 'malformed_raw_count': telescopes[tel].malformed_raw_count,
                 'malformed_zdf_count': telescopes[tel].malformed_zdf_count,
+                'malformed_fields': telescopes[tel].malformed_fields,
                 'objects': telescopes[tel].objects,
                 'fits_group_type': telescopes[tel].fits_group_type
             }
@@ -159,7 +147,8 @@ class EmailRapportService(ServiceNatsDependent):
         chart_builder.set_data_weather(weather_data_coll.data_weather)
         chart_builder.set_data_fwhm(fwhm_data)
         chart_builder.set_data_power(power_data_coll.data_points)
-        await chart_builder.build()
+        with self._stages.stage('charts'):
+            await chart_builder.build()
 
         email_builder = (EmailBuilder()
                          .subject(f"Night Report - {night}")
@@ -175,15 +164,15 @@ class EmailRapportService(ServiceNatsDependent):
                          .power_chart(chart_builder.get_image_power_byte())
                          )
 
-        email_message = await email_builder.build()
+        with self._stages.stage('build'):
+            email_message = await email_builder.build()
 
-        for email in email_recipients:
-            email_sender = EmailSender(email)
-            result = await email_sender.send(email_message)
-            if result:
-                logger.info(f"Mail sent successfully to {email}!")
-            else:
-                logger.error(f"Failed to send mail to {email}.")
+        # sending is done by EmailOutboxService, so failed delivery never repeat collecting and rendering
+        with self._stages.stage('queue'):
+            queued = await self._outbox.put(night=self._get_night_id(), message=email_message,
+                                            recipients=email_recipients)
+        if queued:
+            self.shared_data.get_events().notify(EmailOutboxService.EVENT_OUTBOX_NEW_MESSAGE)
 
 
 class SendEmailException(Exception):
@@ -1,13 +1,17 @@
 import asyncio
 import logging
 from typing import Dict
-from pyaraucaria.date import datetime_to_julian
 from serverish.messenger import get_reader
 from halina.asyncio_util_functions import wait_for_psce
 from halina.date_utils import DateUtils
+from halina.diagnostics import DIAGNOSTICS
+from halina.email_rapport.record_schema import DOWNLOAD
+from halina.lazy_import import lazy_import
 
 logger = logging.getLogger(__name__.rsplit('.')[-1])
 
+araucaria_date = lazy_import('pyaraucaria.date')
+
 
 class HarvesterFileRapport:
     _NUMBER_STREAMS = 1
@@ -39,6 +43,7 @@ class HarvesterFileRapport:
         yesterday_midday = DateUtils.yesterday_local_midday_in_utc()
         today_midday = DateUtils.today_local_midday_in_utc()
         reader = get_reader(stream, deliver_policy='by_start_time', opt_start_time=yesterday_midday)
+        debug = logger.isEnabledFor(logging.DEBUG)
         try:
             await reader.open()
             while True:
@@ -47,10 +52,8 @@ class HarvesterFileRapport:
                 except asyncio.TimeoutError:
                     logger.info(f"Stop waiting for new date in stream - stream is empty. {stream}")
                     break
-                logger.debug(f"Data was read from stream {stream}")
 
                 if not HarvesterFileRapport._validate_download(data=data, stream=stream):
-                    logger.info("Malformed download")
                     self._count_malformed_fits(HarvesterFileRapport._STR_NAME_DOWNLOAD)
                     continue
 
@@ -58,12 +61,12 @@ class HarvesterFileRapport:
                 param = data.get("param")
                 obs = param.get("date_obs")
                 try:
-                    jd = datetime_to_julian(obs)
+                    jd = araucaria_date.datetime_to_julian(obs)
                 except (ValueError, TypeError):
-                    logger.info(f"The read record from stream {stream} has wrong format: JD")
+                    DIAGNOSTICS.event('malformed record', stream, f"wrong format of date_obs: {obs}")
                     self._count_malformed_fits(HarvesterFileRapport._STR_NAME_DOWNLOAD)
                     continue
-                jd_today_midday = datetime_to_julian(today_midday)
+                jd_today_midday = araucaria_date.datetime_to_julian(today_midday)
                 # if the difference between the beginning of the observation and the date of observation is greater
                 # than 1, it means that the day has passed and there is another night
                 if (jd_today_midday - jd) >= 1:
@@ -77,7 +80,8 @@ class HarvesterFileRapport:
                     if typ != 'snap' and typ != 'focus':
                         filename = download.get('param', {}).get('raw_file_name', 'error_key')
                         self.fits_existing_files['night_log']['raw'][filename] = 1
-                        logger.debug(f'Read downloaded fits file name; {filename}')
+                        if debug:
+                            logger.debug(f'Read downloaded fits file name; {filename}')
                 await asyncio.sleep(0)
         finally:
             self._finish_reading_streams += 1
@@ -85,26 +89,9 @@ class HarvesterFileRapport:
 
     @staticmethod
     def _validate_download(data: dict, stream: str) -> bool:
-        fits_id = data.get("fits_id")
-        if not fits_id:
-            logger.info(f"The read record from stream {stream} has no field:: fits_id")
-            return False
-        # ---------------------------- check date in param -----------------------------
-        param = data.get("param")
-        if not param or not isinstance(param, dict):
-            logger.info(f"The read record from stream {stream} has no field:: param")
-            return False
-        obs = param.get("date_obs")
-        if not obs:
-            logger.info(f"The read record from stream {stream} has no field:: date_obs")
-            return False
-        filename = param.get('raw_file_name')
-        if not filename:
-            logger.info(f"The read record from stream {stream} has no field:: raw_file_name")
-            return False
-        image_type = param.get('image_type')
-        if not image_type:
-            logger.info(f"The read record from stream {stream} has no field:: image_type")
+        reason = DOWNLOAD.validate(data)
+        if isinstance(reason, str):
+            DIAGNOSTICS.event('malformed record', stream, f"no or damaged field {reason}")
             return False
         return True
 
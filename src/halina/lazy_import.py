@@ -0,0 +1,25 @@
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Method returns module witch is executed when its attribute is used first time. Heavy dependencies not needed to
+    start services (e.g. astropy imported by pyaraucaria.date) are imported this way, so they don't delay the start.
+
+    :param name: full name of module
+    :return: module, already imported module is returned as it is
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
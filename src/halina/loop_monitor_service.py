@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from configuration import GlobalConfig
+from halina.metrics import LOOP_LAG_SECONDS, LOOP_BLOCKS
+from halina.service import Service
+
+logger = logging.getLogger(__name__.rsplit('.')[-1])
+
+
+class LoopMonitorService(Service):
+    """
+    Service measure lag of the asyncio loop shared by all services and detect blocking calls.
+
+    Lag is measured by coroutine witch sleeps `_PROBE_INTERVAL` and check how late it was woken up. Blocking calls are
+    detected by watchdog thread, witch schedules callback in the loop and if the callback is not executed within
+    `LOOP_BLOCK_THRESHOLD_MS`, logs stack of the loop thread, so the place blocking the loop is visible in the logs.
+    """
+    _NAME = "LoopMonitorService"
+
+    _PROBE_INTERVAL = 0.5  # seconds
+    _WATCHDOG_INTERVAL = 0.1  # seconds between watchdog pings
+    _DEFAULT_BLOCK_THRESHOLD_MS = 500
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._threshold: float = GlobalConfig.get(GlobalConfig.LOOP_BLOCK_THRESHOLD_MS,
+                                                  LoopMonitorService._DEFAULT_BLOCK_THRESHOLD_MS) / 1000
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._watchdog_thread: Optional[threading.Thread] = None
+        self._watchdog_stop = threading.Event()
+
+    async def _main(self):
+        try:
+            while True:
+                start = self._loop.time()
+                await asyncio.sleep(LoopMonitorService._PROBE_INTERVAL)
+                lag = self._loop.time() - start - LoopMonitorService._PROBE_INTERVAL
+                LOOP_LAG_SECONDS.observe(max(lag, 0))
+        except asyncio.CancelledError:
+            logger.info(f"Loop monitor service was stopped")
+            raise
+
+    async def _on_start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._watchdog_stop.clear()
+        self._watchdog_thread = threading.Thread(target=self._watchdog, name="halina-loop-watchdog", daemon=True)
+        self._watchdog_thread.start()
+
+    async def _on_stop(self):
+        self._watchdog_stop.set()
+        if self._watchdog_thread is not None:
+            await asyncio.to_thread(self._watchdog_thread.join)
+            self._watchdog_thread = None
+
+    def _watchdog(self) -> None:
+        """
+        Method is executed in separated thread.
+        """
+        while not self._watchdog_stop.is_set():
+            executed = threading.Event()
+            sent = time.monotonic()
+            try:
+                self._loop.call_soon_threadsafe(executed.set)
+            except RuntimeError:
+                # loop is closed
+                return
+            if not executed.wait(self._threshold):
+                LOOP_BLOCKS.inc()
+                logger.warning(f"Asyncio loop is blocked longer than {self._threshold:.3f} s. "
+                               f"Current task: {self._current_task_name()}. Stack of the loop thread:\n"
+                               f"{self._loop_stack()}")
+                while not executed.wait(1) and not self._watchdog_stop.is_set():
+                    pass
+                logger.warning(f"Asyncio loop was blocked for {time.monotonic() - sent:.3f} s")
+            self._watchdog_stop.wait(LoopMonitorService._WATCHDOG_INTERVAL)
+
+    def _loop_stack(self) -> str:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return "<loop thread not found>"
+        return ''.join(traceback.format_stack(frame))
+
+    def _current_task_name(self) -> str:
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            return "-"
+        return task.get_name() if task is not None else "- (callback)"
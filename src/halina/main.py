@@ -4,17 +4,30 @@ import logging
 import signal
 import sys
 import platform
+import time
 from typing import Optional
 
-from configuration import GlobalConfig
+import halina
+from configuration import ConfigError, GlobalConfig
+from halina.diagnostics import start_queue_logging, stop_queue_logging
+from halina.email_outbox_service import EmailOutboxService
 from halina.email_rapport_service import EmailRapportService
 from halina.file_rapport_service import FileRapportService
+from halina.loop_monitor_service import LoopMonitorService
+from halina.metrics_exporter_service import MetricsExporterService
 from halina.nats_connection_service import NatsConnectionService
+from halina.nightly_scheduler_service import NightlySchedulerService
+from halina.process_runner import ServiceProcess
+from halina.service import Service
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] [%(name)s] %(message)s',
                     datefmt='%Y-%m-%d %H:%M:%S')
 logger = logging.getLogger('main')
 
+# seconds from start of import of halina package to the end of import of all modules used by services
+IMPORT_SECONDS = time.perf_counter() - halina.IMPORT_START
+_DEFAULT_IMPORT_BUDGET_MS = 600
+
 
 def get_setting(name: str, settings: dict) -> Optional[str]:
     return settings.get(name, None)
@@ -44,21 +57,94 @@ def read_configuration(**kwargs):
     set_single_setting(GlobalConfig.FROM_EMAIL, kwargs)
     set_single_setting(GlobalConfig.EMAILS_TO, kwargs, False)
     set_single_setting(GlobalConfig.SEND_AT, kwargs, False)
+    set_single_setting(GlobalConfig.EMAIL_OUTBOX_PATH, kwargs)
+    set_single_setting(GlobalConfig.SCHEDULER_STAGGER, kwargs, False)
+    set_single_setting(GlobalConfig.DELIVER_BY, kwargs, False)
+    set_single_setting(GlobalConfig.DELIVER_BY_MIN, kwargs, False)
+    set_single_setting(GlobalConfig.RUN_HISTORY_PATH, kwargs)
+    set_single_setting(GlobalConfig.METRICS_TEXTFILE_PATH, kwargs)
+    set_single_setting(GlobalConfig.METRICS_INTERVAL, kwargs, False)
+    set_single_setting(GlobalConfig.METRICS_PUBLISH, kwargs, False)
+    set_single_setting(GlobalConfig.LOOP_BLOCK_THRESHOLD_MS, kwargs, False)
+    set_single_setting(GlobalConfig.PROFILE_JOBS, kwargs, False)
+    set_single_setting(GlobalConfig.PROFILE_PATH, kwargs)
+    set_single_setting(GlobalConfig.SMTP_START_TLS, kwargs, False)
+    set_single_setting(GlobalConfig.DIAGNOSTICS_SAMPLES, kwargs, False)
+    set_single_setting(GlobalConfig.DIAGNOSTICS_INTERVAL, kwargs, False)
+    set_single_setting(GlobalConfig.IMPORT_BUDGET_MS, kwargs, False)
+    set_single_setting(GlobalConfig.SERVICE_PROCESSES, kwargs, False)
+
+
+def report_import_time():
+    budget = GlobalConfig.get(GlobalConfig.IMPORT_BUDGET_MS, _DEFAULT_IMPORT_BUDGET_MS)
+    import_ms = IMPORT_SECONDS * 1000
+    if import_ms > budget:
+        logger.warning(f"Import of modules took {import_ms:.0f} ms, budget is {budget} ms. Check if some heavy "
+                       f"dependency is not imported at start (python -X importtime -c 'import halina.main')")
+    else:
+        logger.info(f"Import of modules took {import_ms:.0f} ms (budget {budget} ms)")
+
+
+def reload_configuration():
+    """
+    Method reloads settings files (e.g. on SIGHUP). Values from the command line are kept. If the new configuration is
+    invalid the old one is still used.
+    """
+    try:
+        GlobalConfig.load()
+    except ConfigError as e:
+        logger.error(f"Configuration is not reloaded: {e}")
+        return
+    logger.info(f"Configuration reloaded")
+
+
+# services witch can be run in own worker process (SERVICE_PROCESSES)
+_PROCESS_SERVICES = (EmailOutboxService, EmailRapportService, FileRapportService)
+
+
+def create_service(service_cls):
+    """
+    Method creates service, or worker process running it if the service is listed in SERVICE_PROCESSES.
+    """
+    if service_cls._NAME in (GlobalConfig.get(GlobalConfig.SERVICE_PROCESSES) or ()):
+        logger.info(f"Service {service_cls._NAME} runs in own process")
+        return ServiceProcess(service_cls)
+    return service_cls()
 
 
 async def main_coroutine():
+    # started first, so blocking of the loop is detected also during start of other services
+    loop_monitor_service = LoopMonitorService()
     # Nats connection service
     nats_connection_handler_service = NatsConnectionService()
-    email_rapport_service = EmailRapportService()
-    file_rapport_service = FileRapportService()
-
-    services = [nats_connection_handler_service,
+    metrics_exporter_service = MetricsExporterService()
+    unknown = set(GlobalConfig.get(GlobalConfig.SERVICE_PROCESSES) or ()) - {s._NAME for s in _PROCESS_SERVICES}
+    if unknown:
+        logger.warning(f"Services {sorted(unknown)} can't run in own process, SERVICE_PROCESSES accepts only "
+                       f"{[s._NAME for s in _PROCESS_SERVICES]}")
+    email_outbox_service: Service = create_service(EmailOutboxService)
+    email_rapport_service: Service = create_service(EmailRapportService)
+    file_rapport_service: Service = create_service(FileRapportService)
+
+    # one timeline for all nightly jobs. File rapport is started when email rapport is finished, so both don't
+    # compete for NATS at the same time
+    nightly_scheduler_service = NightlySchedulerService()
+    nightly_scheduler_service.add_job(email_rapport_service.nightly_job())
+    nightly_scheduler_service.add_job(file_rapport_service.nightly_job(depends_on=[EmailRapportService._NAME]))
+
+    services = [loop_monitor_service,
+                nats_connection_handler_service,
+                metrics_exporter_service,
+                email_outbox_service,
                 email_rapport_service,
-                file_rapport_service]
+                file_rapport_service,
+                nightly_scheduler_service]
     try:
-        # start all services one by one
-        for s in services:
-            await s.start()
+        # loop monitor is started first, others don't depend on each other, so they are started concurrently
+        await loop_monitor_service.start()
+        await asyncio.gather(*[s.start() for s in services if s is not loop_monitor_service])
+        logger.info(f"All services started, ready {time.perf_counter() - halina.IMPORT_START:.2f} s after start "
+                    f"of import")
 
         # wait for all services finished work or will be canceled. Order doesn't matter.
         for s in services:
@@ -73,6 +159,15 @@ def main(**kwargs):
     if not kwargs:
         kwargs = dict(arg.split('=') for arg in sys.argv[0:] if len(arg.split('=')) == 2)
     read_configuration(**kwargs)
+    # all errors of configuration are reported at start, not when the value is used
+    try:
+        GlobalConfig.load()
+    except ConfigError as e:
+        logger.error(f"{e}")
+        return 1
+    report_import_time()
+    # logs are written in separate thread, not in asyncio loop
+    log_listener = start_queue_logging()
     coro = main_coroutine()
 
     try:
@@ -92,6 +187,7 @@ def main(**kwargs):
         signal.signal(signal.SIGINT, windows_sigint_handler)
     else:
         loop.add_signal_handler(signal.SIGINT, ask_exit)
+        loop.add_signal_handler(signal.SIGHUP, reload_configuration)
 
     try:
         asyncio.set_event_loop(loop)
@@ -114,6 +210,7 @@ def main(**kwargs):
             loop.run_until_complete(loop.shutdown_asyncgens())
         finally:
             loop.close()
+            stop_queue_logging(log_listener)
     return 0
 
 
@@ -0,0 +1,264 @@
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+_LabelsKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels_key(labels: Dict[str, object]) -> _LabelsKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: _LabelsKey, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    items = list(key) + list(extra)
+    if not items:
+        return ''
+    escaped = [(k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in items]
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+class Metric:
+    TYPE = 'untyped'
+
+    def __init__(self, name: str, description: str, registry: 'MetricsRegistry' = None):
+        self.name: str = name
+        self.description: str = description
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+    def render_values(self, values: dict, extra: Sequence[Tuple[str, str]] = ()) -> List[str]:
+        raise NotImplementedError
+
+    def raw(self) -> dict:
+        """
+        Method return copy of values, e.g. to send them from worker process to `MetricsRegistry.set_remote`.
+        """
+        raise NotImplementedError
+
+    def snapshot(self) -> dict:
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """
+    Monotonically growing value, e.g. number of read messages.
+    """
+    TYPE = 'counter'
+
+    def __init__(self, name: str, description: str, registry: 'MetricsRegistry' = None):
+        super().__init__(name=name, description=description, registry=registry)
+        self._values: Dict[_LabelsKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _labels_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(_labels_key(labels), 0)
+
+    def render(self) -> List[str]:
+        return self.render_values(self._values)
+
+    def render_values(self, values: dict, extra: Sequence[Tuple[str, str]] = ()) -> List[str]:
+        return [f"{self.name}{_format_labels(k, extra)} {_format_value(v)}" for k, v in values.items()]
+
+    def raw(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+    def snapshot(self) -> dict:
+        return {'type': self.TYPE, 'values': [{'labels': dict(k), 'value': v} for k, v in self._values.items()]}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values = {}
+
+
+class Gauge(Counter):
+    """
+    Value witch can go up and down, e.g. size of the table or duration of the last run.
+    """
+    TYPE = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        key = _labels_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_max(self, value: float, **labels) -> None:
+        key = _labels_key(labels)
+        with self._lock:
+            if value > self._values.get(key, -math.inf):
+                self._values[key] = value
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values in cumulative buckets, e.g. duration of chart rendering.
+    """
+    TYPE = 'histogram'
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 1800, 3600)
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float] = DEFAULT_BUCKETS,
+                 registry: 'MetricsRegistry' = None):
+        super().__init__(name=name, description=description, registry=registry)
+        self._buckets: Tuple[float, ...] = tuple(sorted(buckets)) + (math.inf,)
+        # labels -> [bucket counts..., sum, count]
+        self._values: Dict[_LabelsKey, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _labels_key(labels)
+        with self._lock:
+            v = self._values.get(key)
+            if v is None:
+                v = [0] * (len(self._buckets) + 2)
+                self._values[key] = v
+            for i, bound in enumerate(self._buckets):
+                if value <= bound:
+                    v[i] += 1
+            v[-2] += value
+            v[-1] += 1
+
+    def count(self, **labels) -> int:
+        v = self._values.get(_labels_key(labels))
+        return int(v[-1]) if v else 0
+
+    def render(self) -> List[str]:
+        return self.render_values(self._values)
+
+    def render_values(self, values: dict, extra: Sequence[Tuple[str, str]] = ()) -> List[str]:
+        out = []
+        extra = list(extra)
+        for k, v in values.items():
+            for i, bound in enumerate(self._buckets):
+                out.append(f"{self.name}_bucket{_format_labels(k, extra + [('le', _format_value(bound))])} {v[i]}")
+            out.append(f"{self.name}_sum{_format_labels(k, extra)} {_format_value(v[-2])}")
+            out.append(f"{self.name}_count{_format_labels(k, extra)} {v[-1]}")
+        return out
+
+    def raw(self) -> dict:
+        with self._lock:
+            return {k: list(v) for k, v in self._values.items()}
+
+    def snapshot(self) -> dict:
+        return {'type': self.TYPE, 'values': [{'labels': dict(k), 'sum': v[-2], 'count': v[-1]}
+                                              for k, v in self._values.items()]}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values = {}
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        # values of metrics collected in other processes: source -> metric name -> raw values
+        self._remote: Dict[str, Dict[str, dict]] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """
+        Method return all metrics in Prometheus text exposition format.
+        """
+        lines = []
+        for m in self._metrics.values():
+            lines.append(f"# HELP {m.name} {m.description}")
+            lines.append(f"# TYPE {m.name} {m.TYPE}")
+            lines.extend(m.render())
+            for source, raw in self._remote.items():
+                values = raw.get(m.name)
+                if values:
+                    lines.extend(m.render_values(values, [('process', source)]))
+        return '\n'.join(lines) + '\n'
+
+    def raw(self) -> Dict[str, dict]:
+        return {name: values for name, values in ((n, m.raw()) for n, m in self._metrics.items()) if values}
+
+    def set_remote(self, source: str, raw: Dict[str, dict]) -> None:
+        """
+        Method replace values of metrics collected in other process (e.g. worker process of service). They are
+        rendered witch additional label `process`.
+
+        :param source: name of the process
+        :param raw: values returned by `raw` in that process
+        """
+        self._remote[source] = raw
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {name: m.snapshot() for name, m in self._metrics.items()}
+
+    def reset(self) -> None:
+        for m in self._metrics.values():
+            m.reset()
+        self._remote = {}
+
+
+# default registry used by all halina metrics
+REGISTRY = MetricsRegistry()
+
+# ----- pipeline metrics -----
+MESSAGES_READ = Counter('halina_messages_read_total', 'Number of messages read from NATS stream')
+MESSAGES_MALFORMED = Counter('halina_messages_malformed_total', 'Number of malformed messages read from NATS stream')
+MALFORMED_FIELDS = Counter('halina_malformed_fields_total', 'Number of malformed messages by the first malformed field')
+READ_RATE = Gauge('halina_stream_read_rate', 'Messages per second read from NATS stream in the last scan')
+JOIN_TABLE_PEAK = Gauge('halina_join_table_peak_size', 'Peak number of not joined fits waiting in the pair table')
+CHART_RENDER_SECONDS = Histogram('halina_chart_render_seconds', 'Time of rendering one chart to png')
+SMTP_SEND_SECONDS = Histogram('halina_smtp_send_seconds', 'Time of sending email to one recipient')
+STAGE_SECONDS = Gauge('halina_stage_duration_seconds', 'Duration of pipeline stage in the last nightly run')
+JOB_SECONDS = Gauge('halina_job_duration_seconds', 'Duration of the last nightly run of the job')
+JOB_FAILURES = Counter('halina_job_failures_total', 'Number of failed nightly job runs')
+LOOP_LAG_SECONDS = Histogram('halina_loop_lag_seconds', 'Delay of waking up sleeping coroutine in asyncio loop',
+                             buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+LOOP_BLOCKS = Counter('halina_loop_blocks_total', 'Number of detected blocks of asyncio loop longer than threshold')
+SERVICE_RESTARTS = Counter('halina_service_restarts_total', 'Number of restarts of crashed service worker process')
+DELIVERY_LATENCY_SECONDS = Gauge('halina_delivery_latency_seconds',
+                                 'Time from the end of the night to delivering the report email')
+
+
+class StreamMeter:
+    """
+    Count messages read from one stream during one scan and publish read rate when the scan is finished.
+    """
+
+    def __init__(self, stream: str):
+        self.stream: str = stream
+        self.count: int = 0
+        self._first: Optional[float] = None
+        self._last: Optional[float] = None
+
+    def tick(self) -> None:
+        now = time.perf_counter()
+        if self._first is None:
+            self._first = now
+        self._last = now
+        self.count += 1
+        MESSAGES_READ.inc(stream=self.stream)
+
+    def malformed(self, field: Optional[str] = None) -> None:
+        MESSAGES_MALFORMED.inc(stream=self.stream)
+        if field is not None:
+            MALFORMED_FIELDS.inc(stream=self.stream, field=field)
+
+    def finish(self) -> None:
+        # rate is measured from first to last message, waiting for empty stream is not included
+        if self._first is not None and self._last > self._first:
+            READ_RATE.set(self.count / (self._last - self._first), stream=self.stream)
@@ -0,0 +1,85 @@
+import asyncio
+import datetime
+import logging
+import os
+from typing import Optional
+
+import aiofiles
+from serverish.messenger import Messenger, single_publish
+
+from configuration import GlobalConfig
+from definitions import VAR_DIR
+from halina.metrics import MetricsRegistry, REGISTRY
+from halina.service import Service
+
+logger = logging.getLogger(__name__.rsplit('.')[-1])
+
+
+class MetricsExporterService(Service):
+    """
+    Service periodically export pipeline metrics to Prometheus textfile (e.g. for node_exporter textfile collector)
+    and, if `METRICS_PUBLISH` is set, publish them to NATS subject `telemetry.halina.metrics`.
+    """
+    _NAME = "MetricsExporterService"
+
+    _DEFAULT_INTERVAL = 60  # seconds
+    _SUBJECT = "telemetry.halina.metrics"
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, **kwargs):
+        super().__init__(**kwargs)
+        self._registry: MetricsRegistry = registry
+        self._path: str = GlobalConfig.get(GlobalConfig.METRICS_TEXTFILE_PATH) or os.path.join(
+            VAR_DIR, 'metrics', 'halina.prom')
+        self._interval: float = GlobalConfig.get(GlobalConfig.METRICS_INTERVAL,
+                                                 MetricsExporterService._DEFAULT_INTERVAL)
+        self._publish: bool = bool(GlobalConfig.get(GlobalConfig.METRICS_PUBLISH, False))
+
+    async def _main(self):
+        try:
+            while True:
+                await self.export()
+                await asyncio.sleep(self._interval)
+        except asyncio.CancelledError:
+            logger.info(f"Metrics exporter service was stopped")
+            raise
+
+    async def _on_start(self):
+        pass
+
+    async def _on_stop(self):
+        # last values are not lost when application is stopped
+        await self._write_textfile()
+
+    async def export(self) -> None:
+        await self._write_textfile()
+        if self._publish:
+            await self._publish_nats()
+
+    async def _write_textfile(self) -> None:
+        tmp_path: Optional[str] = None
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            # textfile collector can read file in any moment, so it is replaced atomically
+            tmp_path = f"{self._path}.{os.getpid()}.tmp"
+            async with aiofiles.open(tmp_path, 'w') as file:
+                await file.write(self._registry.render())
+            os.replace(tmp_path, self._path)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            raise
+        except Exception as e:
+            logger.error(f"Can not write metrics to {self._path}. Error: {e}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    async def _publish_nats(self) -> None:
+        if not Messenger().is_open:
+            logger.debug(f"NATS connection is closed, metrics are not published")
+            return
+        data = {'ts': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                'metrics': self._registry.snapshot()}
+        try:
+            await single_publish(MetricsExporterService._SUBJECT, data)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            raise
+        except Exception as e:
+            logger.warning(f"Can not publish metrics to {MetricsExporterService._SUBJECT}. Error: {e}")
@@ -11,39 +11,43 @@ logger = logging.getLogger(__name__.rsplit('.')[-1])
 
 
 class NatsConnectionService(Service):
+    """
+    Service opens connection to NATS and keeps state `STATE_NATS_CONNECTED` (level triggered event, set while the
+    connection is open). The state is changed by callbacks of NATS client (disconnect, reconnect, close) and by the
+    end of the first connecting, so waiting services are woken up immediately after (re)connect.
+    """
     _NAME = "NatsConnectionService"
 
     EVENT_REFRESH_NATS_CONNECTION = "EVENT_REFRESH_NATS_CONNECTION"
     EVENT_NATS_CONNECTION_OPENED = "EVENT_NATS_CONNECTION_OPENED"
+    STATE_NATS_CONNECTED = "STATE_NATS_CONNECTED"
 
-    _RETRY_INTERVAL = 2
+    # callbacks don't need polling, this is only check if connection was closed and has to be opened again
     _CHECK_CONN_INTERVAL = 30
 
     def __init__(self):
         super().__init__()
         self.shared_data.get_events().set(NatsConnectionService.EVENT_REFRESH_NATS_CONNECTION, asyncio.Event())
         self.shared_data.get_events().set(NatsConnectionService.EVENT_NATS_CONNECTION_OPENED, asyncio.Event())
+        self.shared_data.get_events().set_state(NatsConnectionService.STATE_NATS_CONNECTED, False)
         self._nats_messenger = Messenger()
         self._nats_host: str = GlobalConfig.get(GlobalConfig.NATS_HOST)
         self._nats_port: int = GlobalConfig.get(GlobalConfig.NATS_PORT)
         self._nats_con_fut: Optional[asyncio.Future] = None
+        self._hooked_conn = None  # connection witch callbacks are already wrapped
 
     async def _main(self):
         while True:
-            time_check = False
             try:
                 await wait_for_psce(
                     self.shared_data.get_events().wait(NatsConnectionService.EVENT_REFRESH_NATS_CONNECTION),
                     timeout=NatsConnectionService._CHECK_CONN_INTERVAL)
             except asyncio.TimeoutError:
-                time_check = True
                 pass
-            if self._nats_messenger.is_open:
-                if not time_check:
-                    self.shared_data.get_events().notify(NatsConnectionService.EVENT_NATS_CONNECTION_OPENED)
-                continue
-            else:
+            if self._nats_messenger.conn is None:
                 await self._open_connection()
+            else:
+                self._update_state()
 
     async def _on_start(self):
         await self._open_connection()
@@ -54,30 +58,50 @@ class NatsConnectionService(Service):
         if self._nats_messenger.is_open:
             logger.warning(f"Connection to NATS has not been closed")
         await self._stop_nats_con_fut()
+        self.shared_data.get_events().set_state(NatsConnectionService.STATE_NATS_CONNECTED, False)
 
     async def _open_connection(self):
         if self._nats_messenger.conn is None:
             logger.info(f"Creating connection to NATS: {self._nats_host}:{self._nats_port}")
             self._t = await self._nats_messenger.open(self._nats_host, self._nats_port, wait=0)
+        self._hook_callbacks()
+        self._update_state()
 
-        # connection open immediately
-        if self._nats_messenger.is_open:
-            logger.info(f"NATS connection opened")
-            self.shared_data.get_events().notify(NatsConnectionService.EVENT_NATS_CONNECTION_OPENED)
-        else:  # Connecting in background
+        # first connecting in background, state is updated when it is finished. Reconnects are reported by callbacks
+        if not self._nats_messenger.is_open and self._nats_messenger.opener_task is not None \
+                and not self._nats_messenger.opener_task.done():
             if self._nats_con_fut is None or self._nats_con_fut.done():
-                # start waiting to background connection
                 logger.info(f"Connection to NATS wasn't created. Start opening in background.")
-                # first connect
-                if self._nats_messenger.opener_task is not None and not self._nats_messenger.opener_task.done():
-                    logger.warning("create first connect background")
-                    self._nats_con_fut = asyncio.ensure_future(self._nats_con_fut_callback())
-                else:  # reconnect
-                    logger.warning("create reconnect")
-                    self._nats_con_fut = asyncio.ensure_future(self._wait_to_conn())
-            else:
-                # connection in progress
-                logger.debug(f"Connecting to NATS in progress")
+                self._nats_con_fut = asyncio.ensure_future(self._nats_con_fut_callback())
+
+    def _hook_callbacks(self):
+        conn = self._nats_messenger.conn
+        if conn is None or conn is self._hooked_conn:
+            return
+        self._hooked_conn = conn
+        # connection calls these methods by attribute on every event of NATS client, state is updated after them
+        for name in ('nats_disconnected_cb', 'nats_reconnected_cb', 'nats_closed_cb'):
+            setattr(conn, name, self._after_callback(getattr(conn, name)))
+
+    def _after_callback(self, callback):
+        async def wrapped(*args):
+            try:
+                await callback(*args)
+            finally:
+                self._update_state()
+        return wrapped
+
+    def _update_state(self):
+        connected = self._nats_messenger.is_open
+        events = self.shared_data.get_events()
+        if connected == events.is_state(NatsConnectionService.STATE_NATS_CONNECTED):
+            return
+        events.set_state(NatsConnectionService.STATE_NATS_CONNECTED, connected)
+        if connected:
+            logger.info(f"NATS connection opened")
+            events.notify(NatsConnectionService.EVENT_NATS_CONNECTION_OPENED)
+        else:
+            logger.warning(f"NATS connection lost")
 
     async def _nats_con_fut_callback(self):
         if self._nats_messenger.opener_task is not None:
@@ -90,8 +114,7 @@ class NatsConnectionService(Service):
             except asyncio.TimeoutError:
                 logger.info(f"NATS Messenger opener_task has timeout")
                 raise
-            if self._nats_messenger.is_open:
-                self.shared_data.get_events().notify(NatsConnectionService.EVENT_NATS_CONNECTION_OPENED)
+            self._update_state()
             self._nats_con_fut = None
 
     async def _stop_nats_con_fut(self):
@@ -100,14 +123,3 @@ class NatsConnectionService(Service):
                 self._nats_con_fut.cancel()
                 logger.info(f"NATS connection future was canceled")
             self._nats_con_fut = None
-
-    async def _wait_to_conn(self):
-        # nothing better can't create for now
-        while True:
-            logger.debug("Waiting for reconnect to NATS")
-            if self._nats_messenger.conn is None:
-                return False
-            if self._nats_messenger.is_open:
-                self.shared_data.get_events().notify(NatsConnectionService.EVENT_NATS_CONNECTION_OPENED)
-                return True
-            await asyncio.sleep(NatsConnectionService._RETRY_INTERVAL)
@@ -0,0 +1,27 @@
+import dataclasses
+import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+
+@dataclasses.dataclass
+class NightlyJob:
+    name: str
+    run: Callable[[], Awaitable[Optional[Dict[str, float]]]]  # coroutine can return duration of stages
+    priority: int = 0  # jobs witch lower value are started first
+    depends_on: List[str] = dataclasses.field(default_factory=list)  # names of jobs witch have to finish first
+
+
+@dataclasses.dataclass
+class JobRun:
+    name: str
+    start: datetime.datetime
+    end: Optional[datetime.datetime] = None
+    success: Optional[bool] = None
+    error: str = ''
+    stages: Dict[str, float] = dataclasses.field(default_factory=dict)
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.end is None:
+            return None
+        return (self.end - self.start).total_seconds()
@@ -0,0 +1,169 @@
+import asyncio
+import datetime
+import logging
+from typing import Dict, List, Optional
+
+from configuration import GlobalConfig
+from halina.date_utils import DateUtils
+from halina.metrics import JOB_SECONDS, JOB_FAILURES
+from halina.nightly_job import NightlyJob, JobRun
+from halina.run_history import RunHistory
+from halina.service import Service
+
+logger = logging.getLogger(__name__.rsplit('.')[-1])
+
+
+class NightlySchedulerService(Service):
+    """
+    Service owning the nightly timeline. Registered jobs are started in priority order. Job witch dependencies starts
+    when all of them are finished, independent jobs are staggered by `SCHEDULER_STAGGER` seconds, so they don't scan
+    NATS streams at the same moment.
+
+    Jobs are started at SEND_AT, or if DELIVER_BY is configured, as late as possible to be finished at DELIVER_BY.
+    The expected duration of the night is predicted from the history of previous runs.
+    """
+    _NAME = "NightlySchedulerService"
+
+    _DEFAULT_STAGGER = 60  # seconds between start of independent jobs
+    _DEFAULT_JOB_DURATION = 1800  # prediction for job without history
+    _PREDICTION_PERCENTILE = 0.9
+    _SAFETY_MARGIN = 300  # seconds added to predicted duration
+    _DATA_MARGIN = 60  # night data are complete at local midday, start not earlier than this margin after
+
+    def __init__(self, history: Optional[RunHistory] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._send_at_time = datetime.time(GlobalConfig.get(GlobalConfig.SEND_AT),
+                                           GlobalConfig.get(GlobalConfig.SEND_AT_MIN))
+        deliver_by = GlobalConfig.get(GlobalConfig.DELIVER_BY)
+        self._deliver_by_time: Optional[datetime.time] = None
+        if deliver_by is not None:
+            self._deliver_by_time = datetime.time(deliver_by, GlobalConfig.get(GlobalConfig.DELIVER_BY_MIN, 0))
+        self._stagger: float = GlobalConfig.get(GlobalConfig.SCHEDULER_STAGGER,
+                                                NightlySchedulerService._DEFAULT_STAGGER)
+        self._jobs: Dict[str, NightlyJob] = {}
+        self.history: RunHistory = history or RunHistory()
+        self._last_run_date: Optional[datetime.date] = None
+
+    def add_job(self, job: NightlyJob) -> None:
+        """
+        Method register job. Dependencies have to be registered before, so cycles are not possible.
+        """
+        if job.name in self._jobs:
+            raise ValueError(f"Job {job.name} is already registered")
+        for dep in job.depends_on:
+            if dep not in self._jobs:
+                raise ValueError(f"Job {job.name} depends on not registered job {dep}")
+        self._jobs[job.name] = job
+
+    def _ordered_jobs(self) -> List[NightlyJob]:
+        return sorted(self._jobs.values(), key=lambda j: (j.priority, j.name))
+
+    def _stagger_delays(self) -> Dict[str, float]:
+        independent = [j.name for j in self._ordered_jobs() if not j.depends_on]
+        return {name: i * self._stagger for i, name in enumerate(independent)}
+
+    def predict_duration(self) -> float:
+        """
+        Method predict duration of the whole night timeline from recent runs of every job.
+
+        :return: predicted time in seconds from start of the first job to the end of the last job
+        """
+        delays = self._stagger_delays()
+        finish: Dict[str, float] = {}
+        # dependencies are always registered before, so registration order is a topological order
+        for job in self._jobs.values():
+            duration = self.history.percentile(name=job.name, q=NightlySchedulerService._PREDICTION_PERCENTILE)
+            if duration is None:
+                duration = NightlySchedulerService._DEFAULT_JOB_DURATION
+            start = max([finish[d] for d in job.depends_on], default=delays.get(job.name, 0))
+            finish[job.name] = start + duration
+        return max(finish.values(), default=0)
+
+    def _next_start_time(self, now: datetime.datetime) -> datetime.datetime:
+        day = now.date()
+        if self._last_run_date is not None and self._last_run_date >= day:
+            day = self._last_run_date + datetime.timedelta(days=1)
+        if self._deliver_by_time is None:
+            start = datetime.datetime.combine(day, self._send_at_time, tzinfo=datetime.timezone.utc)
+            # if we start application after sending time wait until next day
+            if start < now:
+                start = start + datetime.timedelta(days=1)
+            return start
+        predicted = self.predict_duration() + NightlySchedulerService._SAFETY_MARGIN
+        while True:
+            deliver_by = datetime.datetime.combine(day, self._deliver_by_time, tzinfo=datetime.timezone.utc)
+            earliest = DateUtils.local_midday_in_utc(day) + datetime.timedelta(
+                seconds=NightlySchedulerService._DATA_MARGIN)
+            start = max(deliver_by - datetime.timedelta(seconds=predicted), earliest)
+            if start > deliver_by:
+                logger.warning(f"DELIVER_BY {self._deliver_by_time} is before the end of the night, "
+                               f"jobs will be started at {start.time()}")
+            if deliver_by > now:
+                # application started too late to be on time, start as soon as possible
+                return max(start, now)
+            day = day + datetime.timedelta(days=1)
+
+    async def _main(self):
+        try:
+            while True:
+                now = datetime.datetime.now(datetime.timezone.utc)
+                start_at = self._next_start_time(now)
+                logger.info(f"Next nightly jobs start at: {start_at}")
+                await asyncio.sleep((start_at - now).total_seconds())
+                logger.info(f"Start nightly jobs today: {start_at.date()}")
+                self._last_run_date = start_at.date()
+                runs = await self._run_night()
+                for run in runs:
+                    self.history.add(run)
+                await self.history.save()
+                if self._deliver_by_time is not None:
+                    delivered = datetime.datetime.combine(start_at.date(), self._deliver_by_time,
+                                                          tzinfo=datetime.timezone.utc)
+                    late = (max(r.end for r in runs) - delivered).total_seconds() if runs else 0
+                    if late > 0:
+                        logger.warning(f"Nightly jobs finished {late / 60:.1f} min after DELIVER_BY")
+        except asyncio.CancelledError:
+            logger.info(f"Nightly scheduler service was stopped")
+            raise
+
+    async def _on_start(self):
+        pass
+
+    async def _on_stop(self):
+        pass
+
+    async def _run_night(self) -> List[JobRun]:
+        finished: Dict[str, asyncio.Event] = {j.name: asyncio.Event() for j in self._jobs.values()}
+        delays = self._stagger_delays()
+        coros = [self._run_job(job=job, delay=delays.get(job.name, 0), finished=finished)
+                 for job in self._ordered_jobs()]
+        return await asyncio.gather(*coros)
+
+    async def _run_job(self, job: NightlyJob, delay: float, finished: Dict[str, asyncio.Event]) -> JobRun:
+        try:
+            if delay > 0:
+                await asyncio.sleep(delay)
+            for dep in job.depends_on:
+                await finished[dep].wait()
+            run = JobRun(name=job.name, start=datetime.datetime.now(datetime.timezone.utc))
+            logger.info(f"Job {job.name} started")
+            try:
+                stages = await job.run()
+                run.stages = stages or {}
+                run.success = True
+            except (asyncio.CancelledError, KeyboardInterrupt):
+                raise
+            except Exception as e:
+                run.success = False
+                run.error = str(e) or type(e).__name__
+                logger.error(f"Job {job.name} cath error: {run.error}")
+            finally:
+                run.end = datetime.datetime.now(datetime.timezone.utc)
+            JOB_SECONDS.set(run.duration, job=job.name)
+            if not run.success:
+                JOB_FAILURES.inc(job=job.name)
+            logger.info(f"Job {job.name} finished {'successfully' if run.success else 'with error'}. "
+                        f"Proces takes {run.duration / 60:.2f} min")
+            return run
+        finally:
+            finished[job.name].set()
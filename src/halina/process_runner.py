@@ -0,0 +1,277 @@
+import asyncio
+import logging
+import multiprocessing
+import signal
+import sys
+import threading
+import time
+from multiprocessing.connection import Connection
+from typing import Dict, List, Optional, Sequence, Set, Type
+
+from configuration import GlobalConfig
+from halina.asyncio_util_functions import wait_for_psce
+from halina.metrics import REGISTRY, SERVICE_RESTARTS
+from halina.nats_connection_service import NatsConnectionService
+from halina.nightly_job import NightlyJob
+from halina.service import Service
+from halina.service_nats_dependent import ServiceNatsDependent
+from halina.service_shared_data import ServiceSharedData
+
+logger = logging.getLogger(__name__.rsplit('.')[-1])
+
+# messages between supervisor and worker are tuples (kind, ...):
+# supervisor -> worker: ('event', name), ('run', run_id), ('stop',)
+# worker -> supervisor: ('ready',), ('event', name), ('result', run_id, stages), ('error', run_id, exception),
+#                       ('metrics', raw values of REGISTRY)
+
+_LOG_FORMAT = '%(asctime)s [%(levelname)s] [%(processName)s] [%(name)s] %(message)s'
+
+
+class WorkerCrashedException(Exception):
+    pass
+
+
+def _read_messages(conn: Connection, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue) -> None:
+    # blocking reading of the pipe in separate thread, None means that the other side closed the pipe
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            msg = None
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, msg)
+        except RuntimeError:  # loop is closed
+            return
+        if msg is None:
+            return
+
+
+def _send(conn: Connection, msg: tuple) -> bool:
+    try:
+        conn.send(msg)
+        return True
+    except (OSError, ValueError):  # the other side is closed, it is detected by the reading thread
+        return False
+
+
+class ServiceProcess(Service):
+    """
+    Service run in own worker process witch own asyncio loop, so CPU heavy work of one service doesn't slow down
+    others and crash of the service doesn't stop the program. The worker is restarted when it exits unexpectedly.
+    Events of `ServiceSharedData` are relayed between processes, nightly runs are requested by `nightly_job` like for
+    `ServiceScheduled`. Metrics of the worker are exported by this process witch label `process`.
+    """
+
+    _STOP_TIMEOUT = 30  # seconds to wait for the worker after stop request
+    _READY_TIMEOUT = 300  # seconds to wait for (re)started worker when run is requested
+    _MAX_RESTART_DELAY = 60
+    _STABLE_TIME = 60  # worker working longer than this is restarted without delay
+
+    # running workers, events from one worker are relayed to all others
+    _running: List['ServiceProcess'] = []
+
+    def __init__(self, service_cls: Type[Service], restart_delay: float = 1, **kwargs):
+        super().__init__()
+        self._NAME = service_cls._NAME
+        self._service_cls: Type[Service] = service_cls
+        self._service_kwargs: dict = kwargs
+        self._restart_delay: float = restart_delay
+        self._process: Optional[multiprocessing.Process] = None
+        self._conn: Optional[Connection] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._runs: Dict[int, asyncio.Future] = {}
+        self._next_run_id: int = 0
+        self._stopping: bool = False
+        self.restarts: int = 0
+
+    async def _on_start(self):
+        self._stopping = False
+        self._ready = asyncio.Event()
+        self.shared_data.get_events().add_listener(self._send_event)
+        ServiceProcess._running.append(self)
+
+    async def _on_stop(self):
+        self._stopping = True
+        self.shared_data.get_events().remove_listener(self._send_event)
+        if self in ServiceProcess._running:
+            ServiceProcess._running.remove(self)
+        process = self._process
+        if process is not None and process.is_alive():
+            if self._conn is not None:
+                _send(self._conn, ('stop',))
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, process.join, ServiceProcess._STOP_TIMEOUT)
+            if process.is_alive():
+                logger.warning(f"Worker of {self._NAME} doesn't stop, it is terminated")
+                process.terminate()
+                await loop.run_in_executor(None, process.join, ServiceProcess._STOP_TIMEOUT)
+
+    async def _main(self):
+        failures = 0
+        while True:
+            started = time.monotonic()
+            messages = self._start_worker()
+            await self._receive(messages)
+            exitcode = await self._reap_worker()
+            if self._stopping:
+                return
+            if time.monotonic() - started > ServiceProcess._STABLE_TIME:
+                failures = 0
+            delay = min(self._restart_delay * 2 ** failures, ServiceProcess._MAX_RESTART_DELAY) if failures else 0
+            failures += 1
+            self.restarts += 1
+            SERVICE_RESTARTS.inc(service=self._NAME)
+            logger.error(f"Worker of {self._NAME} exited witch code {exitcode}, restart in {delay:.0f} s")
+            await asyncio.sleep(delay)
+
+    def _start_worker(self) -> asyncio.Queue:
+        ctx = multiprocessing.get_context('spawn')
+        parent_conn, child_conn = ctx.Pipe()
+        self._process = ctx.Process(target=_worker_main, name=self._NAME,
+                                    args=(self._service_cls, self._service_kwargs, GlobalConfig.overrides(),
+                                          child_conn))
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        messages = asyncio.Queue()
+        threading.Thread(target=_read_messages, args=(parent_conn, asyncio.get_running_loop(), messages),
+                         name=f"halina-{self._NAME}-reader", daemon=True).start()
+        logger.info(f"Worker of {self._NAME} started, pid {self._process.pid}")
+        return messages
+
+    async def _reap_worker(self) -> Optional[int]:
+        self._ready.clear()
+        conn, self._conn = self._conn, None
+        conn.close()
+        process = self._process
+        await asyncio.get_running_loop().run_in_executor(None, process.join, ServiceProcess._STOP_TIMEOUT)
+        if process.is_alive():
+            process.terminate()
+            await asyncio.get_running_loop().run_in_executor(None, process.join, ServiceProcess._STOP_TIMEOUT)
+        for fut in self._runs.values():
+            if not fut.done():
+                fut.set_exception(WorkerCrashedException(f"Worker of {self._NAME} exited witch code "
+                                                         f"{process.exitcode}"))
+        self._runs = {}
+        return process.exitcode
+
+    async def _receive(self, messages: asyncio.Queue) -> None:
+        while True:
+            msg = await messages.get()
+            if msg is None:
+                return
+            kind = msg[0]
+            if kind == 'ready':
+                self._ready.set()
+            elif kind == 'event':
+                self.shared_data.get_events().notify(msg[1], propagate=False)
+                for worker in ServiceProcess._running:
+                    if worker is not self:
+                        worker._send_event(msg[1])
+            elif kind == 'result' or kind == 'error':
+                fut = self._runs.pop(msg[1], None)
+                if fut is not None and not fut.done():
+                    if kind == 'result':
+                        fut.set_result(msg[2])
+                    else:
+                        fut.set_exception(msg[2])
+            elif kind == 'metrics':
+                REGISTRY.set_remote(self._NAME, msg[1])
+
+    def _send_event(self, name: str) -> None:
+        if self._conn is not None:
+            _send(self._conn, ('event', name))
+
+    async def run_scheduled(self) -> Dict[str, float]:
+        """
+        Method request one night run in the worker and wait until it is finished. Exception raised by run is
+        propagated, crash of the worker during run raises `WorkerCrashedException`.
+
+        :return: duration of every stage of the run in seconds
+        """
+        try:
+            await wait_for_psce(self._ready.wait(), timeout=ServiceProcess._READY_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise WorkerCrashedException(f"Worker of {self._NAME} is not running")
+        run_id = self._next_run_id
+        self._next_run_id += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._runs[run_id] = fut
+        _send(self._conn, ('run', run_id))
+        return await fut
+
+    def nightly_job(self, priority: Optional[int] = None, depends_on: Sequence[str] = ()) -> NightlyJob:
+        return NightlyJob(name=self._NAME,
+                          run=self.run_scheduled,
+                          priority=getattr(self._service_cls, '_PRIORITY', 0) if priority is None else priority,
+                          depends_on=list(depends_on))
+
+
+def _worker_main(service_cls: Type[Service], service_kwargs: dict, overrides: dict, conn: Connection) -> None:
+    # worker is stopped by the supervisor, Ctrl+C in terminal is handled only by the main process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO, format=_LOG_FORMAT, datefmt='%Y-%m-%d %H:%M:%S')
+    for name, value in overrides.items():
+        GlobalConfig.set(name, value)
+    GlobalConfig.load()
+    sys.exit(asyncio.run(_worker_coroutine(service_cls, service_kwargs, conn)))
+
+
+async def _worker_coroutine(service_cls: Type[Service], service_kwargs: dict, conn: Connection) -> int:
+    loop = asyncio.get_running_loop()
+    events = ServiceSharedData().get_events()
+    messages = asyncio.Queue()
+    threading.Thread(target=_read_messages, args=(conn, loop, messages), name="halina-supervisor-reader",
+                     daemon=True).start()
+    service = service_cls(**service_kwargs)
+    services: List[Service] = [service]
+    if isinstance(service, ServiceNatsDependent):
+        # connection to NATS can't be shared between processes
+        services.insert(0, NatsConnectionService())
+    events.add_listener(lambda name: _send(conn, ('event', name)))
+    runs: Set[asyncio.Task] = set()
+    stop_requested = False
+    try:
+        for s in services:
+            await s.start()
+        # crash of the service ends the worker, so the supervisor restarts it
+        service._main_task.add_done_callback(lambda _: messages.put_nowait(None))
+        _send(conn, ('ready',))
+        while True:
+            msg = await messages.get()
+            if msg is None:
+                break
+            kind = msg[0]
+            if kind == 'stop':
+                stop_requested = True
+                break
+            elif kind == 'event':
+                events.notify(msg[1], propagate=False)
+            elif kind == 'run':
+                task = loop.create_task(_run(service, msg[1], conn))
+                runs.add(task)
+                task.add_done_callback(runs.discard)
+    finally:
+        for task in list(runs):
+            task.cancel()
+        for s in reversed(services):
+            await s.stop()
+        _send(conn, ('metrics', REGISTRY.raw()))
+        conn.close()
+    return 0 if stop_requested else 1
+
+
+async def _run(service: Service, run_id: int, conn: Connection) -> None:
+    try:
+        stages = await service.run_scheduled()
+    except Exception as e:
+        _send(conn, ('metrics', REGISTRY.raw()))
+        try:
+            conn.send(('error', run_id, e))
+        except (OSError, ValueError):
+            pass
+        except Exception:  # exception can't be pickled
+            _send(conn, ('error', run_id, RuntimeError(f"{type(e).__name__}: {e}")))
+    else:
+        _send(conn, ('metrics', REGISTRY.raw()))
+        _send(conn, ('result', run_id, stages))
@@ -0,0 +1,100 @@
+import asyncio
+import datetime
+import json
+import logging
+import math
+import os
+from typing import List, Optional
+
+import aiofiles
+
+from configuration import GlobalConfig
+from definitions import VAR_DIR
+from halina.nightly_job import JobRun
+
+logger = logging.getLogger(__name__.rsplit('.')[-1])
+
+
+class RunHistory:
+    """
+    Persistent history of nightly job runs witch duration of every stage. It is used to predict how long the next
+    night will take.
+    """
+
+    _MAX_RUNS_PER_JOB = 60
+    _WINDOW = 14  # number of recent runs used to prediction
+
+    def __init__(self, path: Optional[str] = None):
+        self._path: str = path or GlobalConfig.get(GlobalConfig.RUN_HISTORY_PATH) or os.path.join(
+            VAR_DIR, 'run_history.json')
+        self.runs: List[JobRun] = []
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self._path):
+            return
+        try:
+            with open(self._path, 'r') as file:
+                data = json.load(file)
+            for r in data:
+                self.runs.append(JobRun(name=r['name'],
+                                        start=datetime.datetime.fromisoformat(r['start']),
+                                        end=datetime.datetime.fromisoformat(r['end']) if r.get('end') else None,
+                                        success=r.get('success'),
+                                        error=r.get('error', ''),
+                                        stages=r.get('stages', {})))
+        except Exception as e:
+            logger.error(f"Can not read run history {self._path}. Error: {e}")
+            self.runs = []
+
+    def add(self, run: JobRun) -> None:
+        self.runs.append(run)
+        job_runs = [r for r in self.runs if r.name == run.name]
+        if len(job_runs) > RunHistory._MAX_RUNS_PER_JOB:
+            self.runs.remove(job_runs[0])
+
+    async def save(self) -> None:
+        data = [{'name': r.name,
+                 'start': r.start.isoformat(),
+                 'end': r.end.isoformat() if r.end else None,
+                 'success': r.success,
+                 'error': r.error,
+                 'stages': r.stages} for r in self.runs]
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            tmp_path = f"{self._path}.tmp"
+            async with aiofiles.open(tmp_path, 'w') as file:
+                await file.write(json.dumps(data))
+            os.replace(tmp_path, self._path)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            raise
+        except Exception as e:
+            logger.error(f"Can not save run history {self._path}. Error: {e}")
+
+    def durations(self, name: str, stage: Optional[str] = None) -> List[float]:
+        """
+        Method return durations of recent successful runs of job, or of one stage of the job.
+        """
+        out = []
+        for r in self.runs:
+            if r.name != name or not r.success or r.duration is None:
+                continue
+            if stage is None:
+                out.append(r.duration)
+            elif stage in r.stages:
+                out.append(r.stages[stage])
+        return out[-RunHistory._WINDOW:]
+
+    def percentile(self, name: str, q: float, stage: Optional[str] = None) -> Optional[float]:
+        return RunHistory._percentile(self.durations(name=name, stage=stage), q)
+
+    @staticmethod
+    def _percentile(values: List[float], q: float) -> Optional[float]:
+        """
+        Nearest-rank percentile, `q` from range 0-1.
+        """
+        if not values:
+            return None
+        ordered = sorted(values)
+        rank = max(math.ceil(q * len(ordered)), 1)
+        return ordered[rank - 1]
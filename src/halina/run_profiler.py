@@ -0,0 +1,147 @@
+import asyncio
+import cProfile
+import datetime
+import io
+import json
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+from configuration import GlobalConfig
+from definitions import VAR_DIR
+
+logger = logging.getLogger(__name__.rsplit('.')[-1])
+
+
+class RunProfiler:
+    """
+    Profiling of one nightly run of the job. Run is profiled by deterministic profiler (cProfile) and memory
+    allocations are traced by tracemalloc. At every stage boundary (see `StageTimer`) memory snapshot is taken.
+    Results are written to timestamped directory in `PROFILE_PATH`:
+
+    - `profile.prof` - cProfile stats, can be opened e.g. by snakeviz,
+    - `profile.txt` - the most expensive functions sorted by cumulative time,
+    - `stages.json` - duration, peak RSS and peak traced memory of every stage,
+    - `allocations.txt` - top allocation sites of the whole run and of every stage.
+
+    Profiler is created only for jobs listed in `PROFILE_JOBS`, so when profiling is disabled there is no overhead.
+    Profiler is enabled in the asyncio loop thread, so it also measures other services working at the same time.
+    """
+
+    _TRACEBACK_LIMIT = 10
+    _TOP_FUNCTIONS = 60
+    _TOP_ALLOCATIONS = 25
+    _TOP_STAGE_ALLOCATIONS = 10
+    _CLEAR_REFS = '/proc/self/clear_refs'
+    _STATUS = '/proc/self/status'
+
+    def __init__(self, job: str, directory: Optional[str] = None):
+        self.job: str = job
+        timestamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        base = directory or GlobalConfig.get(GlobalConfig.PROFILE_PATH) or os.path.join(VAR_DIR, 'profiles')
+        self.path: str = os.path.join(base, f"{job}_{timestamp}")
+        self._profile: Optional[cProfile.Profile] = None
+        self._first_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._stage_snapshots: Dict[str, tracemalloc.Snapshot] = {}
+        self._stage_start: Dict[str, float] = {}
+        self.stages: Dict[str, dict] = {}
+        self._stage_allocations: Dict[str, List[tracemalloc.StatisticDiff]] = {}
+        self._tracemalloc_started: bool = False
+
+    @staticmethod
+    def for_job(job: str) -> Optional['RunProfiler']:
+        """
+        Method return profiler if profiling of the job is enabled, otherwise None.
+        """
+        jobs = GlobalConfig.get(GlobalConfig.PROFILE_JOBS) or []
+        if job in jobs or '*' in jobs:
+            return RunProfiler(job=job)
+        return None
+
+    def start(self) -> None:
+        logger.info(f"Profiling of {self.job} started")
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(RunProfiler._TRACEBACK_LIMIT)
+            self._tracemalloc_started = True
+        self._first_snapshot = tracemalloc.take_snapshot()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stage_started(self, name: str) -> None:
+        RunProfiler.reset_peak_rss()
+        tracemalloc.reset_peak()
+        self._stage_snapshots[name] = tracemalloc.take_snapshot()
+        self._stage_start[name] = time.perf_counter()
+
+    def stage_finished(self, name: str) -> None:
+        duration = time.perf_counter() - self._stage_start.pop(name, time.perf_counter())
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        start_snapshot = self._stage_snapshots.pop(name, None)
+        if start_snapshot is not None:
+            self._stage_allocations[name] = snapshot.compare_to(start_snapshot, 'lineno')[
+                                            :RunProfiler._TOP_STAGE_ALLOCATIONS]
+        self.stages[name] = {'duration_s': duration,
+                             'peak_rss_kb': RunProfiler.peak_rss_kb(),
+                             'traced_peak_bytes': peak,
+                             'traced_current_bytes': current}
+
+    async def stop(self) -> None:
+        """
+        Method stop profiling and write results. Writing is done in thread to not block the loop.
+        """
+        self._profile.disable()
+        snapshot = tracemalloc.take_snapshot()
+        if self._tracemalloc_started:
+            tracemalloc.stop()
+        try:
+            await asyncio.to_thread(self._write, snapshot)
+            logger.info(f"Profile of {self.job} saved in {self.path}")
+        except OSError as e:
+            logger.error(f"Can not save profile of {self.job} to {self.path}. Error: {e}")
+
+    def _write(self, snapshot: tracemalloc.Snapshot) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        self._profile.dump_stats(os.path.join(self.path, 'profile.prof'))
+        out = io.StringIO()
+        pstats.Stats(self._profile, stream=out).sort_stats('cumulative').print_stats(RunProfiler._TOP_FUNCTIONS)
+        with open(os.path.join(self.path, 'profile.txt'), 'w') as file:
+            file.write(out.getvalue())
+        with open(os.path.join(self.path, 'stages.json'), 'w') as file:
+            json.dump(self.stages, file, indent=4)
+        with open(os.path.join(self.path, 'allocations.txt'), 'w') as file:
+            file.write(f"Top allocations of the whole run {self.job}\n")
+            for stat in snapshot.compare_to(self._first_snapshot, 'lineno')[:RunProfiler._TOP_ALLOCATIONS]:
+                file.write(f"{stat}\n")
+            for name, stats in self._stage_allocations.items():
+                file.write(f"\nTop allocations of stage {name}\n")
+                for stat in stats:
+                    file.write(f"{stat}\n")
+
+    @staticmethod
+    def reset_peak_rss() -> None:
+        # on linux peak RSS (VmHWM) can be reset, so it is measured separately for every stage
+        try:
+            with open(RunProfiler._CLEAR_REFS, 'w') as file:
+                file.write('5')
+        except OSError:
+            pass
+
+    @staticmethod
+    def peak_rss_kb() -> int:
+        try:
+            with open(RunProfiler._STATUS) as file:
+                for line in file:
+                    if line.startswith('VmHWM:'):
+                        return int(line.split()[1])
+        except (OSError, ValueError, IndexError):
+            pass
+        try:
+            import resource
+        except ImportError:  # windows
+            return 0
+        # peak of the whole process lifetime
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
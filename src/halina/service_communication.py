@@ -1,10 +1,12 @@
 import asyncio
+from typing import Callable, List
 
 
 class ServiceCommunication:
 
     def __init__(self):
         self._data = {}
+        self._listeners: List[Callable[[str], None]] = []
 
     def get(self, name) -> asyncio.Event:
         """
@@ -24,13 +26,29 @@ class ServiceCommunication:
         """
         self._data[name] = val
 
-    def notify(self, name) -> bool:
+    def add_listener(self, listener: Callable[[str], None]) -> None:
+        """
+        Method add function called witch name of every notified event (e.g. to relay events to other processes).
+
+        :param listener: function called witch event name
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def notify(self, name, propagate: bool = True) -> bool:
         """
         Method set and clear asyncio event.
 
         :param name: evnet name
+        :param propagate: if false listeners are not called, used for events relayed from other processes
         :return: true if event was call successfully and false if not
         """
+        if propagate:
+            for listener in self._listeners:
+                listener(name)
         e = self.get(name)
         if e:
             e.set()
@@ -38,6 +56,33 @@ class ServiceCommunication:
             return True
         return False
 
+    def set_state(self, name, value: bool) -> None:
+        """
+        Method set (true) or clear (false) level triggered event. Unlike `notify` the event stays set, so waiter
+        witch starts waiting later doesn't miss it. States are local for the process, listeners are not called.
+
+        :param name: evnet name, event is created if it doesn't exist
+        :param value: new state
+        """
+        e = self.get(name)
+        if e is None:
+            e = asyncio.Event()
+            self.set(name, e)
+        if value:
+            e.set()
+        else:
+            e.clear()
+
+    def is_state(self, name) -> bool:
+        """
+        Method check if level triggered event is set.
+
+        :param name: evnet name
+        :return: true if event exist and is set
+        """
+        e = self.get(name)
+        return e is not None and e.is_set()
+
     async def wait(self, name):
         """
         Method wait for event set.
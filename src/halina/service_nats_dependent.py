@@ -18,16 +18,16 @@ class ServiceNatsDependent(Service, ABC):
     async def _wait_to_open_nats(self, deadline: datetime.datetime) -> bool:
         if self._nats_messenger.is_open:
             return True
-        if not self.shared_data.get_events().is_exist(
-                NatsConnectionService.EVENT_REFRESH_NATS_CONNECTION) or not self.shared_data.get_events().is_exist(
-                NatsConnectionService.EVENT_NATS_CONNECTION_OPENED):
+        events = self.shared_data.get_events()
+        if not events.is_exist(NatsConnectionService.EVENT_REFRESH_NATS_CONNECTION) or not events.is_exist(
+                NatsConnectionService.STATE_NATS_CONNECTED):
             return False
-        self.shared_data.get_events().notify(NatsConnectionService.EVENT_REFRESH_NATS_CONNECTION)
+        # connection is opened again if it was closed, reconnects are done by NATS client
+        events.notify(NatsConnectionService.EVENT_REFRESH_NATS_CONNECTION)
         time = (deadline - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
         try:
-            await wait_for_psce(
-                self.shared_data.get_events().wait(NatsConnectionService.EVENT_NATS_CONNECTION_OPENED),
-                timeout=time)
+            # state stays set while connection is open, so the wakeup can't be missed
+            await wait_for_psce(events.wait(NatsConnectionService.STATE_NATS_CONNECTED), timeout=time)
         except asyncio.TimeoutError:
             pass
         return self._nats_messenger.is_open
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Sequence
+
+from halina.nightly_job import NightlyJob
+from halina.run_profiler import RunProfiler
+from halina.service_nats_dependent import ServiceNatsDependent
+from halina.stage_timer import StageTimer
+
+logger = logging.getLogger(__name__.rsplit('.')[-1])
+
+
+class ServiceScheduled(ServiceNatsDependent, ABC):
+    """
+    Service witch nightly work is started by `NightlySchedulerService`. The work is always executed inside the
+    service main task, so stopping the service also stops the work in progress.
+    """
+
+    _PRIORITY = 0
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._run_requests: Optional[asyncio.Queue] = None
+        self._stages: StageTimer = StageTimer(job=self._NAME)  # new timer for every run
+
+    @property
+    def _requests(self) -> asyncio.Queue:
+        if self._run_requests is None:
+            self._run_requests = asyncio.Queue()
+        return self._run_requests
+
+    @abstractmethod
+    async def _run_night(self):
+        pass
+
+    async def _main(self):
+        try:
+            while True:
+                fut: asyncio.Future = await self._requests.get()
+                if fut.done():
+                    continue
+                profiler = RunProfiler.for_job(self._NAME)
+                self._stages = StageTimer(job=self._NAME, profiler=profiler)
+                if profiler is not None:
+                    profiler.start()
+                try:
+                    await self._run_night()
+                except (asyncio.CancelledError, KeyboardInterrupt):
+                    fut.cancel()
+                    raise
+                except Exception as e:
+                    fut.set_exception(e)
+                else:
+                    fut.set_result(self._stages.stages)
+                finally:
+                    if profiler is not None:
+                        await profiler.stop()
+        except asyncio.CancelledError:
+            logger.info(f"Service {self._NAME} was stopped")
+            raise
+
+    async def run_scheduled(self) -> Dict[str, float]:
+        """
+        Method request one night run and wait until it is finished. Exception raised by run is propagated.
+
+        :return: duration of every stage of the run in seconds
+        """
+        fut = asyncio.get_running_loop().create_future()
+        await self._requests.put(fut)
+        return await fut
+
+    def nightly_job(self, priority: Optional[int] = None, depends_on: Sequence[str] = ()) -> NightlyJob:
+        return NightlyJob(name=self._NAME,
+                          run=self.run_scheduled,
+                          priority=self._PRIORITY if priority is None else priority,
+                          depends_on=list(depends_on))
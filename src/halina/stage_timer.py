@@ -0,0 +1,35 @@
+import contextlib
+import logging
+import time
+from typing import Dict, Optional
+
+from halina.metrics import STAGE_SECONDS
+from halina.run_profiler import RunProfiler
+
+logger = logging.getLogger(__name__.rsplit('.')[-1])
+
+
+class StageTimer:
+    """
+    Measure duration of named pipeline stages of one run, e.g. collect, charts, build.
+    """
+
+    def __init__(self, job: str = '', profiler: Optional[RunProfiler] = None):
+        self.job: str = job
+        self.profiler: Optional[RunProfiler] = profiler  # None when profiling is disabled
+        self.stages: Dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        if self.profiler is not None:
+            self.profiler.stage_started(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            if self.profiler is not None:
+                self.profiler.stage_finished(name)
+            self.stages[name] = self.stages.get(name, 0) + duration
+            STAGE_SECONDS.set(self.stages[name], job=self.job, stage=name)
+            logger.info(f"Stage {name} finished. Proces takes: {duration:.2f} s")
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import time
+from typing import Iterable, Optional
+
+from nats.js import JetStreamContext
+from serverish.messenger import Messenger
+
+logger = logging.getLogger(__name__)
+
+
+class BulkPublisher:
+    """
+    Publisher of many messages over one connection. Messages are published to JetStream without waiting for the ack
+    of every single message, acks are collected in background and at most `in_flight` messages wait for the ack at
+    the same time. Messages are in the serverish format, so they are readable by serverish readers.
+
+    Optionally the rate of publishing is limited to `rate` messages per second.
+    """
+
+    def __init__(self, host: str, port: int, in_flight: int = 1000, rate: Optional[float] = None):
+        self.host: str = host
+        self.port: int = port
+        self.in_flight: int = in_flight
+        self.rate: Optional[float] = rate
+        self.published: int = 0
+        self.acked: int = 0
+        self.errors: int = 0
+        self._messenger: Messenger = Messenger()
+        self._js: Optional[JetStreamContext] = None
+        self._opened_here: bool = False
+        self._start: Optional[float] = None
+        self._end: Optional[float] = None
+
+    async def open(self) -> None:
+        # connection of messenger is reused if it is already open
+        if self._messenger.conn is None or self._messenger.conn.nc is None or not self._messenger.conn.nc.is_connected:
+            await self._messenger.open(self.host, self.port, wait=5)
+            self._opened_here = True
+        self._js = self._messenger.conn.nc.jetstream(publish_async_max_pending=self.in_flight)
+
+    async def close(self) -> None:
+        await self.flush()
+        if self._opened_here:
+            await self._messenger.close()
+            self._opened_here = False
+        self._js = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def publish(self, subject: str, data: dict, meta: Optional[dict] = None) -> None:
+        if self._js is None:
+            raise RuntimeError("Publisher is not open")
+        if self._start is None:
+            self._start = time.perf_counter()
+        if self.rate:
+            await self._throttle()
+        payload = self._messenger.encode(self._messenger.create_msg(data, meta))
+        # waits only if `in_flight` messages are waiting for ack
+        future = await self._js.publish_async(subject, payload)
+        future.add_done_callback(self._on_ack)
+        self.published += 1
+
+    async def publish_many(self, subject: str, messages: Iterable[dict]) -> int:
+        """
+        Method publish all messages to subject.
+
+        :return: number of published messages
+        """
+        count = 0
+        for data in messages:
+            await self.publish(subject, data)
+            count += 1
+        return count
+
+    async def flush(self) -> None:
+        """
+        Method wait for acks of all published messages.
+        """
+        if self._js is not None and self._js.publish_async_pending():
+            await self._js.publish_async_completed()
+        if self._start is not None:
+            self._end = time.perf_counter()
+
+    async def _throttle(self) -> None:
+        # time when the next message should be published to keep the rate
+        ahead = self._start + self.published / self.rate - time.perf_counter()
+        if ahead > 0.005:
+            await asyncio.sleep(ahead)
+
+    def _on_ack(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self.errors += 1
+        elif future.exception() is not None:
+            if self.errors == 0:
+                logger.error(f"Message was not acknowledged: {future.exception()!r}")
+            self.errors += 1
+        else:
+            self.acked += 1
+
+    @property
+    def duration(self) -> float:
+        if self._start is None:
+            return 0.0
+        return (self._end or time.perf_counter()) - self._start
+
+    @property
+    def achieved_rate(self) -> float:
+        return self.acked / self.duration if self.duration else 0.0
@@ -65,12 +65,21 @@ class DataPublisher:
         utcnow_array = [now.year, now.month, now.day, now.hour, now.minute, now.second, now.microsecond]
         return utcnow_array
 
+    @staticmethod
+    def _copy_fits(original_data, key):
+        # only dicts witch changed fields are copied, the rest of template is shared
+        copy = dict(original_data)
+        copy[key] = dict(original_data[key])
+        copy[key]['header'] = dict(original_data[key]['header'])
+        copy[key]['objects'] = dict(original_data[key]['objects'])
+        return copy
+
     @staticmethod
     def create_copies(original_data, random_values):
         logger.info("Creating raw data copies")
         copies = []
         for values in random_values:
-            copy = json.loads(json.dumps(original_data))  # Deep copy
+            copy = DataPublisher._copy_fits(original_data, 'raw')
             copy['raw']['header']['TELESCOP'] = values["TELESCOP"]
             copy['raw']['header']['FILTER'] = values["FILTER"]
             copy['fits_id'] = values["id"]
@@ -87,7 +96,7 @@ class DataPublisher:
         zdf_copies = []
         for values in random_values:
             if random.random() < 0.8:  # 80% chance of occurrence
-                copy = json.loads(json.dumps(original_data))  # Deep copy
+                copy = DataPublisher._copy_fits(original_data, 'zdf')
                 copy['zdf']['header']['TELESCOP'] = values["TELESCOP"]
                 copy['zdf']['header']['FILTER'] = values["FILTER"]
                 copy['fits_id'] = values["id"]
@@ -105,7 +114,8 @@ class DataPublisher:
         logger.info("Creating download data copies")
         download_copies = []
         for values in random_values:
-            copy = json.loads(json.dumps(original_data))  # Deep copy
+            copy = dict(original_data)
+            copy['param'] = dict(original_data['param'])
             copy['param']['filter'] = values["FILTER"]
             copy['param']['date_obs'] = values["DATE-OBS"]
             copy['param']['target_name'] = values["OBJECT_NAME"]
@@ -115,13 +125,16 @@ class DataPublisher:
             download_copies.append(copy)
         return download_copies
 
+    @staticmethod
+    def subject(telescope, stream):
+        if stream == "download":
+            return f"tic.status.{telescope}.download"
+        return f"tic.status.{telescope}.fits.pipeline.{stream}"
+
     @staticmethod
     async def publish_data(telescope, stream, data, host, port):
         messenger = Messenger()
         await messenger.open(host, port, wait=5)
-        if stream == "download":
-            publisher = messenger.get_publisher(f"tic.status.{telescope}.download")
-        else:
-            publisher = messenger.get_publisher(f"tic.status.{telescope}.fits.pipeline.{stream}")
+        publisher = messenger.get_publisher(DataPublisher.subject(telescope, stream))
         await publisher.publish(data)
         await messenger.close()
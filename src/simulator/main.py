@@ -1,7 +1,11 @@
 import asyncio
 import logging
+from .bulk_publisher import BulkPublisher
 from .data_publisher import DataPublisher
+from .message_file import write_jsonl
+from .scenario import NightScenario
 import argparse
+import datetime
 import os
 
 logger = logging.getLogger(__name__)
@@ -11,7 +15,7 @@ logging.getLogger('connection_nats').setLevel(logging.WARNING)
 logging.getLogger('messenger').setLevel(logging.WARNING)
 
 
-async def main(num_copies, host, port, telescopes, only_download):
+async def main(num_copies, host, port, telescopes, only_download, in_flight=1000, rate=None):
     data_publisher = DataPublisher(telescopes)
 
     raw_original_data = await data_publisher.read_json('raw')
@@ -33,24 +37,39 @@ async def main(num_copies, host, port, telescopes, only_download):
         all_zdf_copies.extend(zdf_copies)
         all_download_copies.extend(download_copies)
 
-    raw_data_list = []
-    zdf_data_list = []
-    download_data_list = []
+    logger.info("Publishing data to NATS server")
+    async with BulkPublisher(host, port, in_flight=in_flight, rate=rate) as publisher:
+        for raw, zdf, download in zip(all_raw_copies, all_zdf_copies, all_download_copies):
+            telescope = raw['raw']['header']['TELESCOP']
+            await publisher.publish(data_publisher.subject(telescope, "download"), download)
+
+            if not only_download:
+                await publisher.publish(data_publisher.subject(telescope, "raw"), raw)
+                if zdf:  # Publish only non-empty records
+                    await publisher.publish(data_publisher.subject(telescope, "zdf"), zdf)
+
+    logger.info(f"Published {publisher.published} messages ({publisher.acked} acknowledged, {publisher.errors} "
+                f"failed) in {publisher.duration:.2f} s, achieved rate {publisher.achieved_rate:.0f} msgs/s")
+    logger.info("Data publishing completed")
+
+
+async def main_scenario(host, port, telescopes, night, seed, output, in_flight=1000, rate=None):
+    templates = {name: await DataPublisher.read_json(name) for name in ['raw', 'zdf', 'download']}
+    scenario = NightScenario(templates, telescopes, night=night, seed=seed)
+    logger.info(f"Generating night {scenario.night} (sunset {scenario.sunset}, sunrise {scenario.sunrise}) "
+                f"for telescopes {telescopes}")
+    if output:
+        count = write_jsonl(output, scenario.messages())
+        logger.info(f"Saved {count} messages to {output}")
+        return
 
     logger.info("Publishing data to NATS server")
-    for raw, zdf, download in zip(all_raw_copies, all_zdf_copies, all_download_copies):
-        telescope = raw['raw']['header']['TELESCOP']
-        await data_publisher.publish_data(telescope, "download", download, host, port)
-        download_data_list.append(download)
-
-        if not only_download:
-            await data_publisher.publish_data(telescope, "raw", raw, host, port)
-            raw_data_list.append(raw)
-            if zdf:  # Publish only non-empty records
-                await data_publisher.publish_data(telescope, "zdf", zdf, host, port)
-                zdf_data_list.append(zdf)
+    async with BulkPublisher(host, port, in_flight=in_flight, rate=rate) as publisher:
+        for message in scenario.messages():
+            await publisher.publish(message.subject, message.data)
 
-    logger.info("Data publishing completed")
+    logger.info(f"Published {publisher.published} messages ({publisher.acked} acknowledged, {publisher.errors} "
+                f"failed) in {publisher.duration:.2f} s, achieved rate {publisher.achieved_rate:.0f} msgs/s")
 
 
 def run():
@@ -62,6 +81,18 @@ def run():
     parser.add_argument("--telescopes", type=str, default=os.getenv("TELESCOPES", "zb08,jk15"),
                         help="Comma-separated list of telescopes")
     parser.add_argument("--only_download", action='store_true', help="If set, only publish download data")
+    parser.add_argument("--in_flight", type=int, default=os.getenv("IN_FLIGHT", 1000),
+                        help="Maximum number of published messages waiting for JetStream ack")
+    parser.add_argument("--rate", type=float, default=os.getenv("RATE", None),
+                        help="Target rate in messages per second, unlimited if not set")
+    parser.add_argument("--scenario", action='store_true',
+                        help="If set, publish the whole night witch calibration frames, faststat and telemetry "
+                             "instead of copies")
+    parser.add_argument("--night", type=datetime.date.fromisoformat, default=os.getenv("NIGHT", None),
+                        help="Date of the evening the night of scenario starts (default: yesterday)")
+    parser.add_argument("--seed", type=int, default=os.getenv("SEED", 0), help="Seed of scenario")
+    parser.add_argument("--output", type=str, default=None,
+                        help="If set, scenario is saved to this JSONL file instead of publishing")
 
     args = parser.parse_args()
 
@@ -69,7 +100,12 @@ def run():
 
     telescopes = args.telescopes.split(',')
 
-    asyncio.run(main(args.num_copies, args.host, args.port, telescopes, args.only_download))
+    if args.scenario:
+        asyncio.run(main_scenario(args.host, args.port, telescopes, args.night, args.seed, args.output, args.in_flight,
+                                  args.rate))
+    else:
+        asyncio.run(main(args.num_copies, args.host, args.port, telescopes, args.only_download, args.in_flight,
+                         args.rate))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,45 @@
+import datetime
+import gzip
+import json
+from typing import IO, Iterable, Iterator, NamedTuple, Optional
+
+
+class TimedMessage(NamedTuple):
+    time: datetime.datetime  # time when the message is published
+    subject: str
+    data: dict
+    meta: Optional[dict] = None
+
+
+def _open(path: str, mode: str) -> IO[str]:
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def write_jsonl(path: str, messages: Iterable[TimedMessage]) -> int:
+    """
+    Method write messages to JSONL file, one message per line: publishing time, subject, data and optionally meta.
+    File is compressed if its name ends witch '.gz'.
+
+    :return: number of written messages
+    """
+    count = 0
+    with _open(path, 'w') as file:
+        for m in messages:
+            record = {'time': m.time.isoformat(), 'subject': m.subject, 'data': m.data}
+            if m.meta is not None:
+                record['meta'] = m.meta
+            file.write(json.dumps(record))
+            file.write('\n')
+            count += 1
+    return count
+
+
+def read_jsonl(path: str) -> Iterator[TimedMessage]:
+    with _open(path, 'r') as file:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                yield TimedMessage(datetime.datetime.fromisoformat(record['time']), record['subject'],
+                                   record['data'], record.get('meta'))
@@ -0,0 +1,161 @@
+import argparse
+import asyncio
+import datetime
+import heapq
+import logging
+import os
+import tempfile
+import time
+from typing import Iterable, List, Optional
+
+from serverish.base import dt_from_array, dt_to_array
+from serverish.messenger import Messenger, get_reader
+
+from .bulk_publisher import BulkPublisher
+from .message_file import TimedMessage, read_jsonl, write_jsonl
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+logging.getLogger('connection_nats').setLevel(logging.WARNING)
+logging.getLogger('messenger').setLevel(logging.WARNING)
+
+DEFAULT_SUBJECTS = ['tic.status.*.download', 'tic.status.*.fits.pipeline.>', 'tic.config.observatory',
+                    'telemetry.weather.davis', 'telemetry.power.data-manager']
+
+_READ_TIMEOUT = 2  # seconds, stream is empty if there is no message for this time
+_LATE_MARGIN = datetime.timedelta(hours=1)  # messages of stream are not published in strict order of their time
+
+
+def _message_time(meta: dict, nats_meta: dict) -> datetime.datetime:
+    # time of the publisher is kept when the message is replayed, JetStream time is used only if it is missing
+    return dt_from_array(meta.get('ts') or nats_meta['timestamp'])
+
+
+async def _capture_subject(subject: str, start: datetime.datetime, end: datetime.datetime,
+                           path: str) -> int:
+    reader = get_reader(subject, deliver_policy='by_start_time', opt_start_time=start)
+    messages: List[TimedMessage] = []
+    try:
+        await reader.open()
+        while True:
+            try:
+                data, meta = await asyncio.wait_for(reader.read_next(), _READ_TIMEOUT)
+            except asyncio.TimeoutError:
+                break
+            nats_meta = meta.pop('nats', {})
+            t = _message_time(meta, nats_meta)
+            if t > end + _LATE_MARGIN:
+                break
+            if start <= t <= end:
+                messages.append(TimedMessage(t, nats_meta.get('subject', subject), data, meta))
+            if nats_meta.get('num_pending') == 0:
+                break
+    finally:
+        await reader.close()
+    messages.sort(key=lambda m: m.time)
+    return write_jsonl(path, messages)
+
+
+async def capture(host: str, port: int, subjects: List[str], start: datetime.datetime, end: datetime.datetime,
+                  output: str) -> int:
+    """
+    Method dump messages of subjects published between start and end to (compressed if the name ends witch '.gz')
+    JSONL file, in the order of their original time. Subjects can contain wildcards.
+
+    :return: number of captured messages
+    """
+    await Messenger().open(host, port, wait=5)
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # every subject is dumped separately and files are merged, so the night doesn't have to be in memory
+            paths = []
+            for i, subject in enumerate(subjects):
+                path = os.path.join(tmp_dir, f'{i}.jsonl')
+                count = await _capture_subject(subject, start, end, path)
+                logger.info(f"Captured {count} messages of {subject}")
+                paths.append(path)
+            return write_jsonl(output, heapq.merge(*[read_jsonl(p) for p in paths], key=lambda m: m.time))
+    finally:
+        await Messenger().close()
+
+
+async def replay(host: str, port: int, messages: Iterable[TimedMessage], speed: Optional[float] = 1.0,
+                 in_flight: int = 1000) -> BulkPublisher:
+    """
+    Method publish messages keeping their relative timing, `speed` times faster than originally. If speed is None or
+    0 messages are published as fast as possible. Original time of the message is kept in its meta.
+
+    :return: publisher witch statistics of publishing
+    """
+    async with BulkPublisher(host, port, in_flight=in_flight) as publisher:
+        first = None
+        wall_start = time.perf_counter()
+        for m in messages:
+            if first is None:
+                first = m.time
+            if speed:
+                ahead = wall_start + (m.time - first).total_seconds() / speed - time.perf_counter()
+                if ahead > 0.005:
+                    await asyncio.sleep(ahead)
+            meta = dict(m.meta) if m.meta else {}
+            meta['ts'] = dt_to_array(m.time)
+            await publisher.publish(m.subject, m.data, meta)
+    return publisher
+
+
+def _night_window(night: datetime.date, timezone: float):
+    start = (datetime.datetime.combine(night, datetime.time(12), tzinfo=datetime.timezone.utc)
+             - datetime.timedelta(hours=timezone))
+    return start, start + datetime.timedelta(days=1)
+
+
+def _parse_datetime(value: str) -> datetime.datetime:
+    t = datetime.datetime.fromisoformat(value)
+    return t if t.tzinfo else t.replace(tzinfo=datetime.timezone.utc)
+
+
+def run_capture():
+    parser = argparse.ArgumentParser(description="Dump messages of the night from NATS to JSONL file.")
+    parser.add_argument("--host", type=str, default=os.getenv("NATS_HOST", "localhost"), help="NATS server host")
+    parser.add_argument("--port", type=int, default=os.getenv("NATS_PORT", 4222), help="NATS server port")
+    parser.add_argument("--subjects", type=str, default=','.join(DEFAULT_SUBJECTS),
+                        help="Comma-separated list of subjects, wildcards are allowed")
+    parser.add_argument("--night", type=datetime.date.fromisoformat, default=None,
+                        help="Date of the evening the night starts, window is from local midday to local midday")
+    parser.add_argument("--timezone", type=float, default=os.getenv("OBSERVATORY_TIMEZONE", 0),
+                        help="Timezone of the observatory in hours, used witch --night")
+    parser.add_argument("--start", type=_parse_datetime, default=None, help="Start of window, ISO format (UTC)")
+    parser.add_argument("--end", type=_parse_datetime, default=None, help="End of window, ISO format (UTC)")
+    parser.add_argument("--output", type=str, required=True, help="Output JSONL file, compressed if ends witch .gz")
+    args = parser.parse_args()
+
+    if args.night is not None:
+        start, end = _night_window(args.night, args.timezone)
+    elif args.start is not None and args.end is not None:
+        start, end = args.start, args.end
+    else:
+        parser.error("--night or both --start and --end are required")
+        return
+
+    logger.info(f"Capturing messages from {start} to {end}")
+    count = asyncio.run(capture(args.host, args.port, args.subjects.split(','), start, end, args.output))
+    logger.info(f"Saved {count} messages to {args.output}")
+
+
+def run_replay():
+    parser = argparse.ArgumentParser(description="Publish messages from JSONL file keeping their relative timing.")
+    parser.add_argument("input", type=str, help="JSONL file saved by capture or simulator --scenario --output")
+    parser.add_argument("--host", type=str, default=os.getenv("NATS_HOST", "localhost"), help="NATS server host")
+    parser.add_argument("--port", type=int, default=os.getenv("NATS_PORT", 4222), help="NATS server port")
+    parser.add_argument("--speed", type=str, default="1",
+                        help="Speed of replay: 1 is real time, e.g. 60 is 60 times faster, 'max' is without waiting")
+    parser.add_argument("--in_flight", type=int, default=os.getenv("IN_FLIGHT", 1000),
+                        help="Maximum number of published messages waiting for JetStream ack")
+    args = parser.parse_args()
+
+    speed = None if args.speed == 'max' else float(args.speed)
+    publisher = asyncio.run(replay(args.host, args.port, read_jsonl(args.input), speed=speed,
+                                   in_flight=args.in_flight))
+    logger.info(f"Replayed {publisher.published} messages ({publisher.acked} acknowledged, {publisher.errors} "
+                f"failed) in {publisher.duration:.2f} s, achieved rate {publisher.achieved_rate:.0f} msgs/s")
@@ -0,0 +1,255 @@
+import datetime
+import heapq
+import logging
+import math
+import random
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from pyaraucaria.date import datetime_to_julian
+
+from .message_file import TimedMessage
+
+logger = logging.getLogger(__name__)
+
+
+class Frame(NamedTuple):
+    fits_id: str
+    image_type: str
+    obj: str
+    filter: str
+    exptime: float
+    date_obs: datetime.datetime
+    fwhm: float
+
+
+class NightScenario:
+    """
+    Seeded generator of the whole observation night of telescopes. Frames are planned like a real night: zero and dark
+    frames before the dusk, sky flats in the evening twilight, focusing, blocks of science frames of targets witch
+    snap frames and refocusing, morning flats and darks. Night is placed around the solar midnight of the observatory
+    longitude.
+
+    For every frame download, raw, zdf (science only) and faststat messages are generated, together witch the
+    observatory config and weather and power telemetry of the whole day (midday to midday). Messages are generated
+    lazily and in the order of publishing time. Templates are copied structurally, only dicts witch changed fields are
+    copied, the rest is shared between messages.
+    """
+
+    FILTERS = ['u', 'g', 'r', 'i', 'z', 'B', 'V', 'Ic']
+    SCIENCE_EXPTIMES = [10, 30, 60, 120, 300]
+    READOUT = 10  # seconds between the end of exposure and the download message
+    PIPELINE_DELAY = 5  # seconds between download and raw message, the next steps of pipeline are delayed the same
+    TWILIGHT = datetime.timedelta(minutes=70)  # from sunset to the astronomical night
+    TELEMETRY_INTERVAL = 60  # seconds
+
+    def __init__(self, templates: Dict[str, dict], telescopes: List[str], night: Optional[datetime.date] = None,
+                 seed: int = 0, night_hours: float = 10.0, lon: float = -70.196389, lat: float = -24.598056,
+                 elev: float = 2817):
+        """
+        :param templates: messages 'raw', 'zdf' and 'download' used as templates
+        :param night: date of the evening the night starts, default yesterday
+        """
+        self.templates: Dict[str, dict] = templates
+        self.telescopes: List[str] = telescopes
+        self.night: datetime.date = night or (datetime.datetime.now(datetime.timezone.utc).date()
+                                              - datetime.timedelta(days=1))
+        self.seed: int = seed
+        self.lon: float = lon
+        self.lat: float = lat
+        self.elev: float = elev
+        # solar midnight of the observatory, sunset and sunrise are symmetric to it
+        midnight = (datetime.datetime.combine(self.night + datetime.timedelta(days=1), datetime.time(0),
+                                              tzinfo=datetime.timezone.utc)
+                    - datetime.timedelta(hours=lon / 15))
+        self.sunset: datetime.datetime = midnight - datetime.timedelta(hours=night_hours / 2)
+        self.sunrise: datetime.datetime = midnight + datetime.timedelta(hours=night_hours / 2)
+        self.midday: datetime.datetime = midnight - datetime.timedelta(hours=12)
+
+    def messages(self) -> Iterator[TimedMessage]:
+        streams = [self._observatory_config(), self._weather(), self._power()]
+        streams += [self._telescope(tel, i) for i, tel in enumerate(self.telescopes)]
+        return heapq.merge(*streams, key=lambda m: m.time)
+
+    def frames(self, telescope: str, index: int = 0) -> Iterator[Frame]:
+        """
+        Method plan frames of one night of telescope.
+        """
+        rnd = random.Random(f"{self.seed}-{index}")
+        counter = iter(range(1_000_000))
+        jd_prefix = int(datetime_to_julian(self.sunset)) % 10000
+
+        def frame(image_type: str, t: datetime.datetime, exptime: float, filter_: str = 'V', obj: str = '',
+                  fwhm: float = 0.0) -> Frame:
+            return Frame(fits_id=f"{telescope}c_{jd_prefix:04d}_{next(counter):05d}", image_type=image_type,
+                         obj=obj or image_type, filter=filter_, exptime=exptime, date_obs=t, fwhm=fwhm)
+
+        def calibration(image_type: str, t: datetime.datetime, count: int, exptime: float) -> Iterator[Frame]:
+            for _ in range(count):
+                yield frame(image_type, t, exptime)
+                t += datetime.timedelta(seconds=exptime + NightScenario.READOUT)
+
+        # calibration before the dusk
+        t = self.sunset - datetime.timedelta(hours=2)
+        yield from calibration('zero', t, 20, 0)
+        t += datetime.timedelta(minutes=10)
+        yield from calibration('dark', t, 10, 60)
+
+        # evening flats, exposure is getting longer witch the sky getting darker
+        t = self.sunset + datetime.timedelta(minutes=10)
+        for filter_ in rnd.sample(NightScenario.FILTERS, 4):
+            for k in range(5):
+                exptime = round(1 + 2 ** k * rnd.uniform(0.5, 1.5), 1)
+                yield frame('flat', t, exptime, filter_=filter_, obj='sky_flat')
+                t += datetime.timedelta(seconds=exptime + NightScenario.READOUT)
+
+        # science between twilights, seeing drifts during the night
+        t = max(t, self.sunset + NightScenario.TWILIGHT)
+        night_end = self.sunrise - NightScenario.TWILIGHT
+        seeing = rnd.uniform(2.0, 4.0)
+        last_focus = None
+        while t < night_end:
+            if last_focus is None or t - last_focus > datetime.timedelta(hours=2):
+                for _ in range(rnd.randint(7, 11)):
+                    yield frame('focusing', t, 5, obj='focus', fwhm=seeing * rnd.uniform(1.0, 2.5))
+                    t += datetime.timedelta(seconds=5 + NightScenario.READOUT)
+                last_focus = t
+            t += datetime.timedelta(seconds=rnd.uniform(60, 180))  # slew
+            if rnd.random() < 0.1:
+                yield frame('snap', t, 1, obj='snap', fwhm=seeing)
+                t += datetime.timedelta(seconds=1 + NightScenario.READOUT)
+            obj = f"target_{rnd.randrange(60):02d}"
+            exptime = rnd.choice(NightScenario.SCIENCE_EXPTIMES)
+            filters = rnd.sample(NightScenario.FILTERS, rnd.randint(1, 3))
+            for _ in range(rnd.randint(3, 15)):
+                if t >= night_end:
+                    break
+                for filter_ in filters:
+                    seeing = min(max(seeing + rnd.gauss(0, 0.05), 1.5), 8.0)
+                    yield frame('science', t, exptime, filter_=filter_, obj=obj, fwhm=seeing * rnd.uniform(0.9, 1.1))
+                    t += datetime.timedelta(seconds=exptime + NightScenario.READOUT)
+
+        # morning flats and calibration after the sunrise
+        t = max(t, night_end + datetime.timedelta(minutes=20))
+        for filter_ in rnd.sample(NightScenario.FILTERS, 4):
+            for k in range(5):
+                exptime = round(1 + 2 ** (4 - k) * rnd.uniform(0.5, 1.5), 1)
+                yield frame('flat', t, exptime, filter_=filter_, obj='sky_flat')
+                t += datetime.timedelta(seconds=exptime + NightScenario.READOUT)
+        t = max(t, self.sunrise + datetime.timedelta(minutes=30))
+        yield from calibration('dark', t, 10, 60)
+
+    def _telescope(self, telescope: str, index: int) -> Iterator[TimedMessage]:
+        rnd = random.Random(f"{self.seed}-{index}-pipeline")
+        delay = datetime.timedelta(seconds=NightScenario.PIPELINE_DELAY)
+        pending: List[tuple] = []  # (time, sequence, message), sequence keeps order of messages witch the same time
+        sequence = 0
+        for f in self.frames(telescope, index):
+            downloaded = f.date_obs + datetime.timedelta(seconds=f.exptime + NightScenario.READOUT)
+            messages = [TimedMessage(downloaded, f"tic.status.{telescope}.download", self._download(telescope, f)),
+                        TimedMessage(downloaded + delay, f"tic.status.{telescope}.fits.pipeline.raw",
+                                        self._fits('raw', telescope, f)),
+                        TimedMessage(downloaded + 2 * delay, f"tic.status.{telescope}.fits.pipeline.faststat",
+                                        self._fits('faststat', telescope, f, rnd))]
+            if f.image_type == 'science':
+                messages.append(TimedMessage(downloaded + 3 * delay, f"tic.status.{telescope}.fits.pipeline.zdf",
+                                                self._fits('zdf', telescope, f)))
+            # messages of frame can be published after the download of the next frame
+            for m in messages:
+                heapq.heappush(pending, (m.time, sequence, m))
+                sequence += 1
+            while pending and pending[0][0] <= downloaded:
+                yield heapq.heappop(pending)[2]
+        while pending:
+            yield heapq.heappop(pending)[2]
+
+    def _download(self, telescope: str, f: Frame) -> dict:
+        template = self.templates['download']
+        msg = dict(template)
+        param = dict(template['param'])
+        param['image_type'] = f.image_type
+        param['obs_type'] = f.image_type
+        param['filter'] = f.filter
+        param['target_name'] = f.obj
+        param['date_obs'] = f.date_obs.replace(tzinfo=None).isoformat()
+        param['raw_file_name'] = f"{f.fits_id}.fits"
+        msg['param'] = param
+        msg['fits_id'] = f.fits_id
+        msg['telescope_id'] = telescope
+        t = f.date_obs + datetime.timedelta(seconds=f.exptime + NightScenario.READOUT)
+        msg['ts'] = [t.year, t.month, t.day, t.hour, t.minute, t.second, t.microsecond]
+        return msg
+
+    def _fits(self, name: str, telescope: str, f: Frame, rnd: Optional[random.Random] = None) -> dict:
+        key = 'zdf' if name == 'zdf' else 'raw'
+        template = self.templates[key][key]
+        content = dict(template)
+        header = dict(template['header'])
+        header['TELESCOP'] = telescope
+        header['IMAGETYP'] = f.image_type
+        header['OBSTYPE'] = f.image_type
+        header['OBJECT'] = f.obj
+        header['FILTER'] = f.filter
+        header['EXPTIME'] = f.exptime
+        header['DATE-OBS'] = f.date_obs.replace(tzinfo=None).isoformat()
+        header['JD'] = datetime_to_julian(f.date_obs)
+        content['header'] = header
+        content['file_name'] = f"{f.fits_id}.fits"
+        if f.image_type == 'science':
+            # objects of the template are shared, only the key is changed
+            content['objects'] = {f.obj: next(iter(template['objects'].values()))}
+        else:
+            content['objects'] = {}
+        if name == 'faststat':
+            content['fwhm'] = {'fwhm_x': f.fwhm * rnd.uniform(0.95, 1.05), 'fwhm_y': f.fwhm * rnd.uniform(0.95, 1.05)}
+        return {'fits_id': f.fits_id, key: content}
+
+    def _observatory_config(self) -> Iterator[TimedMessage]:
+        colors = ['#2277ff', '#ff7722', '#22aa44', '#aa22aa']
+        telescopes = {tel: {'observatory': {'style': {'color': colors[i % len(colors)]},
+                                            'lat': self.lat, 'lon': self.lon, 'elev': self.elev}}
+                      for i, tel in enumerate(self.telescopes)}
+        yield TimedMessage(self.midday, 'tic.config.observatory', {'config': {'telescopes': telescopes}})
+
+    def _telemetry_times(self) -> Iterator[datetime.datetime]:
+        step = datetime.timedelta(seconds=NightScenario.TELEMETRY_INTERVAL)
+        t = self.midday
+        while t < self.midday + datetime.timedelta(days=1):
+            yield t
+            t += step
+
+    @staticmethod
+    def _ts(t: datetime.datetime) -> List[int]:
+        return [t.year, t.month, t.day, t.hour, t.minute, t.second, t.microsecond]
+
+    def _weather(self) -> Iterator[TimedMessage]:
+        rnd = random.Random(f"{self.seed}-weather")
+        wind, wind_dir, pressure = rnd.uniform(0, 8), rnd.uniform(0, 360), rnd.uniform(74000, 75000)
+        for t in self._telemetry_times():
+            # temperature is the lowest before the sunrise
+            phase = (t - self.sunrise).total_seconds() / 86400
+            temperature = 12 - 6 * math.cos(2 * math.pi * phase) + rnd.gauss(0, 0.2)
+            wind = min(max(wind + rnd.gauss(0, 0.3), 0), 25)
+            wind_dir = (wind_dir + rnd.gauss(0, 3)) % 360
+            pressure += rnd.gauss(0, 5)
+            yield TimedMessage(t, 'telemetry.weather.davis', {'ts': self._ts(t), 'measurements': {
+                'wind_10min_ms': wind,
+                'temperature_C': temperature,
+                'humidity': min(max(40 + 3 * (12 - temperature) + rnd.gauss(0, 2), 5), 100),
+                'wind_dir_deg': wind_dir,
+                'pressure_Pa': pressure}})
+
+    def _power(self) -> Iterator[TimedMessage]:
+        rnd = random.Random(f"{self.seed}-power")
+        charge = rnd.uniform(60, 90)
+        interval_h = NightScenario.TELEMETRY_INTERVAL / 3600
+        for t in self._telemetry_times():
+            day = t < self.sunset or t > self.sunrise
+            pv_power = max(rnd.gauss(2500, 200), 0) if day else 0.0
+            load = rnd.uniform(600, 900)
+            balance = pv_power - load
+            charge = min(max(charge + balance * interval_h / 100, 0), 100)
+            yield TimedMessage(t, 'telemetry.power.data-manager', {'ts': self._ts(t), 'measurements': {
+                'state_of_charge': charge,
+                'pv_power': pv_power,
+                'battery_charge': max(balance, 0),
+                'battery_discharge': max(-balance, 0)}})
@@ -0,0 +1,88 @@
+import asyncio
+import contextlib
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+from unittest.mock import patch
+
+Message = Tuple[dict, dict]
+
+
+class FakeReader:
+    """
+    In-process stand-in for serverish reader. Messages are taken from iterator, so they can be generated lazily and
+    the night doesn't have to exist in memory. When stream is exhausted `read_next` raises `asyncio.TimeoutError`
+    immediately, the same as collector waiting for the next message of the empty stream, but without waiting.
+    """
+
+    def __init__(self, messages: Iterable[Message]):
+        self._messages: Iterator[Message] = iter(messages)
+        self.count: int = 0
+
+    async def open(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def read_next(self) -> Message:
+        try:
+            msg = next(self._messages)
+        except StopIteration:
+            raise asyncio.TimeoutError
+        self.count += 1
+        return msg
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Message:
+        try:
+            msg = next(self._messages)
+        except StopIteration:
+            raise StopAsyncIteration
+        self.count += 1
+        return msg
+
+
+class FakeNats:
+    """
+    Streams of fake NATS. Every stream is a factory of message iterator, so every reader reads stream from the
+    beginning, like `deliver_policy='by_start_time'` used by collectors.
+    """
+
+    # modules importing `get_reader` and `single_read` directly
+    _READER_TARGETS = ('halina.email_rapport.telescope_data_collector.get_reader',
+                       'halina.email_rapport.weather_data_collector.get_reader',
+                       'halina.email_rapport.power_data_collector.get_reader',
+                       'halina.file_raport.harvester_file_rapport.get_reader')
+    _SINGLE_READ_TARGETS = ('halina.email_rapport.telescope_data_collector.single_read',)
+
+    def __init__(self):
+        self._streams: Dict[str, Callable[[], Iterable[Message]]] = {}
+        self.readers: Dict[str, FakeReader] = {}
+
+    def add_stream(self, subject: str, factory: Callable[[], Iterable[Message]]) -> None:
+        self._streams[subject] = factory
+
+    def get_reader(self, subject: str, **kwargs) -> FakeReader:
+        factory = self._streams.get(subject)
+        reader = FakeReader(factory() if factory is not None else [])
+        self.readers[subject] = reader
+        return reader
+
+    async def single_read(self, subject: str, wait: Optional[float] = None, **kwargs) -> Message:
+        factory = self._streams.get(subject)
+        for msg in (factory() if factory is not None else []):
+            return msg
+        raise asyncio.TimeoutError
+
+    @contextlib.contextmanager
+    def patch(self):
+        """
+        Context manager replacing serverish readers used by collectors by readers of this fake NATS.
+        """
+        with contextlib.ExitStack() as stack:
+            for target in FakeNats._READER_TARGETS:
+                stack.enter_context(patch(target, self.get_reader))
+            for target in FakeNats._SINGLE_READ_TARGETS:
+                stack.enter_context(patch(target, self.single_read))
+            yield self
@@ -0,0 +1,90 @@
+import asyncio
+import shutil
+import socket
+import tempfile
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import nats
+
+from simulator.bulk_publisher import BulkPublisher
+
+Message = Tuple[dict, dict]
+
+
+class LocalNatsServer:
+    """
+    Local JetStream server for end-to-end benchmarks, started from `nats-server` binary (e.g. from `nats-server-bin`
+    package). Storage is temporary, streams used by HALina are created on start.
+    """
+
+    STREAMS: Dict[str, List[str]] = {'tic': ['tic.>'], 'telemetry': ['telemetry.>']}
+    _START_TIMEOUT = 10
+
+    def __init__(self, binary: str = 'nats-server', host: str = '127.0.0.1', port: Optional[int] = None):
+        self.binary: str = binary
+        self.host: str = host
+        self.port: int = port or LocalNatsServer._free_port()
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._store: Optional[tempfile.TemporaryDirectory] = None
+
+    @staticmethod
+    def available(binary: str = 'nats-server') -> bool:
+        return shutil.which(binary) is not None
+
+    @staticmethod
+    def _free_port() -> int:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind(('127.0.0.1', 0))
+            return s.getsockname()[1]
+
+    async def start(self) -> None:
+        self._store = tempfile.TemporaryDirectory()
+        self._process = await asyncio.create_subprocess_exec(
+            self.binary, '-js', '-a', self.host, '-p', str(self.port), '-sd', self._store.name,
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+        nc = await self._connect()
+        try:
+            js = nc.jetstream()
+            for name, subjects in LocalNatsServer.STREAMS.items():
+                await js.add_stream(name=name, subjects=subjects)
+        finally:
+            await nc.close()
+
+    async def _connect(self) -> nats.NATS:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + LocalNatsServer._START_TIMEOUT
+        while True:
+            try:
+                return await nats.connect(f"nats://{self.host}:{self.port}", allow_reconnect=False,
+                                          connect_timeout=1, error_cb=LocalNatsServer._ignore_error)
+            except (OSError, nats.errors.NoServersError):
+                if loop.time() > deadline:
+                    raise
+                await asyncio.sleep(0.1)
+
+    @staticmethod
+    async def _ignore_error(e: Exception) -> None:
+        # server is not started yet, connection is retried
+        pass
+
+    async def stop(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            await self._process.wait()
+            self._process = None
+        if self._store is not None:
+            self._store.cleanup()
+            self._store = None
+
+
+async def seed(subject: str, messages: Iterable[Message], in_flight: int = 1000) -> int:
+    """
+    Method publish messages to subject over the connection of open Messenger, acks are awaited in bulk.
+
+    :return: number of published messages
+    """
+    async with BulkPublisher(host='', port=0, in_flight=in_flight) as publisher:
+        count = await publisher.publish_many(subject, (data for data, meta in messages))
+    if publisher.errors:
+        raise RuntimeError(f"{publisher.errors} messages published to {subject} were not acknowledged")
+    return count
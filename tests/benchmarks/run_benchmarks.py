@@ -0,0 +1,148 @@
+import argparse
+import asyncio
+import datetime
+import gc
+import json
+import logging
+import platform
+import re
+import sys
+import time
+from importlib import metadata
+from typing import Dict, List
+
+from definitions import ROOT_DIR
+from halina.email_rapport.power_data_collector import PowerDataCollector
+from halina.email_rapport.telescope_data_collector import TelescopeDtaCollector
+from halina.email_rapport.weather_data_collector import WeatherDataCollector
+from halina.metrics import MESSAGES_READ, READ_RATE, REGISTRY
+from halina.run_profiler import RunProfiler
+from tests.benchmarks.fake_nats import FakeNats
+from tests.benchmarks.synthetic_night import SyntheticNight
+
+logger = logging.getLogger('benchmarks')
+
+COLLECTORS = ['telescope', 'weather', 'power']
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def halina_version() -> str:
+    try:
+        return metadata.version('halina')
+    except metadata.PackageNotFoundError:
+        with open(f'{ROOT_DIR}/pyproject.toml', 'r') as file:
+            found = re.search(r'^version\s*=\s*"([^"]+)"', file.read(), re.MULTILINE)
+        return found.group(1) if found else 'unknown'
+
+
+def _source_rate(night: SyntheticNight, subject: str) -> float:
+    """
+    Rate of generating messages alone, generation is included in measured collector time.
+    """
+    start = time.perf_counter()
+    count = sum(1 for _ in night.subjects()[subject]())
+    duration = time.perf_counter() - start
+    return count / duration if duration > 0 else 0
+
+
+async def _run_collector(name: str, night: SyntheticNight) -> Dict[str, float]:
+    stages = {}
+    if name == 'telescope':
+        collector = TelescopeDtaCollector(telescope_name=night.telescope)
+        start = time.perf_counter()
+        await collector.collect_data()
+        stages['collect'] = time.perf_counter() - start
+        stages['fits'] = collector.count_fits
+    elif name == 'weather':
+        collector = WeatherDataCollector()
+        start = time.perf_counter()
+        await collector.collect_data()
+        stages['collect'] = time.perf_counter() - start
+    else:
+        collector = PowerDataCollector()
+        start = time.perf_counter()
+        await collector.collect_data()
+        stages['collect'] = time.perf_counter() - start
+    return stages
+
+
+def _subjects(name: str, night: SyntheticNight) -> List[str]:
+    if name == 'telescope':
+        return [s for s in night.subjects() if s.startswith(f"tic.status.{night.telescope}.")]
+    if name == 'weather':
+        return ["telemetry.weather.davis"]
+    return ["telemetry.power.data-manager"]
+
+
+def run_benchmark(name: str, frames: int, malformed_ratio: float = 0.0, seed: int = 0) -> dict:
+    """
+    Method run one collector over synthetic night witch `frames` messages in every stream.
+
+    :return: result witch messages per second, peak RSS and time per stage
+    """
+    night = SyntheticNight(frames=frames, seed=seed, malformed_ratio=malformed_ratio)
+    fake_nats = FakeNats()
+    for subject, factory in night.subjects().items():
+        fake_nats.add_stream(subject, factory)
+    subjects = _subjects(name, night)
+
+    REGISTRY.reset()
+    gc.collect()
+    RunProfiler.reset_peak_rss()
+    with fake_nats.patch():
+        start = time.perf_counter()
+        stages = asyncio.run(_run_collector(name, night))
+        wall = time.perf_counter() - start
+    peak_rss_kb = RunProfiler.peak_rss_kb()
+
+    messages = sum(MESSAGES_READ.get(stream=s) for s in subjects)
+    return {
+        'collector': name,
+        'frames': frames,
+        'messages': messages,
+        'wall_s': wall,
+        'msgs_per_s': messages / wall if wall > 0 else 0,
+        'source_msgs_per_s': _source_rate(night, subjects[0]),
+        'peak_rss_mb': peak_rss_kb / 1024,
+        'streams': {s: READ_RATE.get(stream=s) for s in subjects},
+        'stages': stages,
+    }
+
+
+def run(sizes: List[int], collectors: List[str], malformed_ratio: float = 0.0) -> dict:
+    results = []
+    for frames in sizes:
+        for name in collectors:
+            result = run_benchmark(name=name, frames=frames, malformed_ratio=malformed_ratio)
+            logger.warning(f"{name:>10} {frames:>8} frames: {result['msgs_per_s']:>10.0f} msgs/s "
+                           f"{result['wall_s']:>8.2f} s peak {result['peak_rss_mb']:.0f} MB")
+            results.append(result)
+    return {
+        'version': halina_version(),
+        'python': platform.python_version(),
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of collectors fed by synthetic nights")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="number of frames in the night, e.g. 1000 10000 100000 1000000")
+    parser.add_argument('--collectors', nargs='+', choices=COLLECTORS, default=COLLECTORS)
+    parser.add_argument('--malformed', type=float, default=0.0, help="ratio of malformed messages")
+    parser.add_argument('--output', type=str, default=None, help="JSON file witch results, default stdout")
+    args = parser.parse_args()
+
+    # collectors log every malformed record, logging is not the subject of benchmark
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    out = run(sizes=args.sizes, collectors=args.collectors, malformed_ratio=args.malformed)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(out, file, indent=4)
+    else:
+        json.dump(out, sys.stdout, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Dict, List
+from unittest.mock import patch, AsyncMock
+
+from serverish.messenger import Messenger
+
+from configuration import GlobalConfig
+from halina.email_outbox_service import EmailOutboxService
+from halina.email_rapport_service import EmailRapportService
+from halina.file_rapport_service import FileRapportService
+from tests.benchmarks.fake_nats import FakeNats
+from tests.benchmarks.local_nats import LocalNatsServer, seed
+from tests.benchmarks.run_benchmarks import halina_version
+from tests.benchmarks.smtp_sink import SmtpSink
+from tests.benchmarks.synthetic_night import SyntheticNight
+
+logger = logging.getLogger('benchmarks')
+
+DEFAULT_TELESCOPES = ['jk15', 'zb08']
+
+
+def _night_streams(frames: int, telescopes: List[str]) -> Dict[str, callable]:
+    """
+    Method return factories of messages of all streams of the night for all telescopes.
+    """
+    streams = {}
+    nights = [SyntheticNight(frames=frames, telescope=tel, seed=i) for i, tel in enumerate(telescopes)]
+    for night in nights:
+        streams.update(night.subjects())
+    # one observatory config witch all telescopes
+    config = {'config': {'telescopes': {n.telescope: n.telescope_config() for n in nights}}}
+    streams['tic.config.observatory'] = lambda: iter([(config, {})])
+    return streams
+
+
+def _configure(tmp_dir: str, smtp_port: int, telescopes: List[str], recipients: int) -> None:
+    GlobalConfig.set(GlobalConfig.SMTP_HOST, '127.0.0.1')
+    GlobalConfig.set(GlobalConfig.SMTP_PORT, smtp_port)
+    GlobalConfig.set(GlobalConfig.SMTP_START_TLS, False)
+    GlobalConfig.set(GlobalConfig.SMTP_USERNAME, 'benchmark')
+    GlobalConfig.set(GlobalConfig.SMTP_PASSWORD, 'benchmark')
+    GlobalConfig.set(GlobalConfig.FROM_EMAIL, 'halina@localhost')
+    GlobalConfig.set(GlobalConfig.EMAILS_TO, [f'recipient{i}@localhost' for i in range(recipients)])
+    GlobalConfig.set(GlobalConfig.TELESCOPES, telescopes)
+    GlobalConfig.set(GlobalConfig.EMAIL_OUTBOX_PATH, os.path.join(tmp_dir, 'outbox'))
+    GlobalConfig.set(GlobalConfig.RAPPORT_FILE_TARGET_PATH, os.path.join(tmp_dir, 'files'))
+    # file rapport is saved to existing directory of every telescope
+    for tel in telescopes:
+        os.makedirs(os.path.join(tmp_dir, 'files', tel), exist_ok=True)
+
+
+def _nats_stats() -> Dict[str, int]:
+    conn = Messenger().conn
+    if conn is None or conn.nc is None:
+        return {'in_bytes': 0, 'out_bytes': 0, 'in_msgs': 0}
+    return {k: conn.nc.stats[k] for k in ['in_bytes', 'out_bytes', 'in_msgs']}
+
+
+async def run_pipeline() -> Dict[str, Dict[str, float]]:
+    """
+    Method run the whole nightly pipeline: email rapport (collect, charts, build, queue), delivery to smtp and file
+    rapport. NATS and smtp have to be configured.
+
+    :return: duration of every stage of every job
+    """
+    stages = {}
+    email_service = EmailRapportService()
+    outbox_service = EmailOutboxService(outbox=email_service._outbox)
+    start = time.perf_counter()
+    await email_service._collect_data_and_send()
+    stages[EmailRapportService._NAME] = dict(email_service._stages.stages)
+
+    smtp_start = time.perf_counter()
+    await outbox_service._send_due()
+    stages[EmailRapportService._NAME]['smtp'] = time.perf_counter() - smtp_start
+    stages[EmailRapportService._NAME]['total'] = time.perf_counter() - start
+
+    file_service = FileRapportService()
+    start = time.perf_counter()
+    await file_service._collect_data_and_save()
+    stages[FileRapportService._NAME] = dict(file_service._stages.stages)
+    stages[FileRapportService._NAME]['total'] = time.perf_counter() - start
+    return stages
+
+
+async def run_e2e(frames: int, telescopes: List[str], recipients: int, use_server: bool,
+                  binary: str = 'nats-server') -> dict:
+    streams = _night_streams(frames=frames, telescopes=telescopes)
+    sink = SmtpSink()
+    await sink.start()
+    server = None
+    result = {'frames': frames, 'telescopes': telescopes, 'recipients': recipients,
+              'nats': 'nats-server' if use_server else 'in-process'}
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir, contextlib.ExitStack() as stack:
+            _configure(tmp_dir=tmp_dir, smtp_port=sink.port, telescopes=telescopes, recipients=recipients)
+            if use_server:
+                server = LocalNatsServer(binary=binary)
+                await server.start()
+                GlobalConfig.set(GlobalConfig.NATS_HOST, server.host)
+                GlobalConfig.set(GlobalConfig.NATS_PORT, server.port)
+                await Messenger().open(server.host, server.port, wait=5)
+                start = time.perf_counter()
+                published = 0
+                for subject, factory in streams.items():
+                    published += await seed(subject, factory())
+                result['seed'] = {'messages': published, 'duration_s': time.perf_counter() - start}
+            else:
+                fake_nats = FakeNats()
+                for subject, factory in streams.items():
+                    fake_nats.add_stream(subject, factory)
+                stack.enter_context(fake_nats.patch())
+                stack.enter_context(patch('halina.service_nats_dependent.ServiceNatsDependent._wait_to_open_nats',
+                                          new_callable=AsyncMock, return_value=True))
+
+            stats = _nats_stats()
+            start = time.perf_counter()
+            result['stages'] = await run_pipeline()
+            result['wall_s'] = time.perf_counter() - start
+            after = _nats_stats()
+            result['nats_bytes_received'] = after['in_bytes'] - stats['in_bytes']
+            result['nats_bytes_sent'] = after['out_bytes'] - stats['out_bytes']
+            result['nats_messages_received'] = after['in_msgs'] - stats['in_msgs']
+            result['smtp_bytes_sent'] = sink.bytes_received
+            result['smtp_message_bytes'] = sink.data_bytes
+            result['smtp_messages'] = sink.messages
+    finally:
+        if use_server:
+            await Messenger().close()
+        if server is not None:
+            await server.stop()
+        await sink.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the nightly pipeline: NATS replay, "
+                                                 "aggregation, charts, email build, SMTP and file rapport")
+    parser.add_argument('--frames', type=int, nargs='+', default=[1000], help="number of frames per telescope")
+    parser.add_argument('--telescopes', nargs='+', default=DEFAULT_TELESCOPES)
+    parser.add_argument('--recipients', type=int, default=3)
+    parser.add_argument('--nats', choices=['server', 'fake'], default=None,
+                        help="'server' starts local JetStream by nats-server binary, 'fake' uses in-process stand-in "
+                             "(default: server if nats-server is available)")
+    parser.add_argument('--nats-server', type=str, default='nats-server', help="path to nats-server binary")
+    parser.add_argument('--output', type=str, default=None, help="JSON file witch results, default stdout")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    use_server = LocalNatsServer.available(args.nats_server) if args.nats is None else args.nats == 'server'
+    results = []
+    for frames in args.frames:
+        result = asyncio.run(run_e2e(frames=frames, telescopes=args.telescopes, recipients=args.recipients,
+                                     use_server=use_server, binary=args.nats_server))
+        logger.warning(f"{frames:>8} frames: {result['wall_s']:.2f} s, NATS {result['nats_bytes_received']} B, "
+                       f"SMTP {result['smtp_bytes_sent']} B, stages: "
+                       f"{json.dumps(result['stages'], default=lambda x: round(x, 3))}")
+        results.append(result)
+    out = {
+        'version': halina_version(),
+        'python': platform.python_version(),
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(out, file, indent=4)
+    else:
+        json.dump(out, sys.stdout, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from typing import List, Optional
+
+logger = logging.getLogger('smtp_sink')
+
+
+class SmtpSink:
+    """
+    Minimal asyncio SMTP server for benchmarks. It accepts every login and message, messages are discarded and only
+    the number of received bytes is counted. STARTTLS is not supported, so sender has to use `SMTP_START_TLS=false`.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.host: str = host
+        self.port: int = port
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.bytes_received: int = 0  # all bytes received from clients
+        self.data_bytes: int = 0  # bytes of messages content (DATA phase)
+        self.messages: int = 0
+        self.recipients: List[str] = []
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, host=self.host, port=self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _readline(self, reader: asyncio.StreamReader) -> bytes:
+        line = await reader.readline()
+        self.bytes_received += len(line)
+        return line
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        def reply(text: str):
+            writer.write(f"{text}\r\n".encode('ascii'))
+
+        reply("220 halina benchmark sink")
+        try:
+            while True:
+                line = await self._readline(reader)
+                if not line:
+                    break
+                command = line.strip().decode('ascii', errors='replace')
+                verb = command.split(' ', 1)[0].upper()
+                if verb in ('EHLO', 'HELO'):
+                    reply("250-localhost")
+                    reply("250-AUTH PLAIN LOGIN")
+                    reply("250-8BITMIME")
+                    reply("250 SIZE 0")
+                elif verb == 'AUTH':
+                    reply("235 Authentication successful")
+                elif verb == 'RCPT':
+                    self.recipients.append(command.split(':', 1)[-1].strip(' <>'))
+                    reply("250 OK")
+                elif verb in ('MAIL', 'RSET', 'NOOP'):
+                    reply("250 OK")
+                elif verb == 'DATA':
+                    reply("354 End data with <CR><LF>.<CR><LF>")
+                    await writer.drain()
+                    while True:
+                        data_line = await self._readline(reader)
+                        if not data_line or data_line == b'.\r\n':
+                            break
+                        self.data_bytes += len(data_line)
+                    self.messages += 1
+                    reply("250 OK queued")
+                elif verb == 'QUIT':
+                    reply("221 Bye")
+                    await writer.drain()
+                    break
+                else:
+                    reply("502 Command not implemented")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,140 @@
+import datetime
+import json
+import os
+import random
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from pyaraucaria.date import datetime_to_julian
+
+from configuration import GlobalConfig
+from definitions import TEST_RESOURCES_DIR
+from halina.date_utils import DateUtils
+
+Message = Tuple[dict, dict]
+
+
+class SyntheticNight:
+    """
+    Generator of one observation night for benchmarks. Every stream of the night contains `frames` messages with
+    dates inside the night read by collectors. Messages are generated lazily from templates in tests resources, only
+    changed fields are copied, so generating of 1M frames doesn't need gigabytes of memory.
+    """
+
+    _IMAGE_TYPES = ['science', 'flat', 'zero', 'dark', 'focusing', 'snap']
+    _IMAGE_TYPE_WEIGHTS = [80, 6, 4, 4, 3, 3]
+    _FILTERS = ['u', 'g', 'r', 'i', 'z', 'B', 'V', 'Ic']
+    _OBJECTS = 50
+    _NIGHT_MARGIN = datetime.timedelta(hours=1)  # frames are not generated close to the midday
+
+    def __init__(self, frames: int, telescope: str = 'jk15', seed: int = 0, malformed_ratio: float = 0.0):
+        self.frames: int = frames
+        self.telescope: str = telescope
+        self.seed: int = seed
+        self.malformed_ratio: float = malformed_ratio
+        self._templates: Dict[str, dict] = {}
+        for name in ['raw', 'zdf', 'download']:
+            with open(os.path.join(TEST_RESOURCES_DIR, f'{name}.json'), 'r') as file:
+                self._templates[name] = json.load(file)
+
+    def subjects(self) -> Dict[str, Callable[[], Iterator[Message]]]:
+        """
+        Method return factories of messages for every stream read by collectors.
+        """
+        tel = self.telescope
+        return {
+            f"tic.status.{tel}.download": lambda: self._stream('download'),
+            f"tic.status.{tel}.fits.pipeline.raw": lambda: self._stream('raw'),
+            f"tic.status.{tel}.fits.pipeline.zdf": lambda: self._stream('zdf'),
+            f"tic.status.{tel}.fits.pipeline.faststat": lambda: self._stream('faststat'),
+            "tic.config.observatory": self._observatory_config,
+            "telemetry.weather.davis": self._weather,
+            "telemetry.power.data-manager": self._power,
+        }
+
+    def _frame_times(self, start: datetime.datetime, end: datetime.datetime) -> Iterator[datetime.datetime]:
+        start = start + SyntheticNight._NIGHT_MARGIN
+        step = (end - SyntheticNight._NIGHT_MARGIN - start) / max(self.frames, 1)
+        for i in range(self.frames):
+            yield start + step * i
+
+    def _stream(self, name: str) -> Iterator[Message]:
+        # the same seed for every stream, so all streams describe the same frames
+        rnd = random.Random(self.seed)
+        start = DateUtils.yesterday_local_midday_in_utc()
+        jd_start = datetime_to_julian(start)
+        end = DateUtils.today_local_midday_in_utc()
+        for i, t in enumerate(self._frame_times(start, end)):
+            fits_id = f"{self.telescope}_{i:07d}"
+            image_type = rnd.choices(SyntheticNight._IMAGE_TYPES, SyntheticNight._IMAGE_TYPE_WEIGHTS)[0]
+            filter_ = rnd.choice(SyntheticNight._FILTERS)
+            obj = f"obj_{rnd.randrange(SyntheticNight._OBJECTS)}" if image_type == 'science' else image_type
+            malformed = rnd.random() < self.malformed_ratio
+            date_obs = t.isoformat()
+            jd = jd_start + (t - start).total_seconds() / 86400
+            if name == 'download':
+                yield self._download(fits_id, image_type, filter_, obj, date_obs, malformed), {}
+            else:
+                yield self._fits(name, fits_id, image_type, filter_, obj, date_obs, jd, malformed), {}
+
+    def _download(self, fits_id: str, image_type: str, filter_: str, obj: str, date_obs: str,
+                  malformed: bool) -> dict:
+        template = self._templates['download']
+        param = dict(template['param'])
+        param['image_type'] = image_type
+        param['filter'] = filter_
+        param['target_name'] = obj
+        param['date_obs'] = date_obs
+        param['raw_file_name'] = f"{fits_id}.fits"
+        msg = dict(template)
+        msg['param'] = param
+        msg['fits_id'] = None if malformed else fits_id
+        return msg
+
+    def _fits(self, name: str, fits_id: str, image_type: str, filter_: str, obj: str, date_obs: str, jd: float,
+              malformed: bool) -> dict:
+        key = 'raw' if name == 'faststat' else name
+        template = self._templates[key][key]
+        header = dict(template['header'])
+        header['IMAGETYP'] = image_type
+        header['FILTER'] = filter_
+        header['OBJECT'] = obj
+        header['DATE-OBS'] = date_obs
+        header['JD'] = None if malformed else jd
+        header['TELESCOP'] = self.telescope
+        content = dict(template)
+        content['header'] = header
+        if name == 'faststat':
+            content['fwhm'] = {'fwhm_x': template['fwhm_x'], 'fwhm_y': template['fwhm_y']}
+        return {'fits_id': fits_id, key: content}
+
+    def telescope_config(self) -> dict:
+        return {'observatory': {'style': {'color': '#2277ff'}, 'lat': -24.598056, 'lon': -70.196389, 'elev': 2817}}
+
+    def _observatory_config(self) -> Iterator[Message]:
+        yield {'config': {'telescopes': {self.telescope: self.telescope_config()}}}, {}
+
+    def _telemetry_times(self) -> Iterator[List[int]]:
+        offset = datetime.timedelta(hours=GlobalConfig.get(GlobalConfig.CHARTS_UTC_OFFSET_HOURS, 0))
+        start = DateUtils.yesterday_midday_utc_tz() + offset
+        end = DateUtils.today_midday_utc_tz() + offset
+        for t in self._frame_times(start, end):
+            yield [t.year, t.month, t.day, t.hour, t.minute, t.second, t.microsecond]
+
+    def _weather(self) -> Iterator[Message]:
+        rnd = random.Random(self.seed)
+        for ts in self._telemetry_times():
+            yield {'ts': ts, 'measurements': {
+                'wind_10min_ms': 'malformed' if rnd.random() < self.malformed_ratio else rnd.uniform(0, 15),
+                'temperature_C': rnd.uniform(5, 20),
+                'humidity': rnd.uniform(10, 90),
+                'wind_dir_deg': rnd.uniform(0, 360),
+                'pressure_Pa': rnd.uniform(74000, 75000)}}, {}
+
+    def _power(self) -> Iterator[Message]:
+        rnd = random.Random(self.seed)
+        for ts in self._telemetry_times():
+            yield {'ts': ts, 'measurements': {
+                'state_of_charge': 'malformed' if rnd.random() < self.malformed_ratio else rnd.uniform(20, 100),
+                'pv_power': rnd.uniform(0, 3000),
+                'battery_charge': rnd.uniform(0, 1000),
+                'battery_discharge': rnd.uniform(0, 1000)}}, {}
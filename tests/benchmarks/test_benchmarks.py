@@ -0,0 +1,38 @@
+import unittest
+
+from tests.benchmarks.run_benchmarks import run_benchmark
+from tests.run_perf import Metric, compare
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_telescope_collector_reads_whole_night(self):
+        result = run_benchmark(name='telescope', frames=200)
+        self.assertEqual(result['messages'], 4 * 200)
+        self.assertEqual(result['stages']['fits'], 200)
+        self.assertGreater(result['msgs_per_s'], 0)
+
+    def test_telemetry_collectors_read_whole_night(self):
+        for name in ['weather', 'power']:
+            result = run_benchmark(name=name, frames=200)
+            self.assertEqual(result['messages'], 200)
+            self.assertEqual(len(result['streams']), 1)
+
+    def test_perf_compare_reports_regression_in_worse_direction(self):
+        baseline = {'msgs_per_s': {'samples': [100, 101, 99]}, 'render_ms': {'samples': [50, 51, 49]}}
+        throughput = Metric('msgs_per_s', 'msgs/s', higher_is_better=True)
+        throughput.samples = [80, 81, 79]
+        render = Metric('render_ms', 'ms', higher_is_better=False)
+        render.samples = [40, 41, 39]
+        rows = {r['metric']: r['status'] for r in compare(baseline, {'msgs_per_s': throughput, 'render_ms': render})}
+        self.assertEqual(rows, {'msgs_per_s': 'REGRESSION', 'render_ms': 'IMPROVED'})
+
+    def test_perf_compare_ignores_noise(self):
+        baseline = {'render_ms': {'samples': [50, 70, 30, 60, 40]}}
+        render = Metric('render_ms', 'ms', higher_is_better=False)
+        render.samples = [58, 80, 40, 62, 55]
+        self.assertEqual(compare(baseline, {'render_ms': render})[0]['status'], 'OK')
+
+
+if __name__ == '__main__':
+    unittest.main()
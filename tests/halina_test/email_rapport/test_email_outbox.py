@@ -0,0 +1,66 @@
+import datetime
+import tempfile
+import unittest
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from halina.email_rapport.email_outbox import EmailOutbox
+
+
+class TestEmailOutbox(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.outbox = EmailOutbox(path=self._tmp_dir.name)
+        self.message = MIMEMultipart("related")
+        self.message["Subject"] = "Night Report"
+        self.message.attach(MIMEText("<html>test</html>", "html"))
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    async def test_put_deduplicates_by_night_and_recipient(self):
+        queued = await self.outbox.put("0452", self.message, ["a@example.com", "b@example.com"])
+        self.assertEqual(queued, ["a@example.com", "b@example.com"])
+        queued = await self.outbox.put("0452", self.message, ["a@example.com", "c@example.com"])
+        self.assertEqual(queued, ["c@example.com"])
+        queued = await self.outbox.put("0453", self.message, ["a@example.com"])
+        self.assertEqual(queued, ["a@example.com"])
+        self.assertEqual(len(await self.outbox.entries()), 4)
+
+    async def test_message_file(self):
+        await self.outbox.put("0452", self.message, ["a@example.com"])
+        entry = (await self.outbox.due_entries())[0]
+        with open(self.outbox.message_path(entry), 'rb') as file:
+            content = file.read()
+        self.assertIn(b"Subject: Night Report\r\n", content)
+        self.assertNotIn(b"\nTo:", content)
+
+    async def test_mark_failed_backoff(self):
+        await self.outbox.put("0452", self.message, ["a@example.com"])
+        entry = (await self.outbox.due_entries())[0]
+        await self.outbox.mark_failed(entry, "SMTP error")
+        self.assertEqual(await self.outbox.due_entries(), [])
+        first_delay = entry.next_attempt_dt() - datetime.datetime.now(datetime.timezone.utc)
+        await self.outbox.mark_failed(entry, "SMTP error")
+        second_delay = entry.next_attempt_dt() - datetime.datetime.now(datetime.timezone.utc)
+        self.assertGreater(second_delay, first_delay)
+        self.assertEqual(entry.status, EmailOutbox.STATUS_PENDING)
+
+    async def test_mark_failed_give_up(self):
+        await self.outbox.put("0452", self.message, ["a@example.com"])
+        entry = (await self.outbox.due_entries())[0]
+        for _ in range(EmailOutbox._MAX_ATTEMPTS):
+            await self.outbox.mark_failed(entry, "SMTP error")
+        self.assertEqual(entry.status, EmailOutbox.STATUS_FAILED)
+        self.assertIsNone(await self.outbox.next_attempt_time())
+
+    async def test_mark_sent(self):
+        await self.outbox.put("0452", self.message, ["a@example.com"])
+        entry = (await self.outbox.due_entries())[0]
+        await self.outbox.mark_sent(entry)
+        self.assertEqual(await self.outbox.due_entries(), [])
+        self.assertEqual(await self.outbox.put("0452", self.message, ["a@example.com"]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+import io
 import unittest
 from unittest.mock import patch, AsyncMock
 from email.mime.multipart import MIMEMultipart
@@ -9,64 +10,71 @@ class TestEmailSender(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
         self.to_email = "test@example.com"
         self.email_sender = EmailSender(self.to_email)
+        self.config = {
+            "FROM_EMAIL": "from@example.com",
+            "FROM_NAME": "Halina",
+            "SMTP_USERNAME": "from@example.com",
+            "SMTP_PASSWORD": "password",
+            "SMTP_HOST": "smtp.example.com",
+            "SMTP_PORT": 587
+        }
 
+    @patch('halina.email_rapport.email_sender.EmailSender._send_stream', new_callable=AsyncMock)
     @patch('halina.email_rapport.email_sender.GlobalConfig.get')
     @patch('halina.email_rapport.email_sender.SMTP')
-    async def test_send_email_success(self, mock_smtp_class, mock_global_config_get):
+    async def test_send_email_success(self, mock_smtp_class, mock_global_config_get, mock_send_stream):
         # Setup resources
         mock_smtp = mock_smtp_class.return_value
         mock_smtp.__aenter__.return_value = mock_smtp
         mock_smtp.login = AsyncMock()
-        mock_smtp.send_message = AsyncMock()
-        mock_global_config_get.side_effect = lambda x: {
-            "FROM_EMAIL": "from@example.com",
-            "EMAIL_APP_PASSWORD": "password",
-            "SMTP_HOST": "smtp.example.com",
-            "SMTP_PORT": 587
-        }[x]
+        mock_global_config_get.side_effect = lambda x, default=None: self.config.get(x, default)
 
         message = MIMEMultipart()
         result = await self.email_sender.send(message)
 
         self.assertTrue(result)
         mock_smtp.login.assert_called_once_with("from@example.com", "password")
-        mock_smtp.send_message.assert_called_once_with(message)
+        mock_send_stream.assert_awaited_once()
+        self.assertEqual(message["To"], self.to_email)
 
+    @patch('halina.email_rapport.email_sender.EmailSender._send_stream', new_callable=AsyncMock)
     @patch('halina.email_rapport.email_sender.GlobalConfig.get')
     @patch('halina.email_rapport.email_sender.SMTP')
-    async def test_send_email_failure(self, mock_smtp_class, mock_global_config_get):
+    async def test_send_email_failure(self, mock_smtp_class, mock_global_config_get, mock_send_stream):
         # Setup resources
         mock_smtp = mock_smtp_class.return_value
         mock_smtp.__aenter__.return_value = mock_smtp
         mock_smtp.login = AsyncMock()
-        mock_smtp.send_message = AsyncMock(side_effect=SMTPException("SMTP error"))
-        mock_global_config_get.side_effect = lambda x: {
-            "FROM_EMAIL": "from@example.com",
-            "EMAIL_APP_PASSWORD": "password",
-            "SMTP_HOST": "smtp.example.com",
-            "SMTP_PORT": 587
-        }[x]
+        mock_send_stream.side_effect = SMTPException("SMTP error")
+        mock_global_config_get.side_effect = lambda x, default=None: self.config.get(x, default)
 
         message = MIMEMultipart()
         result = await self.email_sender.send(message)
 
         self.assertFalse(result)
         mock_smtp.login.assert_called_once_with("from@example.com", "password")
-        mock_smtp.send_message.assert_called_once_with(message)
+        mock_send_stream.assert_awaited_once()
 
     @patch('halina.email_rapport.email_sender.GlobalConfig.get')
     async def test_send_email_no_password(self, mock_global_config_get):
-        mock_global_config_get.side_effect = lambda x: {
-            "FROM_EMAIL": "from@example.com",
-            "EMAIL_APP_PASSWORD": None,
-            "SMTP_HOST": "smtp.example.com",
-            "SMTP_PORT": 587
-        }[x]
+        self.config["SMTP_PASSWORD"] = None
+        mock_global_config_get.side_effect = lambda x, default=None: self.config.get(x, default)
 
         message = MIMEMultipart()
         with self.assertRaises(ValueError):
             await self.email_sender.send(message)
 
+    async def test_flatten_and_dot_stuff(self):
+        message = MIMEMultipart()
+        message["Subject"] = "Test"
+        file = io.BytesIO()
+        EmailSender.flatten(message, file)
+        file.seek(0)
+        data = EmailSender._dot_stuff(file.readlines())
+        self.assertIn(b"Subject: Test\r\n", data)
+        self.assertEqual(EmailSender._dot_stuff([b".line\n", b"other\r\n", b"last"]),
+                         b"..line\r\nother\r\nlast\r\n")
+
 
 if __name__ == '__main__':
     unittest.main()
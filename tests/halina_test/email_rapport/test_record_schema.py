@@ -0,0 +1,61 @@
+import copy
+import datetime
+import json
+import os
+import unittest
+
+import definitions
+from halina.email_rapport.record_schema import (RecordSchema, Field, DOWNLOAD, FASTSTAT, RAW, WEATHER, NUMBER,
+                                                REQUIRED)
+
+
+class TestRecordSchema(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(definitions.TEST_RESOURCES_DIR, 'raw.json'), 'r') as file:
+            self.raw = json.load(file)
+        with open(os.path.join(definitions.TEST_RESOURCES_DIR, 'download.json'), 'r') as file:
+            self.download = json.load(file)
+
+    def test_valid_record_is_extracted(self):
+        fits_id, content, jd = RAW.validate(self.raw)
+        self.assertEqual(fits_id, self.raw['fits_id'])
+        self.assertIs(content, self.raw['raw'])
+        self.assertEqual(jd, float(self.raw['raw']['header']['JD']))
+        self.assertEqual(DOWNLOAD.validate(self.download)[0], self.download['fits_id'])
+
+    def test_reason_is_the_first_malformed_field(self):
+        no_header = copy.deepcopy(self.raw)
+        del no_header['raw']['header']
+        self.assertEqual(RAW.validate(no_header), 'header')
+        no_jd = copy.deepcopy(self.raw)
+        no_jd['raw']['header']['JD'] = None
+        self.assertEqual(RAW.validate(no_jd), 'JD')
+        self.assertEqual(FASTSTAT.validate(no_jd), 'fwhm')
+        self.assertEqual(RAW.validate(None), 'record')
+
+    def test_ts_is_extracted_as_utc_datetime(self):
+        record = {'ts': [2024, 5, 1, 1, 2, 3, 4], 'measurements': {'wind_10min_ms': 1.0, 'temperature_C': 2,
+                                                                   'humidity': 3.0, 'wind_dir_deg': 4,
+                                                                   'pressure_Pa': 5.0}}
+        ts, *values = WEATHER.validate(record)
+        self.assertEqual(ts, datetime.datetime(2024, 5, 1, 1, 2, 3, 4, tzinfo=datetime.timezone.utc))
+        self.assertEqual(values, [1.0, 2, 3.0, 4, 5.0])
+        record['ts'] = [2024, 13, 1]
+        self.assertEqual(WEATHER.validate(record), 'ts')
+        record['ts'] = [2024, 5, 1]
+        record['measurements']['humidity'] = 'wet'
+        self.assertEqual(WEATHER.validate(record), 'humidity')
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            RecordSchema('bad', [Field('a', ('a',), 'str')])
+
+    def test_nested_fields_share_containers(self):
+        schema = RecordSchema('nested', [Field('a', ('x', 'a'), NUMBER), Field('b', ('x', 'y', 'b'), REQUIRED)])
+        self.assertEqual(schema.validate({'x': {'a': 1, 'y': {'b': 'ok'}}}), (1, 'ok'))
+        self.assertEqual(schema.validate({'x': {'a': 1, 'y': []}}), 'y')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import logging
+import unittest
+
+from halina.diagnostics import Diagnostics, start_queue_logging, stop_queue_logging
+
+
+class _ListHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestDiagnostics(unittest.TestCase):
+
+    def test_only_samples_are_logged(self):
+        diagnostics = Diagnostics()
+        with self.assertLogs('diagnostics', level='INFO') as logs:
+            for i in range(100):
+                diagnostics.event('malformed record', 'tic.status.zb08.download', f"no or damaged field {i}")
+        self.assertEqual(len(logs.output), diagnostics._samples)
+        self.assertEqual(diagnostics.count('malformed record', 'tic.status.zb08.download'), 100)
+
+    def test_summary_counts_and_resets(self):
+        diagnostics = Diagnostics()
+        with self.assertLogs('diagnostics', level='INFO'):
+            for _ in range(10):
+                diagnostics.event('malformed record', 'stream_a')
+            diagnostics.event('malformed fits', 'stream_b')
+            lines = diagnostics.summarize()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('malformed fits in stream_b: 1 events', lines[0])
+        self.assertIn('malformed record in stream_a: 10 events', lines[1])
+        self.assertIn(f"({10 - diagnostics._samples} not logged)", lines[1])
+        self.assertEqual(diagnostics.count('malformed record', 'stream_a'), 0)
+
+    def test_queue_logging(self):
+        root = logging.getLogger()
+        handler = _ListHandler()
+        old_handlers = root.handlers[:]
+        for h in old_handlers:
+            root.removeHandler(h)
+        root.addHandler(handler)
+        try:
+            listener = start_queue_logging()
+            self.assertNotIn(handler, root.handlers)
+            logging.getLogger('test_queue').warning("queued")
+            stop_queue_logging(listener)
+            self.assertEqual(root.handlers, [handler])
+            self.assertEqual([r.getMessage() for r in handler.records], ["queued"])
+        finally:
+            root.removeHandler(handler)
+            for h in old_handlers:
+                root.addHandler(h)
+
+
+if __name__ == '__main__':
+    unittest.main()
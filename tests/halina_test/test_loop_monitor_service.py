@@ -0,0 +1,34 @@
+import asyncio
+import time
+import unittest
+
+from halina.loop_monitor_service import LoopMonitorService
+from halina.metrics import LOOP_BLOCKS, LOOP_LAG_SECONDS
+
+
+class TestLoopMonitorService(unittest.IsolatedAsyncioTestCase):
+
+    def _block_loop(self):
+        time.sleep(0.3)
+
+    async def test_blocking_call_logged_with_stack(self):
+        service = LoopMonitorService()
+        service._threshold = 0.1
+        blocks = LOOP_BLOCKS.get()
+        await service.start()
+        try:
+            with self.assertLogs('loop_monitor_service', level='WARNING') as logs:
+                await asyncio.sleep(0.05)
+                self._block_loop()
+                await asyncio.sleep(0.6)
+        finally:
+            await service.stop()
+
+        self.assertEqual(LOOP_BLOCKS.get(), blocks + 1)
+        self.assertIn('_block_loop', logs.output[0])
+        self.assertIn('was blocked for', logs.output[1])
+        self.assertGreater(LOOP_LAG_SECONDS.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from definitions import ROOT_DIR
+
+
+class TestMain(unittest.TestCase):
+
+    def test_heavy_dependencies_are_not_imported_at_start(self):
+        # fresh interpreter, modules imported by other tests don't matter
+        heavy = ['astropy', 'scipy', 'numpy', 'pyaraucaria.ephemeris']
+        code = ("import sys, halina.main; "
+                f"print(','.join(m for m in {heavy!r} if m in sys.modules and "
+                "not type(sys.modules[m]).__name__.startswith('_Lazy')))")
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.join(ROOT_DIR, 'src'), ROOT_DIR]))
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from halina.metrics import MetricsRegistry, Counter, Gauge, Histogram
+from halina.metrics_exporter_service import MetricsExporterService
+
+
+class TestMetrics(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.counter = Counter('test_read_total', 'Read messages', registry=self.registry)
+        self.gauge = Gauge('test_size', 'Table size', registry=self.registry)
+        self.histogram = Histogram('test_seconds', 'Duration', buckets=(0.1, 1), registry=self.registry)
+
+    def test_render(self):
+        self.counter.inc(stream='a')
+        self.counter.inc(2, stream='a')
+        self.gauge.set_max(5, telescope='jk15')
+        self.gauge.set_max(3, telescope='jk15')
+        self.histogram.observe(0.5, chart='wind')
+        self.histogram.observe(2, chart='wind')
+        lines = self.registry.render().splitlines()
+
+        self.assertIn('# TYPE test_read_total counter', lines)
+        self.assertIn('test_read_total{stream="a"} 3.0', lines)
+        self.assertIn('test_size{telescope="jk15"} 5.0', lines)
+        self.assertIn('test_seconds_bucket{chart="wind",le="0.1"} 0', lines)
+        self.assertIn('test_seconds_bucket{chart="wind",le="1.0"} 1', lines)
+        self.assertIn('test_seconds_bucket{chart="wind",le="+Inf"} 2', lines)
+        self.assertIn('test_seconds_sum{chart="wind"} 2.5', lines)
+        self.assertIn('test_seconds_count{chart="wind"} 2', lines)
+
+    def test_register_twice(self):
+        with self.assertRaises(ValueError):
+            Counter('test_read_total', 'Read messages', registry=self.registry)
+
+    async def test_export_textfile(self):
+        self.counter.inc(stream='a')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'metrics', 'halina.prom')
+            with patch('halina.metrics_exporter_service.GlobalConfig.get',
+                       side_effect=lambda name, default=None: path if name == 'METRICS_TEXTFILE_PATH' else default):
+                service = MetricsExporterService(registry=self.registry)
+            await service.export()
+            with open(path) as file:
+                self.assertEqual(file.read(), self.registry.render())
+            self.assertEqual(os.listdir(os.path.dirname(path)), ['halina.prom'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import asyncio
+import datetime
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from halina.nightly_job import NightlyJob, JobRun
+from halina.nightly_scheduler_service import NightlySchedulerService
+from halina.run_history import RunHistory
+
+
+class TestNightlySchedulerService(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.history = RunHistory(path=os.path.join(self._tmp_dir.name, 'history.json'))
+        self.scheduler = NightlySchedulerService(history=self.history)
+        self.scheduler._stagger = 0.05
+        self.events = []
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _add_history(self, name: str, durations):
+        start = datetime.datetime(2024, 5, 1, 18, tzinfo=datetime.timezone.utc)
+        for d in durations:
+            self.history.add(JobRun(name=name, start=start, end=start + datetime.timedelta(seconds=d),
+                                    success=True, stages={'collect': d / 2}))
+
+    def _job(self, name: str, fail: bool = False):
+        async def run():
+            self.events.append(f"start {name}")
+            await asyncio.sleep(0.01)
+            self.events.append(f"end {name}")
+            if fail:
+                raise RuntimeError("job error")
+        return run
+
+    async def test_dependencies_and_priority(self):
+        self.scheduler.add_job(NightlyJob(name="b", run=self._job("b"), priority=1))
+        self.scheduler.add_job(NightlyJob(name="a", run=self._job("a"), priority=0))
+        self.scheduler.add_job(NightlyJob(name="c", run=self._job("c"), depends_on=["a", "b"]))
+        runs = await self.scheduler._run_night()
+
+        self.assertEqual(self.events, ["start a", "end a", "start b", "end b", "start c", "end c"])
+        self.assertTrue(all(r.success for r in runs))
+        self.assertTrue(all(r.duration is not None for r in runs))
+
+    async def test_failed_job_releases_dependants(self):
+        self.scheduler.add_job(NightlyJob(name="a", run=self._job("a", fail=True)))
+        self.scheduler.add_job(NightlyJob(name="b", run=self._job("b"), depends_on=["a"]))
+        runs = await self.scheduler._run_night()
+
+        self.assertEqual([r.success for r in runs], [False, True])
+        self.assertEqual(runs[0].error, "job error")
+
+    async def test_run_history_saved(self):
+        self._add_history("a", [100, 300, 200])
+        await self.history.save()
+        history = RunHistory(path=os.path.join(self._tmp_dir.name, 'history.json'))
+        self.assertEqual(history.durations("a"), [100, 300, 200])
+        self.assertEqual(history.percentile("a", 0.9), 300)
+        self.assertEqual(history.percentile("a", 0.5, stage='collect'), 100)
+        self.assertIsNone(history.percentile("b", 0.9))
+
+    def test_predict_duration(self):
+        self.scheduler.add_job(NightlyJob(name="a", run=self._job("a")))
+        self.scheduler.add_job(NightlyJob(name="b", run=self._job("b"), depends_on=["a"]))
+        self._add_history("a", [600] * 5)
+        self._add_history("b", [60] * 5)
+        self.assertEqual(self.scheduler.predict_duration(), 660)
+
+    @patch('halina.date_utils.GlobalConfig.snapshot')
+    def test_next_start_time_deliver_by(self, snapshot):
+        snapshot.return_value.OBSERVATORY_TIMEZONE = 0
+        self.scheduler.add_job(NightlyJob(name="a", run=self._job("a")))
+        self._add_history("a", [3600] * 5)
+        self.scheduler._deliver_by_time = datetime.time(18, 0)
+        now = datetime.datetime(2024, 5, 2, 10, tzinfo=datetime.timezone.utc)
+        start = self.scheduler._next_start_time(now)
+        expected = datetime.datetime(2024, 5, 2, 18, tzinfo=datetime.timezone.utc) - datetime.timedelta(
+            seconds=3600 + NightlySchedulerService._SAFETY_MARGIN)
+        self.assertEqual(start, expected)
+        # after run the next start is planned for next day
+        self.scheduler._last_run_date = start.date()
+        self.assertEqual(self.scheduler._next_start_time(start).date(), datetime.date(2024, 5, 3))
+
+    def test_add_job_unknown_dependency(self):
+        with self.assertRaises(ValueError):
+            self.scheduler.add_job(NightlyJob(name="b", run=self._job("b"), depends_on=["a"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
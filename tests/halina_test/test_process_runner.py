@@ -0,0 +1,77 @@
+import asyncio
+import os
+import unittest
+
+from halina.metrics import REGISTRY
+from halina.process_runner import ServiceProcess, WorkerCrashedException
+from halina.service import Service
+from halina.service_shared_data import ServiceSharedData
+
+
+class EchoService(Service):
+    """
+    Service run in worker process by tests. Answers event 'test_ping' by event 'test_pong'.
+    """
+    _NAME = "EchoService"
+
+    def __init__(self, crash_on_run: bool = False):
+        super().__init__()
+        self._crash_on_run = crash_on_run
+        self.shared_data.get_events().set('test_ping', asyncio.Event())
+
+    async def _main(self):
+        while True:
+            await self.shared_data.get_events().wait('test_ping')
+            self.shared_data.get_events().notify('test_pong')
+
+    async def _on_start(self):
+        pass
+
+    async def _on_stop(self):
+        pass
+
+    async def run_scheduled(self):
+        if self._crash_on_run:
+            os._exit(3)
+        return {'collect': 1.5, 'pid': float(os.getpid())}
+
+
+class TestServiceProcess(unittest.IsolatedAsyncioTestCase):
+
+    async def test_run_and_events_are_relayed(self):
+        events = ServiceSharedData().get_events()
+        events.set('test_pong', asyncio.Event())
+        service = ServiceProcess(EchoService)
+        await service.start()
+        try:
+            stages = await asyncio.wait_for(service.nightly_job().run(), 60)
+            self.assertEqual(stages['collect'], 1.5)
+            self.assertNotEqual(stages['pid'], os.getpid())
+            pong = asyncio.ensure_future(events.wait('test_pong'))
+            await asyncio.sleep(0)
+            events.notify('test_ping')
+            await asyncio.wait_for(pong, 10)
+        finally:
+            await service.stop()
+        self.assertEqual(service.restarts, 0)
+        self.assertFalse(service._process.is_alive())
+        self.assertEqual(service._process.exitcode, 0)
+
+    async def test_crashed_worker_is_restarted(self):
+        service = ServiceProcess(EchoService, restart_delay=0.1, crash_on_run=True)
+        await service.start()
+        try:
+            with self.assertRaises(WorkerCrashedException):
+                await asyncio.wait_for(service.run_scheduled(), 60)
+            for _ in range(600):
+                if service.restarts and service._ready.is_set():
+                    break
+                await asyncio.sleep(0.1)
+            self.assertEqual(service.restarts, 1)
+            self.assertIn('service="EchoService"', REGISTRY.render())
+        finally:
+            await service.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
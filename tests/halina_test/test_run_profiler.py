@@ -0,0 +1,39 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from halina.run_profiler import RunProfiler
+from halina.stage_timer import StageTimer
+
+
+class TestRunProfiler(unittest.IsolatedAsyncioTestCase):
+
+    @patch('halina.run_profiler.GlobalConfig.get', return_value=None)
+    def test_disabled(self, _):
+        self.assertIsNone(RunProfiler.for_job("EmailRapportService"))
+
+    async def test_profile_saved(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            profiler = RunProfiler(job="FileRapportService", directory=tmp_dir)
+            timer = StageTimer(job="FileRapportService", profiler=profiler)
+            profiler.start()
+            with timer.stage('collect'):
+                data = [str(i) for i in range(10000)]
+            with timer.stage('save'):
+                json.dumps(data)
+            await profiler.stop()
+
+            self.assertEqual(os.path.dirname(profiler.path), tmp_dir)
+            self.assertEqual(sorted(os.listdir(profiler.path)),
+                             ['allocations.txt', 'profile.prof', 'profile.txt', 'stages.json'])
+            with open(os.path.join(profiler.path, 'stages.json')) as file:
+                stages = json.load(file)
+            self.assertEqual(list(stages), ['collect', 'save'])
+            self.assertGreater(stages['collect']['traced_peak_bytes'], 0)
+            self.assertGreater(stages['collect']['peak_rss_kb'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
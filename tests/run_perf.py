@@ -0,0 +1,220 @@
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+from definitions import TEST_DIR
+from halina.email_rapport.chart_builder import ChartBuilder
+from halina.email_rapport.data_collector_classes.fwhm_point import FwhmPoint
+from halina.email_rapport.data_collector_classes.power_point import PowerPoint
+from halina.email_rapport.data_collector_classes.weather_point import WeatherPoint
+from halina.metrics import CHART_RENDER_SECONDS, REGISTRY
+from tests.benchmarks.run_benchmarks import halina_version, run_benchmark
+
+logger = logging.getLogger('perf')
+
+BASELINES_DIR = os.path.join(TEST_DIR, 'perf_baselines')
+
+# fixed inputs, changing them makes stored baselines incomparable
+_TELESCOPE_FRAMES = 5000
+_TELEMETRY_FRAMES = 20000
+_CHART_POINTS = 1440  # one point per minute of 24 h
+_FWHM_POINTS = 2000
+_CHARTS = ['wind', 'temperature', 'humidity', 'pressure', 'fwhm', 'power']
+
+_REL_THRESHOLD = 0.10  # change smaller than 10% is never reported
+_NOISE_FACTOR = 3  # change has to be bigger than 3 robust standard deviations of samples
+
+
+class Metric:
+    def __init__(self, name: str, unit: str, higher_is_better: bool):
+        self.name: str = name
+        self.unit: str = unit
+        self.higher_is_better: bool = higher_is_better
+        self.samples: List[float] = []
+
+    def to_dict(self) -> dict:
+        return {'unit': self.unit, 'higher_is_better': self.higher_is_better, 'samples': self.samples}
+
+
+def _measure_collectors(metrics: Dict[str, Metric]) -> None:
+    for name, frames in [('telescope', _TELESCOPE_FRAMES), ('weather', _TELEMETRY_FRAMES),
+                         ('power', _TELEMETRY_FRAMES)]:
+        result = run_benchmark(name=name, frames=frames)
+        metrics.setdefault(f'{name}_msgs_per_s', Metric(f'{name}_msgs_per_s', 'msgs/s', True)).samples.append(
+            result['msgs_per_s'])
+
+
+def _measure_collector_memory(metrics: Dict[str, Metric]) -> None:
+    # traced memory is deterministic, RSS depends on allocator and on everything what was imported before
+    tracemalloc.start()
+    try:
+        run_benchmark(name='telescope', frames=_TELESCOPE_FRAMES)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    metrics.setdefault('telescope_peak_mb', Metric('telescope_peak_mb', 'MB', False)).samples.append(
+        peak / 1024 / 1024)
+
+
+def _chart_builder() -> ChartBuilder:
+    rnd = random.Random(0)
+    start = datetime.datetime(2024, 5, 1, 12, tzinfo=datetime.timezone.utc)
+    minutes = [start + datetime.timedelta(minutes=i) for i in range(_CHART_POINTS)]
+    builder = ChartBuilder()
+    builder.set_data_weather([WeatherPoint(date=d, temperature=rnd.uniform(5, 20), humidity=rnd.randint(10, 90),
+                                           wind=rnd.uniform(0, 15), wind_dir_deg=rnd.randint(0, 359),
+                                           pressure=rnd.uniform(740, 750)) for d in minutes])
+    builder.set_data_power([PowerPoint(date=d, state_of_charge=rnd.uniform(20, 100), pv_power=rnd.uniform(0, 3000),
+                                       battery_charge=rnd.uniform(0, 1000), battery_discharge=rnd.uniform(0, 1000))
+                            for d in minutes])
+    step = datetime.timedelta(days=1) / _FWHM_POINTS
+    builder.set_data_fwhm({tel: {'color': color,
+                                 'fwhm_data': [FwhmPoint(date=start + step * i, fwhm=rnd.uniform(2, 6), scale=0.5)
+                                               for i in range(_FWHM_POINTS)]}
+                           for tel, color in [('jk15', '#ff0000'), ('zb08', '#0000ff')]})
+    return builder
+
+
+def _measure_charts(metrics: Dict[str, Metric]) -> None:
+    REGISTRY.reset()
+    start = time.perf_counter()
+    asyncio.run(_chart_builder().build())
+    total = time.perf_counter() - start
+    snapshot = {tuple(v['labels'].items()): v for v in CHART_RENDER_SECONDS.snapshot()['values']}
+    for chart in _CHARTS:
+        value = snapshot.get((('chart', chart),))
+        if value is not None:
+            metrics.setdefault(f'chart_{chart}_render_ms', Metric(f'chart_{chart}_render_ms', 'ms', False)
+                               ).samples.append(value['sum'] * 1000)
+    metrics.setdefault('charts_build_ms', Metric('charts_build_ms', 'ms', False)).samples.append(total * 1000)
+
+
+def measure(repeat: int) -> Dict[str, Metric]:
+    metrics: Dict[str, Metric] = {}
+    # first render starts kaleido process, it is not measured
+    asyncio.run(_chart_builder().build())
+    for i in range(repeat):
+        logger.warning(f"Run {i + 1}/{repeat}")
+        _measure_collectors(metrics)
+        _measure_charts(metrics)
+    _measure_collector_memory(metrics)
+    return metrics
+
+
+def _version_key(version: str):
+    return tuple(int(p) if p.isdigit() else p for p in version.replace('-', '.').split('.'))
+
+
+def _baseline_path(version: str) -> str:
+    return os.path.join(BASELINES_DIR, f'{version}.json')
+
+
+def find_baseline(current: str, version: Optional[str] = None) -> Optional[str]:
+    """
+    Method return path of baseline of given version, or of the newest version older than current.
+    """
+    if version is not None:
+        path = _baseline_path(version)
+        return path if os.path.exists(path) else None
+    if not os.path.isdir(BASELINES_DIR):
+        return None
+    versions = [f[:-len('.json')] for f in os.listdir(BASELINES_DIR) if f.endswith('.json')]
+    older = [v for v in versions if _version_key(v) < _version_key(current)]
+    if older:
+        return _baseline_path(max(older, key=_version_key))
+    return _baseline_path(current) if current in versions else None
+
+
+def compare(baseline: Dict[str, dict], current: Dict[str, Metric]) -> List[dict]:
+    """
+    Method compare medians of samples. Change is significant if it is bigger than `_REL_THRESHOLD` of baseline and
+    bigger than `_NOISE_FACTOR` robust standard deviations (scaled median absolute deviation) of samples.
+    """
+    rows = []
+    for name, metric in current.items():
+        base = baseline.get(name)
+        cur_median = statistics.median(metric.samples)
+        if base is None or not base['samples']:
+            rows.append({'metric': name, 'unit': metric.unit, 'baseline': None, 'current': cur_median,
+                         'change': None, 'status': 'NEW'})
+            continue
+        base_median = statistics.median(base['samples'])
+        noise = 1.4826 * max(_mad(base['samples']), _mad(metric.samples))
+        limit = max(_REL_THRESHOLD * abs(base_median), _NOISE_FACTOR * noise)
+        worse = base_median - cur_median if metric.higher_is_better else cur_median - base_median
+        status = 'OK'
+        if worse > limit:
+            status = 'REGRESSION'
+        elif -worse > limit:
+            status = 'IMPROVED'
+        change = (cur_median - base_median) / base_median if base_median else None
+        rows.append({'metric': name, 'unit': metric.unit, 'baseline': base_median, 'current': cur_median,
+                     'change': change, 'status': status})
+    return rows
+
+
+def _mad(samples: List[float]) -> float:
+    median = statistics.median(samples)
+    return statistics.median([abs(s - median) for s in samples])
+
+
+def format_report(rows: List[dict], baseline_version: Optional[str], current_version: str) -> str:
+    lines = [f"Performance of {current_version} compared to baseline {baseline_version or '-'}",
+             f"{'metric':<28} {'unit':>7} {'baseline':>12} {'current':>12} {'change':>8}  status"]
+    for r in rows:
+        base = f"{r['baseline']:.1f}" if r['baseline'] is not None else '-'
+        change = f"{r['change'] * 100:+.1f}%" if r['change'] is not None else '-'
+        lines.append(f"{r['metric']:<28} {r['unit']:>7} {base:>12} {r['current']:>12.1f} {change:>8}  {r['status']}")
+    regressions = [r['metric'] for r in rows if r['status'] == 'REGRESSION']
+    lines.append(f"Regressions: {', '.join(regressions)}" if regressions else "No regressions")
+    return '\n'.join(lines)
+
+
+def save_baseline(version: str, metrics: Dict[str, Metric]) -> str:
+    os.makedirs(BASELINES_DIR, exist_ok=True)
+    path = _baseline_path(version)
+    with open(path, 'w') as file:
+        json.dump({'version': version,
+                   'python': platform.python_version(),
+                   'machine': platform.machine(),
+                   'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                   'metrics': {name: m.to_dict() for name, m in metrics.items()}}, file, indent=4)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Timing of collector and chart hot paths compared to stored baseline")
+    parser.add_argument('--repeat', type=int, default=5, help="number of samples of every metric")
+    parser.add_argument('--baseline', type=str, default=None,
+                        help="version of baseline (default: the newest version older than current)")
+    parser.add_argument('--save', action='store_true', help="store results as baseline of current version")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    version = halina_version()
+    metrics = measure(repeat=args.repeat)
+    baseline_path = find_baseline(current=version, version=args.baseline)
+    baseline, baseline_version = {}, None
+    if baseline_path is not None:
+        with open(baseline_path, 'r') as file:
+            data = json.load(file)
+        baseline, baseline_version = data['metrics'], data['version']
+    rows = compare(baseline=baseline, current=metrics)
+    print(format_report(rows, baseline_version=baseline_version, current_version=version))
+    if args.save:
+        print(f"Baseline saved: {save_baseline(version, metrics)}")
+    sys.exit(1 if any(r['status'] == 'REGRESSION' for r in rows) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import unittest
+
+from configuration import ConfigError, GlobalConfig
+
+
+class TestGlobalConfig(unittest.TestCase):
+
+    def test_snapshot_is_typed_and_frozen(self):
+        snapshot = GlobalConfig.load()
+        self.assertIsInstance(snapshot.TELESCOPES, tuple)
+        self.assertIsInstance(snapshot.CHARTS_UTC_OFFSET_HOURS, float)
+        self.assertEqual(GlobalConfig.get(GlobalConfig.NATS_PORT), snapshot.NATS_PORT)
+        self.assertEqual(GlobalConfig.get(GlobalConfig.DELIVER_BY_MIN, 7), 7)
+        with self.assertRaises(AttributeError):
+            snapshot.NATS_PORT = 1
+
+    def test_set_replaces_snapshot(self):
+        old = GlobalConfig.load()
+        GlobalConfig.set(GlobalConfig.SEND_AT, 5)
+        try:
+            self.assertEqual(GlobalConfig.snapshot().SEND_AT, 5)
+            self.assertIsNot(GlobalConfig.snapshot(), old)
+            self.assertEqual(GlobalConfig.load().SEND_AT, 5)
+        finally:
+            GlobalConfig.set(GlobalConfig.SEND_AT, old.SEND_AT)
+
+    def test_invalid_configuration_is_rejected(self):
+        old = GlobalConfig.load()
+        GlobalConfig.set(GlobalConfig.SEND_AT, 25)
+        GlobalConfig.set(GlobalConfig.SMTP_PORT, 0)
+        try:
+            with self.assertRaises(ConfigError) as cm:
+                GlobalConfig.load()
+            self.assertIn(GlobalConfig.SEND_AT, str(cm.exception))
+            self.assertIn(GlobalConfig.SMTP_PORT, str(cm.exception))
+        finally:
+            GlobalConfig.set(GlobalConfig.SEND_AT, old.SEND_AT)
+            GlobalConfig.set(GlobalConfig.SMTP_PORT, old.SMTP_PORT)
+        self.assertEqual(GlobalConfig.load(), old)
+
+
+if __name__ == '__main__':
+    unittest.main()